@@ -1,26 +1,35 @@
 # %%
 import re
+import os
+import collections
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .structure import StructureBatch
 # %%
 class GetSeqMarker:
-    def __init__(self, parentheses_seq):
+    def __init__(self, parentheses_seq, cache=None):
         self.parentheses_seq = parentheses_seq
+        self._markers = None
+        # NOTE: cache (`StructureCache`) : 相同 structure 不重新計算 marker (opt-in)
+        self.cache = cache
+
+    @classmethod
+    def fromStructureBatch(cls, objStructureBatch, index):
+        """ GetSeqMarker of i-th structure in `structure.StructureBatch` (not parse again) """
+        getMKs = cls(objStructureBatch.structures[index])
+        getMKs._markers = objStructureBatch.getMarkers(index)
+        return getMKs
 
     @property
     def getStMKs_premiRNA(self):
-        marker = 0
-        lstMKs_premiRNA = []
-        cache = []
-        for parenthese in self.parentheses_seq:
-            if parenthese == "(":
-                marker+=1
-                lstMKs_premiRNA.append(marker)
-                cache.append(marker)
-            elif parenthese == ")":
-                opposite_marker = cache.pop()
-                lstMKs_premiRNA.append(opposite_marker)
-            else:
-                lstMKs_premiRNA.append(0)
-        self.lstMKs_premiRNA = lstMKs_premiRNA
+        # NOTE: marker 由 `structure.StructureBatch` 計算 (NumPy pair table)
+        if self.cache is not None and self._markers is None:
+            self.lstMKs_premiRNA, self.list_site_markers = self.cache.siteMarkers(self.parentheses_seq)
+            return
+        if self._markers is None:
+            self._markers = StructureBatch([self.parentheses_seq]).getMarkers(0)
+        self.lstMKs_premiRNA = self._markers.tolist()
 
         list_site_markers = [[site, marker] for site, marker in enumerate(self.lstMKs_premiRNA)]
         self.list_site_markers = list_site_markers
@@ -67,6 +76,23 @@ class GetSeqMarker:
             print("請先執行 .get_five_miRNA")
 
 
+def getSeqMarkers(structures):
+    """
+    GetSeqMarker of many structures (parse all structures at once by `structure.StructureBatch`) :
+        - `getStMKs_premiRNA` is already run
+        >>> listGetMKs = getSeqMarkers(["((..))", "(((...)).)"])
+        >>> listGetMKs[1].lstMKs_premiRNA
+        [1, 2, 3, 0, 0, 0, 3, 2, 0, 1]
+    """
+    objStructureBatch = StructureBatch(structures)
+    listGetMKs = []
+    for index in range(len(objStructureBatch)):
+        getMKs = GetSeqMarker.fromStructureBatch(objStructureBatch, index)
+        getMKs.getStMKs_premiRNA
+        listGetMKs.append(getMKs)
+    return listGetMKs
+
+
 # %%
 class FindComparedSeq():
     def __init__(self, getMKs):
@@ -215,6 +241,122 @@ class FiveEnd_miRNA(FindComparedSeq):
                 #print(f'elif {marker} == {self.startMKsRM0} and {site} != {self.startStRM0}:')
                 #print('final_index', final_index)
                 self.final_index = final_index
+
+# %%
+ComparedRegion = collections.namedtuple('ComparedRegion', 'start_site_c end_site_c compared_markers')
+
+
+class ComparedRegionResolver:
+    """
+    ComparedRegionResolver :
+        compared region of miRNA 5p / 3p in one call (same result as `ThreeEnd_miRNA` / `FiveEnd_miRNA`)
+    ---
+        - precompute once per hairpin : marker array, rank of paired site, marker -> sites
+        - `resolve` only scan arm range (not whole hairpin for each property)
+        - arm that `ThreeEnd_miRNA` / `FiveEnd_miRNA` can not resolve (raise error) is None
+          (5p also None if 3p arm has no paired site : `FiveEnd_miRNA` read 3p marker list first)
+    ---
+        example :
+        >>> objResolver = ComparedRegionResolver(objHairpin.struct)
+        >>> dictRegions = objResolver.resolve(five_start, five_end, three_start, three_end)
+        >>> dictRegions['3p'].compared_markers  # same as ThreeEnd_miRNA(getMKs).compared_markers
+    """
+    def __init__(self, parentheses_seq, markers=None):
+        self.parentheses_seq = parentheses_seq
+        if markers is None:
+            markers = StructureBatch([parentheses_seq]).getMarkers(0)
+        self.markers = np.asarray(markers)
+        self.lstMKs_premiRNA = self.markers.tolist()
+        # NOTE: lstStMKsRM0_premiRNA 的 site / marker 與每個 site 在其中的 index
+        self.sites_rm0 = np.flatnonzero(self.markers)
+        self.markers_rm0 = self.markers[self.sites_rm0]
+        self.rank = np.cumsum(self.markers != 0) - 1
+        # NOTE: marker -> 有此 marker 的 site (最多 2 個 : `(` 與 `)`)
+        self.marker_sites = np.full((int(self.markers.max(initial=0)) + 1, 2), -1, dtype=np.int64)
+        order = np.argsort(self.markers_rm0, kind='stable')
+        sorted_markers = self.markers_rm0[order]
+        second = np.zeros(len(sorted_markers), dtype=bool)
+        second[1:] = sorted_markers[1:] == sorted_markers[:-1]
+        self.marker_sites[sorted_markers[~second], 0] = self.sites_rm0[order][~second]
+        self.marker_sites[sorted_markers[second], 1] = self.sites_rm0[order][second]
+
+    @classmethod
+    def fromStructureBatch(cls, objStructureBatch, index):
+        return cls(objStructureBatch.structures[index], objStructureBatch.getMarkers(index))
+
+    def _candidateIndexes(self, listMarkers):
+        """ index in lstStMKsRM0_premiRNA of sites with marker (sorted) """
+        sites = self.marker_sites[listMarkers].ravel()
+        return sorted(set(int(index) for index in self.rank[sites[sites >= 0]]))
+
+    def _armEnds(self, start_site, end_site, p53):
+        """ (startStRM0, endStRM0, startMKsRM0, endMKsRM0) of arm (None if arm has no paired site) """
+        sites = np.flatnonzero(self.markers[start_site:(end_site + 1)])
+        if len(sites) == 0:
+            return None
+        first_site = int(sites[0]) + start_site
+        last_site = int(sites[-1]) + start_site
+        if p53 == '3p':
+            # NOTE: 3p 為反轉後的順序
+            first_site, last_site = last_site, first_site
+        return first_site, last_site, int(self.markers[first_site]), int(self.markers[last_site])
+
+    def resolveArm(self, start_site, end_site, p53):
+        """
+        ComparedRegion of one arm (`p53` : '5p' or '3p')
+            p.s. only check this arm ; use `resolve` to get same 5p result as `FiveEnd_miRNA`
+        """
+        armEnds = self._armEnds(start_site, end_site, p53)
+        if armEnds is None:
+            return None
+        startStRM0, endStRM0, startMKsRM0, endMKsRM0 = armEnds
+        count_rm0 = len(self.sites_rm0)
+        last_marker = int(self.markers_rm0[-1])
+
+        # NOTE: 同 get_index_c (只看有 startMKsRM0 / endMKsRM0 的 site)
+        first_index, final_index = None, None
+        for index in self._candidateIndexes([startMKsRM0, endMKsRM0]):
+            site, marker = int(self.sites_rm0[index]), int(self.markers_rm0[index])
+            if p53 == '3p':
+                if marker == startMKsRM0 and site != startStRM0:
+                    first_index = index
+                elif marker == endMKsRM0 and site != endStRM0:
+                    final_index = index
+            else:
+                if marker == endMKsRM0 and site != endStRM0:
+                    first_index = index
+                elif marker == startMKsRM0 and site != startStRM0:
+                    final_index = index
+
+        # NOTE: 同 get_start_site_c
+        # (5p 的 `self.startMKsRM0 in self.lstStMKsRM0_miRNA` 為 int in list of [site, marker]，永遠是 False)
+        if p53 == '3p' and startMKsRM0 == int(self.markers_rm0[0]):
+            start_site_c = 0
+        else:
+            if first_index is None:
+                return None
+            start_site_c = int(self.sites_rm0[first_index - 1]) + 1
+
+        # NOTE: 同 get_end_site_c
+        if (endMKsRM0 if p53 == '3p' else startMKsRM0) == last_marker:
+            end_site_c = len(self.lstMKs_premiRNA)
+        else:
+            if final_index is None or final_index + 1 >= count_rm0:
+                return None
+            end_site_c = int(self.sites_rm0[final_index + 1]) - 1
+
+        compared_markers = self.lstMKs_premiRNA[start_site_c:(end_site_c + 1)]
+        return ComparedRegion(start_site_c, end_site_c, compared_markers)
+
+    def resolve(self, five_start_site, five_end_site, three_start_site, three_end_site):
+        """ {'5p': ComparedRegion, '3p': ComparedRegion} (site : 0-based, include end) """
+        # NOTE: FiveEnd_miRNA 初始化時先取 3p arm 的 marker (`lstStMKsRM0_miRNAp3[0]`)，3p 無配對 -> 5p 也無法計算
+        three_paired = self._armEnds(three_start_site, three_end_site, '3p') is not None
+        return {
+            '5p': self.resolveArm(five_start_site, five_end_site, '5p') if three_paired else None,
+            '3p': self.resolveArm(three_start_site, three_end_site, '3p') if three_paired else None,
+        }
+
 ### 判斷字串是否連續 (FUNCTION)
 def cotinous_seq(list_markers):
     raw_markers = [num for num in list_markers if num != 0]
@@ -244,4 +386,236 @@ def cotinous_seq(list_markers):
                 result_seq_markers.append([])
             result_seq_markers[-1].append(num)
     return result_seq_markers
-    
\ No newline at end of file
+
+
+# %%
+class StructureCache:
+    """
+    StructureCache :
+        bounded LRU cache of structure analysis (opt-in ; many precursor share the same structure)
+    ---
+        - `siteMarkers(struct)` : (lstMKs_premiRNA, list_site_markers) of `GetSeqMarker`
+        - `resolver(struct)` : `ComparedRegionResolver`
+        - `evaluate(struct, five_start, five_end, three_start, three_end)` :
+            (compared regions, `cotinous_seq` segments) of both arm
+        - `hits` / `misses` / `info()` : counter of cache (one call = one lookup) ; `clear()` : remove all
+    ---
+        p.s. cached lists are shared, please do not modify them
+    ---
+        example :
+        >>> objStructureCache = StructureCache(max_size=100000)
+        >>> getMKs = GetSeqMarker(objHairpin.struct, cache=objStructureCache)
+        >>> getMKs.getStMKs_premiRNA
+        >>> objStructureCache.info()
+        {'hits': 120, 'misses': 30, 'hit_rate': 0.8, 'size': 30, 'max_size': 100000}
+    """
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._dictCache = collections.OrderedDict()
+
+    def _get(self, key, function, count=True):
+        """ cached value of key (call function and save if not found ; `count` false : not change hits / misses) """
+        try:
+            value = self._dictCache[key]
+        except KeyError:
+            self.misses += count
+            value = function()
+            self._dictCache[key] = value
+            if len(self._dictCache) > self.max_size:
+                self._dictCache.popitem(last=False)
+            return value
+        self.hits += count
+        self._dictCache.move_to_end(key)
+        return value
+
+    def _siteMarkers(self, parentheses_seq):
+        lstMKs_premiRNA = StructureBatch([parentheses_seq]).getMarkers(0).tolist()
+        return lstMKs_premiRNA, [[site, marker] for site, marker in enumerate(lstMKs_premiRNA)]
+
+    def siteMarkers(self, parentheses_seq):
+        return self._get(('markers', parentheses_seq), lambda: self._siteMarkers(parentheses_seq))
+
+    def resolver(self, parentheses_seq):
+        return self._get(('resolver', parentheses_seq), lambda: ComparedRegionResolver(parentheses_seq))
+
+    def _evaluate(self, parentheses_seq, five_start_site, five_end_site, three_start_site, three_end_site):
+        # NOTE: 內層的 resolver 查詢不計數 (一次 `evaluate` 只算一次 hit / miss)
+        objResolver = self._get(
+            ('resolver', parentheses_seq), lambda: ComparedRegionResolver(parentheses_seq), count=False
+        )
+        dictRegions = objResolver.resolve(
+            five_start_site, five_end_site, three_start_site, three_end_site
+        )
+        dictSegments = {
+            p53: cotinous_seq(region.compared_markers) if region is not None else None
+            for p53, region in dictRegions.items()
+        }
+        return dictRegions, dictSegments
+
+    def evaluate(self, parentheses_seq, five_start_site, five_end_site, three_start_site, three_end_site):
+        key = ('evaluate', parentheses_seq, five_start_site, five_end_site, three_start_site, three_end_site)
+        return self._get(key, lambda: self._evaluate(*key[1:]))
+
+    def info(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self._dictCache), 'max_size': self.max_size,
+        }
+
+    def clear(self):
+        self._dictCache.clear()
+        self.hits = self.misses = 0
+
+
+# %%
+PrecursorResult = collections.namedtuple(
+    'PrecursorResult', 'index compared_5p compared_3p segments_5p segments_3p passed'
+)
+
+
+def _iterChunks(iterable, chunk_size):
+    """ split iterable to list of `chunk_size` items (read as needed) """
+    iterItems = iter(iterable)
+    while True:
+        listItems = list(itertools.islice(iterItems, chunk_size))
+        if not listItems:
+            return
+        yield listItems
+
+
+# NOTE: 每個 worker process 的 StructureCache (cache_size > 0 時使用)，只用於同一次 `evaluatePrecursors`
+_dictWorkerCache = {}
+_callCounter = itertools.count()
+
+
+def _workerCache(call_id, cache_size):
+    """ StructureCache of this process for `call_id` (new call -> drop cache of previous call) """
+    if _dictWorkerCache.get('call_id') != call_id:
+        _dictWorkerCache.clear()
+        _dictWorkerCache['call_id'] = call_id
+        _dictWorkerCache['cache'] = StructureCache(cache_size)
+    return _dictWorkerCache['cache']
+
+
+def _evaluateChunkWorker(listItems, start_index, max_segments, cache_size, call_id):
+    """ (results, cache counter of this chunk) of one chunk (run in worker process) """
+    if cache_size <= 0:
+        return _evaluateChunk(listItems, start_index, max_segments), None
+    objStructureCache = _workerCache(call_id, cache_size)
+    hits, misses = objStructureCache.hits, objStructureCache.misses
+    listResults = _evaluateChunk(listItems, start_index, max_segments, objStructureCache)
+    return listResults, {
+        'pid': os.getpid(),
+        'hits': objStructureCache.hits - hits,
+        'misses': objStructureCache.misses - misses,
+        'size': len(objStructureCache._dictCache),
+    }
+
+
+def _mergeCacheInfo(cache_info, dictSizes, dictChunkInfo):
+    """ add cache counter of one chunk to `cache_info` (size : sum of last size of each process) """
+    if cache_info is None or dictChunkInfo is None:
+        return
+    cache_info['hits'] += dictChunkInfo['hits']
+    cache_info['misses'] += dictChunkInfo['misses']
+    lookups = cache_info['hits'] + cache_info['misses']
+    cache_info['hit_rate'] = cache_info['hits'] / lookups if lookups else 0.0
+    dictSizes[dictChunkInfo['pid']] = dictChunkInfo['size']
+    cache_info['size'] = sum(dictSizes.values())
+
+
+def _evaluateChunk(listItems, start_index, max_segments, objStructureCache=None):
+    """ evaluate precursors of one chunk (`objStructureCache` : StructureCache or None) """
+    if objStructureCache is not None:
+        listEvaluated = [objStructureCache.evaluate(*item[:5]) for item in listItems]
+    else:
+        objStructureBatch = StructureBatch([item[0] for item in listItems])
+        listEvaluated = []
+        for index, item in enumerate(listItems):
+            objResolver = ComparedRegionResolver.fromStructureBatch(objStructureBatch, index)
+            dictRegions = objResolver.resolve(*item[1:5])
+            dictSegments = {
+                p53: cotinous_seq(region.compared_markers) if region is not None else None
+                for p53, region in dictRegions.items()
+            }
+            listEvaluated.append((dictRegions, dictSegments))
+
+    listResults = []
+    for index, (dictRegions, dictSegments) in enumerate(listEvaluated):
+        passed = all(
+            segments is not None and len(segments) <= max_segments for segments in dictSegments.values()
+        )
+        listResults.append(PrecursorResult(
+            start_index + index,
+            dictRegions['5p'], dictRegions['3p'],
+            dictSegments['5p'], dictSegments['3p'],
+            passed,
+        ))
+    return listResults
+
+
+def evaluatePrecursors(precursors, processes=None, chunk_size=1000, max_segments=1, cache_size=0, cache_info=None):
+    """
+    evaluate many precursor (hairpin) by process pool, yield result in input order :
+        input : iterable of (struct, five_start, five_end, three_start, three_end)
+            - site : 0-based, include end (same as `GetSeqMarker.getStMKs_miRNA5p/3p`)
+        output : PrecursorResult (generator)
+            - compared_5p / compared_3p : `ComparedRegion` (None if can not resolve)
+            - segments_5p / segments_3p : `cotinous_seq` of compared markers
+            - passed : both arm resolved and continuous segments <= `max_segments`
+    ---
+        args :
+            processes : number of process (default : all cpu ; 1 : not use process pool)
+            chunk_size : number of precursor per task
+            max_segments : max continuous segments of compared region (default : 1)
+            cache_size : size of `StructureCache` in each process (default : 0, not use cache)
+                cache only live in this call (not shared with other call)
+            cache_info : dict (optional) ; if set, update to merged `StructureCache.info()` of all process
+                (hits, misses, hit_rate, size : sum of each process, max_size : per process)
+                updated when result is yielded (final value after generator finished)
+    ---
+        example :
+        >>> listItems = ((objHairpin.struct, 0, 21, 60, 81) for objHairpin in rnafold.readRNAfold(".."))
+        >>> for result in evaluatePrecursors(listItems, processes=8):
+        ...     if result.passed: ...
+
+        p.s. : only `processes * 2` chunks are submitted at the same time (input is read as needed)
+    """
+    processes = processes or os.cpu_count() or 1
+    iterChunks = _iterChunks(precursors, chunk_size)
+    if cache_info is not None:
+        cache_info.update({'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size': 0, 'max_size': cache_size})
+    if processes == 1:
+        # NOTE: 單核時 cache 為此次呼叫的區域變數 (不留在 module 中)
+        objStructureCache = StructureCache(cache_size) if cache_size > 0 else None
+        start_index = 0
+        for listItems in iterChunks:
+            listResults = _evaluateChunk(listItems, start_index, max_segments, objStructureCache)
+            if cache_info is not None and objStructureCache is not None:
+                cache_info.update(objStructureCache.info())
+            yield from listResults
+            start_index += len(listItems)
+        return
+
+    call_id = (os.getpid(), next(_callCounter))
+    dictSizes = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        queueFutures = collections.deque()
+        start_index = 0
+        for listItems in iterChunks:
+            queueFutures.append(executor.submit(
+                _evaluateChunkWorker, listItems, start_index, max_segments, cache_size, call_id
+            ))
+            start_index += len(listItems)
+            # NOTE: 限制同時送出的 chunk 數，記憶體不隨輸入大小增加
+            if len(queueFutures) >= processes * 2:
+                listResults, dictChunkInfo = queueFutures.popleft().result()
+                _mergeCacheInfo(cache_info, dictSizes, dictChunkInfo)
+                yield from listResults
+        while queueFutures:
+            listResults, dictChunkInfo = queueFutures.popleft().result()
+            _mergeCacheInfo(cache_info, dictSizes, dictChunkInfo)
+            yield from listResults
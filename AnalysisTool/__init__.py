@@ -4,18 +4,48 @@ and I (Andy6) `impove and add some functions``
 
 `fasta` and `template` for basic bioinformatics tools
 
+`table` for columnar (NumPy) tables of `template.MicroRNA` / `template.Hairpin`
+
 `VFold` for RNA secondary structure prediction :
 
     - main : process precursor miRNA sequence
     - input : RNAfold data
     - output : good structure miRNA
 
+`duplex` for vectorized mature / star duplex validation (overhang, mismatch, bulge, loop)
+
+`rnafold` for streaming RNAfold output reader (yield `template.Hairpin`), input of `VFold`
+
+`structure` for vectorized dot-bracket pair table / marker array / marker runs, used by `VFold`
+
+`faidx` for indexed (random access) fasta, used by `fasta.readAsDict(lazy=True)`
+
+`compress` for compressed (gzip / BGZF / zstd) fasta input
+
+`packed` for 2 bits per base sequence store, used by `fasta.readAsDict(packed=True)`
+
+`cache` for persistent parsed-reference cache, used by `fasta.readAsDict(cache_dir=...)`
+
+`kmer` for k-mer counting and lookup index (NumPy) over fasta records
+
+`target` for miRNA target search (seed index), output for `PipelineTool.degradome`
+
 `utils` for some useful functions
 """
 
 from . import fasta
+from . import faidx
+from . import compress
+from . import packed
+from . import cache
+from . import kmer
+from . import target
 from . import template
+from . import table
 from . import VFold
+from . import structure
+from . import rnafold
+from . import duplex
 
 from . import utils
 
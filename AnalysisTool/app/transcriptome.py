@@ -6,9 +6,18 @@
 from __future__ import annotations
 from pandas.core.frame import DataFrame, Series
 import pandas as pd
+import numpy as np
 from   matplotlib import pyplot as plt
 import seaborn as sns
-from   typing import List, Dict, Tuple, Union, Optional, Any
+from   typing import List, Dict, Tuple, Union, Optional, Any, Iterable, Iterator
+from   concurrent.futures import ProcessPoolExecutor
+from   functools import reduce
+import heapq
+import json
+import os
+import re
+from   .. import compress
+from   .. import fasta
 
 class GetGeneIsoformCount(object):
     """
@@ -45,21 +54,43 @@ class GetGeneIsoformCount(object):
                 1	PggD10002_c0_g1	2
                 ...	...	...
                 221328 rows × 2 columns
+            - compact mode (compact=True): \n
+                - input DataFrame is not changed (results are new DataFrame with same index) \n
+                - gene_id is `category` (codes + one string table), isoform_count is smallest unsigned int \n
+                - transcript_id is shared with input (not copied ; Trinity transcript_id is unique, `category` not save memory) \n
+                - gene_id which is NaN is not counted (isoform_count : 0)
+                >>> objGetGeneIsoformCount = GetGeneIsoformCount(data=data, compact=True)
+                >>> objGetGeneIsoformCount.CountGeneIsoform()
+                >>> objGetGeneIsoformCount.GetResults(how="default").dtypes
+                transcript_id         str
+                gene_id          category
+                isoform_count       uint8
+                dtype: object
     """
-    def __init__(self, data: DataFrame, gene_id_include: bool = False) -> None:
+    def __init__(self, data: DataFrame, gene_id_include: bool = False, compact: bool = False) -> None:
         """
             GetGeneIsoformCount:
                 - input: DataFrame (include transcript_id) \n
                 - useful attributes :
                     self.data_add_gene_id : 
                         DataFrame (include transcript_id and gene_id)
+                        (compact : new DataFrame, only transcript_id and gene_id (`category`))
         """
         self.dictGeneIsoFormCount         = dict()
+        self.compact                      = compact
+        if compact:
+            self.data_add_gene_id         = self._compact_frame(data, gene_id_include)
+            return
         self.data_add_gene_id             = data
         if gene_id_include:
             pass
         else:
-            self.data_add_gene_id['gene_id']  = self.data_add_gene_id.apply(lambda row: self._get_gene_id(row), axis=1)
+            # NOTE: 結果同 `_get_gene_id` (去掉最後一個 `_` 之後的部分，沒有 `_` 則為 '')
+            #       list comprehension + str.rpartition 比 row-wise apply (與 `.str` accessor) 快
+            self.data_add_gene_id['gene_id']  = pd.Series(
+                [transcript_id.rpartition('_')[0] for transcript_id in self.data_add_gene_id['transcript_id'].tolist()],
+                index=self.data_add_gene_id.index
+            )
     def _get_gene_id(self, row: Series) -> List:
         """
             Get gene_id from transcript_id
@@ -67,16 +98,46 @@ class GetGeneIsoformCount(object):
         transcript_id     = row['transcript_id']
         gene_id = '_'.join(transcript_id.split('_')[:-1])
         return gene_id
+    @staticmethod
+    def _to_category(values: Union[Series, List]) -> pd.Categorical:
+        """
+            values to `category` (categories in order of first appearance ; NaN -> code -1)
+        """
+        codes, uniques = pd.factorize(values)
+        return pd.Categorical.from_codes(codes, categories=uniques)
+    def _compact_frame(self, data: DataFrame, gene_id_include: bool) -> DataFrame:
+        """
+            New DataFrame of transcript_id (shared with data) / gene_id (`category`), same index as data
+        """
+        if gene_id_include:
+            gene_ids = data['gene_id']
+        else:
+            gene_ids = pd.Series([transcript_id.rpartition('_')[0] for transcript_id in data['transcript_id'].tolist()])
+        return pd.DataFrame(
+            {
+                'transcript_id' : data['transcript_id'],
+                'gene_id'       : self._to_category(gene_ids)
+            },
+            index=data.index
+        )
     def CountGeneIsoform(self) -> Dict[str, int]:
         """
             Count gene isoform
             input : DataFrame (include gene_id)
         """
-        for index, row in self.data_add_gene_id.iterrows():
-            gene_id = row['gene_id']
-            if gene_id not in self.dictGeneIsoFormCount:
-                self.dictGeneIsoFormCount[gene_id] = 0
-            self.dictGeneIsoFormCount[gene_id] += 1
+        if self.compact:
+            # NOTE: categories 即 gene_id 第一次出現的順序，直接以 codes 計數
+            codes = self.data_add_gene_id['gene_id'].cat.codes.to_numpy()
+            listGeneIds = self.data_add_gene_id['gene_id'].cat.categories.tolist()
+            counts = np.bincount(codes[codes >= 0], minlength=len(listGeneIds))
+            for gene_id, count in zip(listGeneIds, counts.tolist()):
+                self.dictGeneIsoFormCount[gene_id] = self.dictGeneIsoFormCount.get(gene_id, 0) + count
+            return self.dictGeneIsoFormCount
+        # NOTE: factorize 保持 gene_id 第一次出現的順序 (同原本 iterrows 建 dict 的順序)
+        codes, uniques = pd.factorize(self.data_add_gene_id['gene_id'], use_na_sentinel=False)
+        counts = np.bincount(codes, minlength=len(uniques))
+        for gene_id, count in zip(uniques.tolist(), counts.tolist()):
+            self.dictGeneIsoFormCount[gene_id] = self.dictGeneIsoFormCount.get(gene_id, 0) + count
         return self.dictGeneIsoFormCount
     def _add_isoform_count(self, row: Series) -> List:
         """
@@ -97,15 +158,414 @@ class GetGeneIsoformCount(object):
                     `default` : return all columns  \n
                     `gene_and_isoform_count` : return gene_id and isoform_count
         """
-        self.data_add_gene_id['isoform_count'] = self.data_add_gene_id.apply(
-            lambda row: self._add_isoform_count(row),
-            axis=1
-        )
+        if self.compact:
+            return self._compact_results(how)
+        # NOTE: 每個 gene_id 只查一次 dict (gene_id 不在 dict 中 -> KeyError，同 `_add_isoform_count`)
+        codes, uniques = pd.factorize(self.data_add_gene_id['gene_id'], use_na_sentinel=False)
+        counts = np.array([self.dictGeneIsoFormCount[gene_id] for gene_id in uniques.tolist()], dtype=np.int64)
+        self.data_add_gene_id['isoform_count'] = counts[codes]
         if how != "gene_and_isoform_count":
             Result = self.data_add_gene_id
         else:
             Result = self.data_add_gene_id[['gene_id', 'isoform_count']].drop_duplicates()
         return Result
+    def _compact_results(self, how: str) -> DataFrame:
+        """
+            `GetResults` of compact mode (new DataFrame, `self.data_add_gene_id` is not changed)
+        """
+        codes = self.data_add_gene_id['gene_id'].cat.codes.to_numpy()
+        listGeneIds = self.data_add_gene_id['gene_id'].cat.categories.tolist()
+        counts = np.array([self.dictGeneIsoFormCount[gene_id] for gene_id in listGeneIds], dtype=np.int64)
+        counts = counts.astype(np.min_scalar_type(int(counts.max()) if len(counts) else 0))
+        # NOTE: code -1 (NaN) 放在最後一格 (isoform_count : 0)
+        isoform_count = np.append(counts, counts.dtype.type(0))[codes]
+        if how != "gene_and_isoform_count":
+            return self.data_add_gene_id.assign(isoform_count=isoform_count)
+        first_rows = np.unique(codes, return_index=True)[1][int((codes < 0).any()):]
+        return pd.DataFrame(
+            {
+                'gene_id'       : self.data_add_gene_id['gene_id'].iloc[first_rows],
+                'isoform_count' : counts
+            }
+        )
+
+class StreamGeneIsoformCount(object):
+    """
+        StreamGeneIsoformCount
+            streaming version of `GetGeneIsoformCount` + `AnalayGeneIsoForm`:
+            ---
+            - read Trinity-style transcript_id (`..._c0_g1_i1`) chunk by chunk (not build full DataFrame first) \n
+            - input: transcriptome fasta (`readFasta`, only scan header and count bases),
+              table (`readTable`, `pd.read_csv` chunks) or any chunk of transcript_id (`update`) \n
+            - memory : gene_id -> isoform_count dict (+ transcript_id list if `keep_transcripts`)
+              and length histogram (fixed size, see `max_exact_length`) / longest isoform per gene if `lengths` \n
+            - same results as `GetGeneIsoformCount.GetResults` and `AnalayGeneIsoForm.GetFormatDistribution` \n
+            - example: \n
+                >>> objStreamGeneIsoformCount = StreamGeneIsoformCount(lengths=True).readFasta("..Trinity.fasta")
+                >>> objStreamGeneIsoformCount.GetResults(how="gene_and_isoform_count")
+                    gene_id	isoform_count
+                0	PggD10000_c0_g1	1
+                1	PggD10002_c0_g1	2
+                ...	...	...
+                >>> objStreamGeneIsoformCount.GetFormatDistribution(how="Dict")
+                {1: 180000,
+                2: 25000,
+                ...}
+                >>> objStreamGeneIsoformCount.N50
+                1843
+                >>> objStreamGeneIsoformCount.GetLongestIsoform()
+                    gene_id	transcript_id	length
+                0	PggD10000_c0_g1	PggD10000_c0_g1_i1	1520
+                ...	...	...	...
+        ---
+            args :
+                keep_transcripts : true/false (keep transcript_id for `GetResults(how="default")`)
+                    set `False` if only need gene level results (memory : gene count, not transcript count)
+                lengths : true/false (keep length stats : N50 and longest isoform per gene)
+                max_exact_length : length < this value is counted exactly (default : 131072, histogram about 1 MB)
+                    longer length is counted in log buckets (8 per doubling) -> memory not grow with number of distinct length
+                    (N50 in this range is smallest length of the bucket, < 9% lower than exact N50)
+    """
+    # NOTE: 長度 >= max_exact_length 的 log bucket 數 (每倍 8 個 bucket，足夠 int64 長度)
+    LONG_LENGTH_BUCKETS = 8 * 64
+    def __init__(self, keep_transcripts: bool = True, lengths: bool = False, max_exact_length: int = 1 << 17) -> None:
+        self.keep_transcripts             = keep_transcripts
+        self.lengths                      = lengths
+        self.max_exact_length             = max_exact_length
+        self.dictGeneIsoFormCount         = dict()
+        # NOTE: gene_id 第一個 isoform 的 row (同 `drop_duplicates` 後保留的 index)
+        self.dictGeneFirstRow             = dict()
+        # NOTE: gene_id -> (transcript_id, length) ; 長度相同保留先出現的
+        self.dictGeneLongestIsoform       = dict()
+        self.listTranscriptIds            = list()
+        self.length_histogram             = np.zeros(max_exact_length if lengths else 0, dtype=np.int64)
+        self.long_length_counts           = np.zeros(self.LONG_LENGTH_BUCKETS if lengths else 0, dtype=np.int64)
+        self.long_length_bases            = np.zeros(self.LONG_LENGTH_BUCKETS if lengths else 0, dtype=np.int64)
+        self.long_length_minimum          = np.full(self.LONG_LENGTH_BUCKETS if lengths else 0, np.iinfo(np.int64).max, dtype=np.int64)
+        self.rows                         = 0
+    def update(self, transcript_ids: Iterable[str], lengths: Optional[Iterable[int]] = None) -> StreamGeneIsoformCount:
+        """
+            Add one chunk of transcript_id (and length if `lengths`)
+        """
+        listTranscriptIds = list(transcript_ids)
+        if self.lengths and lengths is None:
+            raise ValueError("Error: lengths is required when `lengths=True`")
+        # NOTE: 同 `GetGeneIsoformCount` (去掉最後一個 `_` 之後的部分)
+        listGeneIds = [transcript_id.rpartition('_')[0] for transcript_id in listTranscriptIds]
+        codes, uniques = pd.factorize(np.array(listGeneIds, dtype=object), use_na_sentinel=False)
+        counts = np.bincount(codes, minlength=len(uniques))
+        first_rows = np.unique(codes, return_index=True)[1] + self.rows
+        for gene_id, count, first_row in zip(uniques.tolist(), counts.tolist(), first_rows.tolist()):
+            if gene_id not in self.dictGeneIsoFormCount:
+                self.dictGeneIsoFormCount[gene_id] = 0
+                self.dictGeneFirstRow[gene_id] = first_row
+            self.dictGeneIsoFormCount[gene_id] += count
+
+        if self.lengths:
+            lengths = np.asarray(list(lengths) if not isinstance(lengths, np.ndarray) else lengths, dtype=np.int64)
+            if len(lengths) != len(listTranscriptIds):
+                raise ValueError("Error: length of transcript_ids and lengths are not equal")
+            self._updateLengths(listTranscriptIds, codes, uniques, lengths)
+        if self.keep_transcripts:
+            self.listTranscriptIds.extend(listTranscriptIds)
+        self.rows += len(listTranscriptIds)
+        return self
+    def _updateLengths(self, listTranscriptIds: List[str], codes: np.ndarray, uniques: np.ndarray, lengths: np.ndarray) -> None:
+        """
+            Add lengths of one chunk to histogram (N50) and longest isoform per gene
+        """
+        if len(lengths) == 0:
+            return
+        exact = lengths < self.max_exact_length
+        histogram = np.bincount(lengths[exact])
+        self.length_histogram[:len(histogram)] += histogram
+        if not exact.all():
+            long_lengths = lengths[~exact]
+            buckets = self._longBuckets(long_lengths)
+            self.long_length_counts += np.bincount(buckets, minlength=self.LONG_LENGTH_BUCKETS)
+            self.long_length_bases += np.bincount(buckets, weights=long_lengths, minlength=self.LONG_LENGTH_BUCKETS).astype(np.int64)
+            np.minimum.at(self.long_length_minimum, buckets, long_lengths)
+        # NOTE: 每個 gene 取最長 (長度相同取先出現) : 依 (code, -length, row) 排序後取每組第一個
+        order = np.lexsort((np.arange(len(lengths)), -lengths, codes))
+        heads = order[np.r_[True, codes[order][1:] != codes[order][:-1]]]
+        for code, row in zip(codes[heads].tolist(), heads.tolist()):
+            gene_id = uniques[code]
+            length = int(lengths[row])
+            if gene_id not in self.dictGeneLongestIsoform or length > self.dictGeneLongestIsoform[gene_id][1]:
+                self.dictGeneLongestIsoform[gene_id] = (listTranscriptIds[row], length)
+    def _longBuckets(self, long_lengths: np.ndarray) -> np.ndarray:
+        """
+            log bucket of length >= max_exact_length (8 bucket per doubling)
+        """
+        buckets = np.floor(np.log2(long_lengths / self.max_exact_length) * 8).astype(np.int64)
+        return np.clip(buckets, 0, self.LONG_LENGTH_BUCKETS - 1)
+    def readFasta(self, fasta_file: str, chunk_size: int = 100000) -> StreamGeneIsoformCount:
+        """
+            Read transcript_id (header before first space) and length from fasta (not read sequence into memory)
+                - auto detect compression (`compress.openFasta`)
+        """
+        for listTranscriptIds, listLengths in self._iterFastaChunks(fasta_file, chunk_size):
+            self.update(listTranscriptIds, listLengths if self.lengths else None)
+        return self
+    @staticmethod
+    def _iterFastaChunks(fasta_file: str, chunk_size: int) -> Iterator[Tuple[List[str], List[int]]]:
+        """
+            (transcript_ids, lengths) chunks of fasta
+        """
+        listTranscriptIds, listLengths = [], []
+        with compress.openFasta(fasta_file) as f:
+            for header, length in fasta._scanLengths(f):
+                listTranscriptIds.append(header.split(' ')[0])
+                listLengths.append(length)
+                if len(listTranscriptIds) >= chunk_size:
+                    yield listTranscriptIds, listLengths
+                    listTranscriptIds, listLengths = [], []
+        if listTranscriptIds:
+            yield listTranscriptIds, listLengths
+    def readTable(self, table_file: str, column: str = 'transcript_id', length_column: Optional[str] = None,
+                  sep: str = '\t', chunk_size: int = 1000000, **kwargs) -> StreamGeneIsoformCount:
+        """
+            Read transcript_id (and length) column from table by chunks (`pd.read_csv(chunksize=...)`)
+                - kwargs : other args of `pd.read_csv`
+        """
+        if self.lengths and length_column is None:
+            raise ValueError("Error: length_column is required when `lengths=True`")
+        listColumns = [column] if length_column is None else [column, length_column]
+        for chunk in pd.read_csv(table_file, sep=sep, usecols=listColumns, chunksize=chunk_size, **kwargs):
+            self.update(
+                chunk[column].astype(str).tolist(),
+                chunk[length_column].to_numpy(dtype=np.int64) if self.lengths else None
+            )
+        return self
+    def CountGeneIsoform(self) -> Dict[str, int]:
+        """
+            Count gene isoform (same as `GetGeneIsoformCount.CountGeneIsoform`)
+        """
+        return self.dictGeneIsoFormCount
+    def GetResults(self, how: str = "default") -> DataFrame:
+        """
+            Get result (same as `GetGeneIsoformCount.GetResults`) \n
+                return : `DataFrame`  \n
+                Args :
+                    `default` : return transcript_id, gene_id and isoform_count (need `keep_transcripts`) \n
+                    `gene_and_isoform_count` : return gene_id and isoform_count
+        """
+        if how == "gene_and_isoform_count":
+            return pd.DataFrame(
+                {
+                    'gene_id'       : list(self.dictGeneIsoFormCount.keys()),
+                    'isoform_count' : np.fromiter(self.dictGeneIsoFormCount.values(), dtype=np.int64, count=len(self.dictGeneIsoFormCount))
+                },
+                index=np.fromiter(self.dictGeneFirstRow.values(), dtype=np.int64, count=len(self.dictGeneFirstRow))
+            )
+        if not self.keep_transcripts:
+            raise ValueError("Error: transcript_id is not kept (set `keep_transcripts=True` or use how=\"gene_and_isoform_count\")")
+        listGeneIds = [transcript_id.rpartition('_')[0] for transcript_id in self.listTranscriptIds]
+        codes, uniques = pd.factorize(np.array(listGeneIds, dtype=object), use_na_sentinel=False)
+        counts = np.array([self.dictGeneIsoFormCount[gene_id] for gene_id in uniques.tolist()], dtype=np.int64)
+        return pd.DataFrame(
+            {
+                'transcript_id' : self.listTranscriptIds,
+                'gene_id'       : listGeneIds,
+                'isoform_count' : counts[codes]
+            }
+        )
+    def GetFormatDistribution(self, how="DataFrame") -> DataFrame | Dict:
+        """
+            Genes distribution of isoform count (same as `AnalayGeneIsoForm.GetFormatDistribution`)
+                - Args: how (str) : "DataFrame" or "Dict"
+                - output:
+                    - DataFrame (isoform_count, gene_count)
+                    - or dict (key: isoform_count, value: gene_count)
+        """
+        # NOTE: factorize 保持 isoform_count 第一次出現的順序 (同 iterrows 建 dict 的順序)
+        codes, uniques = pd.factorize(
+            np.fromiter(self.dictGeneIsoFormCount.values(), dtype=np.int64, count=len(self.dictGeneIsoFormCount))
+        )
+        dictIsoFormCountGeneDistribution = dict(zip(uniques.tolist(), np.bincount(codes, minlength=len(uniques)).tolist()))
+        if how != "Dict":
+            return pd.DataFrame(
+                {
+                    'isoform_count' : dictIsoFormCountGeneDistribution.keys(),
+                    'gene_count'    : dictIsoFormCountGeneDistribution.values()
+                }
+            )
+        return dictIsoFormCountGeneDistribution
+    @property
+    def N50(self) -> int:
+        """
+            N50 of transcript length (need `lengths`; 0 if no transcript)
+                - length L : total length of transcripts (length >= L) >= half of total length
+                - exact if N50 < `max_exact_length`, else smallest length of its log bucket
+        """
+        if not self.lengths:
+            raise ValueError("Error: length stats is not kept (set `lengths=True`)")
+        exact_bases = self.length_histogram * np.arange(len(self.length_histogram))
+        total = exact_bases.sum() + self.long_length_bases.sum()
+        if total == 0:
+            return 0
+        # NOTE: 由長到短累加 (先 log bucket，再 exact histogram)
+        cumulative = np.cumsum(np.concatenate((self.long_length_bases[::-1], exact_bases[::-1])))
+        index = int(np.searchsorted(cumulative * 2, total, side='left'))
+        if index < self.LONG_LENGTH_BUCKETS:
+            return int(self.long_length_minimum[self.LONG_LENGTH_BUCKETS - 1 - index])
+        return int(len(exact_bases) - 1 - (index - self.LONG_LENGTH_BUCKETS))
+    def GetLongestIsoform(self) -> DataFrame:
+        """
+            Longest isoform of each gene (need `lengths`)
+                - output: DataFrame (gene_id, transcript_id, length)
+        """
+        if not self.lengths:
+            raise ValueError("Error: length stats is not kept (set `lengths=True`)")
+        return pd.DataFrame(
+            {
+                'gene_id'       : list(self.dictGeneLongestIsoform.keys()),
+                'transcript_id' : [value[0] for value in self.dictGeneLongestIsoform.values()],
+                'length'        : np.array([value[1] for value in self.dictGeneLongestIsoform.values()], dtype=np.int64)
+            }
+        )
+
+class CountAccumulator(object):
+    """
+        CountAccumulator
+            mergeable value counter of one column (for shard / parallel process):
+            ---
+            - `update(chunk)` : add counts of chunk (DataFrame include `column`, Series or list; vectorized `value_counts`) \n
+            - `merge(other)` : add counts of other accumulator (ex: result of other process) \n
+            - `toJSON` / `fromJSON`, `save` / `load` : serialization (also picklable) \n
+            - order of keys : first appearance (merge shards in order = update all chunks in order) \n
+            - example: \n
+                >>> objAccumulator = CountAccumulator('isoform_count')
+                >>> objAccumulator.update(pdfShard1).update(pdfShard2)
+                >>> objAccumulator.merge(CountAccumulator.load("..shard3.json"))
+                >>> objAccumulator.to_DataFrame()
+                    isoform_count	gene_count
+                0	24	2
+                1	22	2
+                ...
+        ---
+            args :
+                column : column name to count
+                key_name : key column name of `to_DataFrame` (default : same as column)
+                value_name : count column name of `to_DataFrame` (default : gene_count)
+    """
+    def __init__(self, column: str, key_name: Optional[str] = None, value_name: str = 'gene_count') -> None:
+        self.column                       = column
+        self.key_name                     = key_name or column
+        self.value_name                   = value_name
+        self.dictCounts                   = dict()
+    def update(self, chunk: DataFrame | Series | List) -> CountAccumulator:
+        """
+            Add counts of one chunk
+        """
+        if isinstance(chunk, DataFrame):
+            chunk = chunk[self.column]
+        elif not isinstance(chunk, Series):
+            chunk = pd.Series(chunk)
+        if isinstance(chunk.dtype, pd.CategoricalDtype):
+            # NOTE: categorical 的 value_counts 依 category 順序 (含 0) ; 改用 codes 保持第一次出現的順序
+            #       code -1 (NaN) 對應最後一格 NaN
+            srsCounts = pd.Series(chunk.cat.codes.to_numpy()).value_counts(sort=False)
+            listKeys = np.append(chunk.cat.categories.to_numpy(dtype=object), np.nan)[srsCounts.index.to_numpy()].tolist()
+        else:
+            srsCounts = chunk.value_counts(sort=False, dropna=False)
+            listKeys = srsCounts.index.tolist()
+        for key, count in zip(listKeys, srsCounts.tolist()):
+            self.dictCounts[key] = self.dictCounts.get(key, 0) + count
+        return self
+    def merge(self, other: CountAccumulator) -> CountAccumulator:
+        """
+            Add counts of other accumulator (keys not in self are appended in order of other)
+        """
+        if other.column != self.column:
+            raise ValueError("Error: can not merge counts of column {} into {}".format(other.column, self.column))
+        for key, count in other.dictCounts.items():
+            self.dictCounts[key] = self.dictCounts.get(key, 0) + count
+        return self
+    def to_dict(self) -> Dict:
+        """
+            dict (key: value of column, value: count)
+        """
+        return self.dictCounts
+    def to_DataFrame(self) -> DataFrame:
+        """
+            DataFrame (key_name, value_name)
+        """
+        return pd.DataFrame(
+            {
+                self.key_name   : self.dictCounts.keys(),
+                self.value_name : self.dictCounts.values()
+            }
+        )
+    def toJSON(self) -> str:
+        """
+            Serialize to JSON string (counts are [key, count] pairs, keep key type and order)
+        """
+        return json.dumps(
+            {
+                'column'     : self.column,
+                'key_name'   : self.key_name,
+                'value_name' : self.value_name,
+                'counts'     : [[key, count] for key, count in self.dictCounts.items()]
+            }
+        )
+    @classmethod
+    def fromJSON(cls, text: str) -> CountAccumulator:
+        """
+            Deserialize from `toJSON` string
+        """
+        dictData = json.loads(text)
+        objAccumulator = cls(dictData['column'], dictData['key_name'], dictData['value_name'])
+        for key, count in dictData['counts']:
+            objAccumulator.dictCounts[key] = objAccumulator.dictCounts.get(key, 0) + count
+        return objAccumulator
+    def save(self, file: str) -> None:
+        """
+            Save `toJSON` to file
+        """
+        with open(file, 'w') as f:
+            f.write(self.toJSON())
+    @classmethod
+    def load(cls, file: str) -> CountAccumulator:
+        """
+            Load accumulator from `save` file
+        """
+        with open(file, 'r') as f:
+            return cls.fromJSON(f.read())
+
+def _countFile(args: Tuple) -> CountAccumulator:
+    """
+        Count column of one table file by chunks (worker of `countFiles`)
+    """
+    file, column, key_name, value_name, chunk_size, dictReadArgs = args
+    objAccumulator = CountAccumulator(column, key_name, value_name)
+    for chunk in pd.read_csv(file, usecols=[column], chunksize=chunk_size, **dictReadArgs):
+        objAccumulator.update(chunk)
+    return objAccumulator
+
+def countFiles(files: List[str], column: str, key_name: Optional[str] = None, value_name: str = 'gene_count',
+               processes: Optional[int] = None, chunk_size: int = 1000000, **kwargs) -> CountAccumulator:
+    """
+        Count column of many table files (one file per process) and merge to one `CountAccumulator`
+            - args :
+                processes : number of process (default : all cpu ; 1 : not use process pool)
+                chunk_size : rows per `pd.read_csv` chunk
+                kwargs : other args of `pd.read_csv` (ex: sep='\t')
+            - example :
+                >>> objAccumulator = countFiles(["..sample1.tsv", "..sample2.tsv"], 'annotation', sep='\t')
+                >>> objAccumulator.to_dict()
+                {'XM_020715060.1 PREDICTED: Phalaenopsis equestris midasin-like (LOC110017904), mRNA': 5,
+                ...}
+            - p.s. : merge results in order of files (same key order as read all files in one process)
+    """
+    listArgs = [(file, column, key_name, value_name, chunk_size, kwargs) for file in files]
+    processes = min(processes or os.cpu_count() or 1, max(len(listArgs), 1))
+    if processes == 1:
+        listAccumulators = [_countFile(args) for args in listArgs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            listAccumulators = list(executor.map(_countFile, listArgs))
+    return reduce(CountAccumulator.merge, listAccumulators, CountAccumulator(column, key_name, value_name))
 
 class AnalayGeneIsoForm(object):
     """
@@ -157,12 +617,16 @@ class AnalayGeneIsoForm(object):
                 22: 2,
                 ...}
         """
-        for index, row in self.data.iterrows():
-            isoform_count = row['isoform_count']
-            if isoform_count not in self.dictIsoFormCountGeneDistribution:
-                self.dictIsoFormCountGeneDistribution[isoform_count] = 0
-            self.dictIsoFormCountGeneDistribution[isoform_count] += 1
+        # NOTE: 以 `CountAccumulator` (value_counts) 取代 iterrows，結果 (含 key 順序) 相同
+        objAccumulator = self.GetAccumulator()
+        for isoform_count, gene_count in objAccumulator.to_dict().items():
+            self.dictIsoFormCountGeneDistribution[isoform_count] = self.dictIsoFormCountGeneDistribution.get(isoform_count, 0) + gene_count
         return self.dictIsoFormCountGeneDistribution
+    def GetAccumulator(self) -> CountAccumulator:
+        """
+            `CountAccumulator` of isoform_count (for merge with other shard / process)
+        """
+        return CountAccumulator('isoform_count', value_name='gene_count').update(self.data)
     def GetFormatDistribution(self, how="DataFrame") -> DataFrame | Dict:
         """
             GetFormatDistribution:
@@ -185,6 +649,40 @@ class AnalayGeneIsoForm(object):
         else:
             return self.dictIsoFormCountGeneDistribution
 
+# NOTE: BLAST description 解析 (ex: `XM_020715060.1 PREDICTED: Phalaenopsis equestris midasin-like (LOC110017904), mRNA`)
+#       accession : 第一個欄位 ; organism : accession (與 `PREDICTED:`) 之後的屬名 + 種名 ; gene_symbol : 最後一個括號內容
+ANNOTATION_PATTERNS = {
+    'accession'   : re.compile(r'^(\S+)'),
+    'organism'    : re.compile(r'^\S+\s+(?:PREDICTED:\s+)?([A-Z][a-z]+ [a-z]+)'),
+    'gene_symbol' : re.compile(r'\(([^()\s]+)\)[^()]*$'),
+}
+ANNOTATION_LEVELS = ['annotation'] + list(ANNOTATION_PATTERNS)
+
+def parseAnnotation(annotations: Series | List[str]) -> DataFrame:
+    """
+        Parse BLAST description to accession / organism / gene_symbol (`category` columns)
+            - only parse each unique description once (codes of repeated description are shared)
+            - not matched / NaN -> NaN
+            - example :
+                >>> parseAnnotation(data['annotation'])
+                    annotation	accession	organism	gene_symbol
+                0	XM_020715060.1 PREDICTED: Phalaenopsis equestr...	XM_020715060.1	Phalaenopsis equestris	LOC110017904
+                ...
+    """
+    if not isinstance(annotations, Series):
+        annotations = pd.Series(annotations)
+    codes, uniques = pd.factorize(annotations)
+    srsUniques = pd.Series(uniques, dtype=object)
+    dictColumns = {'annotation' : pd.Categorical.from_codes(codes, categories=uniques)}
+    for level, pattern in ANNOTATION_PATTERNS.items():
+        srsParsed = srsUniques.str.extract(pattern, expand=False)
+        # NOTE: 以 unique description 的解析結果再 factorize (categories 依第一次出現順序)
+        level_codes, level_uniques = pd.factorize(srsParsed)
+        dictColumns[level] = pd.Categorical.from_codes(
+            np.append(level_codes, -1)[codes], categories=level_uniques
+        )
+    return pd.DataFrame(dictColumns, index=annotations.index)
+
 class StaticAnnotationGene(object):
     """
         StaticAnnotationGene:
@@ -200,10 +698,17 @@ class StaticAnnotationGene(object):
         ---
                     dict (key: annotation, value: gene_count; Static) \n
                     or DataFrame (annotation, gene_count; to_DataFrame)
+        ---
+                `vectorized aggregation` (for large annotation table):
+        ---
+                    `Parse` : accession / organism / gene_symbol of annotation (`category`, parse once) \n
+                    `CountBy(level)` : DataFrame (level, gene_count) ; level : annotation, accession, organism, gene_symbol \n
+                    `TopK(k, level)` : k most count of level (bounded heap)
     """
     def __init__(self, data: DataFrame) -> None:
         self.data = data
         self.dictAnnotationGene = dict()
+        self.data_parsed = None
     @property
     def Static(self) -> Dict[str, int]:
         """
@@ -231,12 +736,16 @@ class StaticAnnotationGene(object):
                 'XM_020720713.1 PREDICTED: Phalaenopsis equestris uncharacterized LOC110021972 (LOC110021972), transcript variant X1, mRNA': 1,
                 ...}
         """
-        for index, row in self.data.iterrows():
-            annotation = row['annotation']
-            if annotation not in self.dictAnnotationGene:
-                self.dictAnnotationGene[annotation] = 0
-            self.dictAnnotationGene[annotation] += 1
+        # NOTE: 以 `CountAccumulator` (value_counts) 取代 iterrows，結果 (含 key 順序) 相同
+        objAccumulator = self.GetAccumulator()
+        for annotation, gene_count in objAccumulator.to_dict().items():
+            self.dictAnnotationGene[annotation] = self.dictAnnotationGene.get(annotation, 0) + gene_count
         return self.dictAnnotationGene
+    def GetAccumulator(self) -> CountAccumulator:
+        """
+            `CountAccumulator` of annotation (for merge with other shard / process)
+        """
+        return CountAccumulator('annotation', value_name='gene_count').update(self.data)
     @property
     def to_DataFrame(self):
         """
@@ -268,4 +777,50 @@ class StaticAnnotationGene(object):
             }
         )
         return data
+    def Parse(self) -> DataFrame:
+        """
+            Parse annotation once (see `parseAnnotation`)
+                - output: DataFrame (annotation, accession, organism, gene_symbol ; `category`, same index as data)
+        """
+        if self.data_parsed is None:
+            self.data_parsed = parseAnnotation(self.data['annotation'])
+        return self.data_parsed
+    def _level_counts(self, level: str) -> Tuple[List, np.ndarray]:
+        """
+            (categories, gene_count of each category) of level (NaN is not counted)
+        """
+        if level not in ANNOTATION_LEVELS:
+            raise ValueError("Error: level must be one of {}".format(ANNOTATION_LEVELS))
+        srsLevel = self.Parse()[level]
+        codes = srsLevel.cat.codes.to_numpy()
+        listCategories = srsLevel.cat.categories.tolist()
+        return listCategories, np.bincount(codes[codes >= 0], minlength=len(listCategories))
+    def CountBy(self, level: str = 'annotation') -> DataFrame:
+        """
+            Count gene of each annotation / accession / organism / gene_symbol (vectorized)
+                - output: DataFrame (level, gene_count) ; order : first appearance
+            ---
+            example
+            ---
+                >>> objStaticAnnotationGene.CountBy('organism')
+                    organism	gene_count
+                0	Phalaenopsis equestris	80211
+                1	Dendrobium catenatum	5123
+                ...
+        """
+        listCategories, counts = self._level_counts(level)
+        return pd.DataFrame({level : listCategories, 'gene_count' : counts})
+    def TopK(self, k: int = 10, level: str = 'annotation') -> DataFrame:
+        """
+            k most gene_count of level (`heapq.nlargest`, heap size is k)
+                - output: DataFrame (level, gene_count) ; order : gene_count (desc), same count keep first appearance
+        """
+        listCategories, counts = self._level_counts(level)
+        listTop = heapq.nlargest(k, range(len(counts)), key=counts.__getitem__)
+        return pd.DataFrame(
+            {
+                level        : [listCategories[index] for index in listTop],
+                'gene_count' : counts[listTop].astype(np.int64)
+            }
+        )
 
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""
+Persistent parsed-reference cache (opt-in) :
+
+    1. first load : parse fasta once, save to cache directory
+        - `seq.bin` : all sequence (processed by `force_upper`) concatenated, no line break
+        - `offset.npy` : offset and length of each record ; `names.txt` : key of each record
+    2. next load : `mmap` cached `seq.bin` (not parse fasta again)
+---
+Abstract:
+    - cache key : path, size, mtime, sampled content hash of fasta (+ `force_upper` / `ignore_seq_info`)
+        - fasta changed -> key changed -> old cache of the same path is removed
+    - cache directory is bounded by `max_bytes` (remove least recently used cache first)
+    - example :
+        >>> dictGenome = fasta.readAsDict("..genome.fa", cache_dir="~/.cache/AnalysisTool")
+        >>> dictGenome
+        <CachedReference ..genome.fa (2 records)>
+        >>> dictGenome['L01'][:4]
+        'ATCG'
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+from collections.abc import Mapping
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from . import fasta
+
+# NOTE: 內容 hash 只取樣 (檔頭、檔中、檔尾各 1 MB)，避免每次開檔都要讀完整個 genome
+HASH_SAMPLE_SIZE = 1 << 20
+DEFAULT_MAX_BYTES = 20 << 30
+
+
+def fingerprint(fasta_file: str, force_upper: bool = True, ignore_seq_info: bool = True) -> str:
+    """
+    cache key of fasta file :
+        sha1 of (absolute path, size, mtime, sampled content, options)
+    """
+    path = os.path.abspath(fasta_file)
+    stat = os.stat(path)
+    digest = hashlib.sha1()
+    digest.update(json.dumps([path, stat.st_size, stat.st_mtime_ns, force_upper, ignore_seq_info]).encode())
+    with open(path, 'rb') as f:
+        for position in sorted({0, max(stat.st_size // 2 - HASH_SAMPLE_SIZE // 2, 0), max(stat.st_size - HASH_SAMPLE_SIZE, 0)}):
+            f.seek(position)
+            digest.update(f.read(HASH_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+class CachedReference(Mapping):
+    '''
+    CachedReference :
+        dict-like object of cached reference (`mmap` of `seq.bin`)
+    ---
+        - same interface as `faidx.FastaIndex` (keys, len, `__getitem__`, getLength, fetch)
+        - `__getitem__` slice from mmap (not cached in python memory)
+    '''
+
+    def __init__(self, cache_path: str, fasta_file: Optional[str] = None) -> None:
+        self.cache_path = cache_path
+        self.fasta_file = fasta_file
+        with open(os.path.join(cache_path, 'names.txt'), 'r') as f:
+            listNames = f.read().split('\n')[:-1]
+        arrayOffsets = np.load(os.path.join(cache_path, 'offset.npy'))
+        self.dictRecords: Dict[str, Tuple[int, int]] = {
+            name: (int(offset), int(length)) for name, (offset, length) in zip(listNames, arrayOffsets)
+        }
+        self._handle = None
+        self._mm = None
+        seq_file = os.path.join(cache_path, 'seq.bin')
+        if os.path.getsize(seq_file) > 0:
+            self._handle = open(seq_file, 'rb')
+            self._mm = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __repr__(self):
+        return '<CachedReference %s (%d records)>' % (self.fasta_file or self.cache_path, len(self))
+
+    def __getitem__(self, key: str) -> str:
+        offset, length = self.dictRecords[key]
+        return self._mm[offset:offset + length].decode() if length else ''
+
+    def __iter__(self):
+        return iter(self.dictRecords)
+
+    def __len__(self):
+        return len(self.dictRecords)
+
+    def __contains__(self, key):
+        return key in self.dictRecords
+
+    def getLength(self, key: str) -> int:
+        return self.dictRecords[key][1]
+
+    def fetch(self, chrom: str, start: int = 0, end: Optional[int] = None, strand: str = '+') -> str:
+        """ fetch subsequence (0-based, exclude end ; reverse complement if strand is `-`) """
+        offset, length = self.dictRecords[chrom]
+        start = min(max(start, 0), length)
+        end = length if end is None else min(max(end, start), length)
+        sequence = self._mm[offset + start:offset + end].decode() if end > start else ''
+        return fasta.reverse_complement(sequence) if strand == '-' else sequence
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._handle.close()
+            self._mm = self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ReferenceCache(object):
+    """
+    ReferenceCache :
+        cache directory of parsed reference
+    ---
+        - `load(fasta_file)` : return `CachedReference` (build cache if not exists)
+        - `evict()` : remove least recently used cache until size <= `max_bytes`
+        - `clear()` : remove all cache
+    ---
+        example :
+        >>> objReferenceCache = ReferenceCache("~/.cache/AnalysisTool", max_bytes=50 << 30)
+        >>> dictGenome = objReferenceCache.load("..genome.fa")
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def load(self, fasta_file: str, force_upper: bool = True, ignore_seq_info: bool = True) -> CachedReference:
+        """ load cached reference (parse fasta and build cache at first time) """
+        key = fingerprint(fasta_file, force_upper, ignore_seq_info)
+        cache_path = os.path.join(self.cache_dir, key)
+        if not os.path.exists(os.path.join(cache_path, 'meta.json')):
+            self._removeSource(fasta_file, force_upper, ignore_seq_info)
+            self._build(fasta_file, cache_path, force_upper, ignore_seq_info)
+            self.evict(keep=key)
+        # NOTE: 用 meta.json 的 mtime 記錄最後使用時間 (LRU)
+        os.utime(os.path.join(cache_path, 'meta.json'))
+        return CachedReference(cache_path, fasta_file)
+
+    def _build(self, fasta_file: str, cache_path: str, force_upper: bool, ignore_seq_info: bool) -> None:
+        """ parse fasta and write cache (write temp directory first, then rename) """
+        temp_path = tempfile.mkdtemp(dir=self.cache_dir, prefix='.building-')
+        try:
+            listNames: List[str] = []
+            listOffsets: List[Tuple[int, int]] = []
+            offset = 0
+            with fasta.openFasta(fasta_file) as f, \
+                    open(os.path.join(temp_path, 'seq.bin'), 'wb') as seq_file:
+                for record in fasta.Fasta(f):
+                    name, sequence = fasta._recordItem(record, force_upper, ignore_seq_info)
+                    data = sequence.encode()
+                    seq_file.write(data)
+                    listNames.append(name)
+                    listOffsets.append((offset, len(data)))
+                    offset += len(data)
+            with open(os.path.join(temp_path, 'names.txt'), 'w') as f:
+                f.write(''.join(name + '\n' for name in listNames))
+            np.save(os.path.join(temp_path, 'offset.npy'), np.array(listOffsets, dtype=np.int64).reshape(-1, 2))
+            with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+                json.dump({
+                    'source': os.path.abspath(fasta_file),
+                    'force_upper': force_upper,
+                    'ignore_seq_info': ignore_seq_info,
+                    'created': time.time(),
+                }, f)
+            try:
+                os.replace(temp_path, cache_path)
+            except OSError:
+                # NOTE: 其他 process 同時建立並先完成 (cache_path 已存在) -> 用已建好的 cache
+                if not os.path.exists(os.path.join(cache_path, 'meta.json')):
+                    raise
+                shutil.rmtree(temp_path, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+
+    def _iterEntries(self):
+        """ yield (cache_path, meta, size, last_used) of each cache """
+        for key in os.listdir(self.cache_dir):
+            cache_path = os.path.join(self.cache_dir, key)
+            meta_file = os.path.join(cache_path, 'meta.json')
+            if key.startswith('.') or not os.path.exists(meta_file):
+                continue
+            with open(meta_file, 'r') as f:
+                meta = json.load(f)
+            size = sum(
+                os.path.getsize(os.path.join(cache_path, name)) for name in os.listdir(cache_path)
+            )
+            yield cache_path, meta, size, os.path.getmtime(meta_file)
+
+    def _removeSource(self, fasta_file: str, force_upper: bool, ignore_seq_info: bool) -> None:
+        """ remove old cache of the same fasta (fasta changed -> cache invalid) """
+        source = os.path.abspath(fasta_file)
+        for cache_path, meta, _, _ in list(self._iterEntries()):
+            if meta['source'] == source and meta['force_upper'] == force_upper and \
+                    meta['ignore_seq_info'] == ignore_seq_info:
+                shutil.rmtree(cache_path, ignore_errors=True)
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """
+        remove least recently used cache until total size <= `max_bytes` :
+            - keep : cache key not to remove (ex: just built)
+            - output : list of removed cache path
+        """
+        listEntries = sorted(self._iterEntries(), key=lambda entry: entry[3])
+        total = sum(entry[2] for entry in listEntries)
+        listRemoved = []
+        for cache_path, _, size, _ in listEntries:
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(cache_path) == keep:
+                continue
+            shutil.rmtree(cache_path, ignore_errors=True)
+            listRemoved.append(cache_path)
+            total -= size
+        return listRemoved
+
+    def clear(self) -> None:
+        """ remove all cache """
+        for cache_path, _, _, _ in list(self._iterEntries()):
+            shutil.rmtree(cache_path, ignore_errors=True)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+"""
+Compressed input (gzip / BGZF / zstd) for `fasta` and `faidx` :
+
+    1. `detectCompression` check magic bytes of file (not file extension)
+    2. `openFasta` open file as binary stream, decompress in background thread
+        (parse and decompress at the same time)
+    3. `BgzfReader` random access of BGZF (bgzip) file by `.gzi` index
+---
+Abstract:
+    - gzip / BGZF : python `gzip` (standard library)
+    - zstd : need `zstandard` package (`pip install zstandard`)
+    - example :
+        >>> compress.detectCompression("..genome.fa.gz")
+        'bgzf'
+        >>> with compress.openFasta("..genome.fa.gz") as f:
+        ...     for record in fasta.Fasta(f):
+        ...         ...
+"""
+
+from __future__ import annotations
+from typing import List, Optional, Tuple
+import bisect
+import gzip
+import os
+import queue
+import struct
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def detectCompression(file_path: str) -> Optional[str]:
+    """
+    detect compression of file by magic bytes :
+        output : 'bgzf', 'gzip', 'zstd' or None (not compressed)
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(18)
+    if head[:2] == GZIP_MAGIC:
+        # NOTE: BGZF 為 gzip 加上 extra field `BC` (記錄 block size)
+        if len(head) >= 14 and head[3] & 4 and head[12:14] == b'BC':
+            return 'bgzf'
+        return 'gzip'
+    if head[:4] == ZSTD_MAGIC:
+        return 'zstd'
+    return None
+
+
+def _openStream(file_path: str, compression: Optional[str]):
+    """ open (decompress) stream of file by compression type """
+    if compression in ('gzip', 'bgzf'):
+        return gzip.open(file_path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("Error: read zstd file need `zstandard` (pip install zstandard)")
+        handle = open(file_path, 'rb')
+        return zstandard.ZstdDecompressor().stream_reader(handle, closefd=True)
+    return open(file_path, 'rb')
+
+
+class ThreadedReader:
+    '''
+    file-like object (binary), decompress blocks in background thread :
+        - `read(size)` get decompressed bytes from queue
+        - zlib / zstd release GIL, so decompress and parse can run at the same time
+    '''
+
+    def __init__(self, stream, block_size: int = 1 << 22, max_blocks: int = 4):
+        self.stream = stream
+        self.block_size = block_size
+        self._queue = queue.Queue(maxsize=max_blocks)
+        self._buffer = b''
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _produce(self):
+        try:
+            while not self._stop.is_set():
+                block = self.stream.read(self.block_size)
+                self._put(block)
+                if not block:
+                    break
+        except Exception as error:
+            self._put(error)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _next(self) -> bytes:
+        item = self._queue.get()
+        if isinstance(item, Exception):
+            raise item
+        if not item:
+            self._eof = True
+        return item
+
+    def read(self, size: int = -1) -> bytes:
+        listParts = [self._buffer]
+        length = len(self._buffer)
+        while not self._eof and (size < 0 or length < size):
+            block = self._next()
+            listParts.append(block)
+            length += len(block)
+        data = b''.join(listParts)
+        if size < 0:
+            self._buffer = b''
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def openFasta(file_path: str, threaded: bool = True):
+    """
+    open fasta file (auto detect compression) as binary stream :
+        input : file path
+        output : file-like object (`read(size)`) ; please use `with`
+            - not compressed : normal file object
+            - compressed : decompress in background thread (set `threaded` false to disable)
+        example :
+        >>> with compress.openFasta("..genome.fa.zst") as f:
+        ...     listRecords = list(fasta.Fasta(f))
+    """
+    compression = detectCompression(file_path)
+    stream = _openStream(file_path, compression)
+    if compression is None or not threaded:
+        return stream
+    return ThreadedReader(stream)
+
+
+# NOTE: BGZF 隨機存取 (samtools `.gzi` 格式)
+# `.gzi` : uint64 entry 數量 + 每個 block 的 (compressed_offset, uncompressed_offset)
+# (不包含第一個 block (0, 0))
+def _iterBgzfBlocks(file_path: str):
+    """ yield (compressed_offset, block_size, uncompressed_size) of each BGZF block """
+    with open(file_path, 'rb') as f:
+        offset = 0
+        while True:
+            header = f.read(18)
+            if not header:
+                break
+            if len(header) < 18 or header[:2] != GZIP_MAGIC or header[12:14] != b'BC':
+                raise ValueError("Error: '{}' is not BGZF (please compress by bgzip)".format(file_path))
+            block_size = struct.unpack('<H', header[16:18])[0] + 1
+            f.seek(offset + block_size - 4)
+            uncompressed_size = struct.unpack('<I', f.read(4))[0]
+            yield offset, block_size, uncompressed_size
+            offset += block_size
+
+
+def buildGzi(file_path: str, gzi_file: Optional[str] = None, write: bool = True) -> List[Tuple[int, int]]:
+    """
+    build `.gzi` index of BGZF file (samtools / bgzip compatible) :
+        output : [(compressed_offset, uncompressed_offset), ...] (include first block)
+    """
+    listBlocks = []
+    uncompressed_offset = 0
+    for compressed_offset, block_size, uncompressed_size in _iterBgzfBlocks(file_path):
+        if uncompressed_size == 0:
+            continue
+        listBlocks.append((compressed_offset, uncompressed_offset))
+        uncompressed_offset += uncompressed_size
+    if write:
+        writeGzi(listBlocks, gzi_file or file_path + '.gzi')
+    return listBlocks
+
+
+def writeGzi(listBlocks: List[Tuple[int, int]], gzi_file: str) -> None:
+    """ write `.gzi` index (first block (0, 0) is not written) """
+    with open(gzi_file, 'wb') as f:
+        f.write(struct.pack('<Q', max(len(listBlocks) - 1, 0)))
+        for block in listBlocks[1:]:
+            f.write(struct.pack('<QQ', *block))
+
+
+def readGzi(gzi_file: str) -> List[Tuple[int, int]]:
+    """ read `.gzi` index (add first block (0, 0)) """
+    with open(gzi_file, 'rb') as f:
+        count = struct.unpack('<Q', f.read(8))[0]
+        data = f.read(16 * count)
+    return [(0, 0)] + [struct.unpack_from('<QQ', data, 16 * i) for i in range(count)]
+
+
+class BgzfReader:
+    '''
+    random access BGZF file by uncompressed offset :
+        - `reader[start:end]` return uncompressed bytes (like mmap of uncompressed file)
+        - only decompress blocks cover the range (last block is cached)
+        example :
+        >>> reader = BgzfReader("..genome.fa.gz")
+        >>> reader[0:10]
+        b'>L01\\nATCGA'
+        p.s. : `.gzi` is built if not exists (write_index : write it ; can not write -> only keep in memory)
+    '''
+
+    def __init__(self, file_path: str, gzi_file: Optional[str] = None, write_index: bool = True):
+        gzi_file = gzi_file or file_path + '.gzi'
+        if os.path.exists(gzi_file) and os.path.getmtime(gzi_file) >= os.path.getmtime(file_path):
+            listBlocks = readGzi(gzi_file)
+        else:
+            listBlocks = buildGzi(file_path, write=False)
+            if write_index:
+                try:
+                    writeGzi(listBlocks, gzi_file)
+                except OSError:
+                    # NOTE: 無法寫入 (唯讀目錄等)，只用記憶體中的 index
+                    pass
+        self.file_path = file_path
+        self._compressed = [block[0] for block in listBlocks]
+        self._uncompressed = [block[1] for block in listBlocks]
+        self._handle = open(file_path, 'rb')
+        self._cache_index = -1
+        self._cache_data = b''
+
+    def _block(self, index: int) -> bytes:
+        """ decompress block `index` """
+        if index != self._cache_index:
+            self._handle.seek(self._compressed[index])
+            header = self._handle.read(18)
+            block_size = struct.unpack('<H', header[16:18])[0] + 1
+            payload = self._handle.read(block_size - 18)
+            self._cache_data = zlib.decompress(payload[:-8], -15)
+            self._cache_index = index
+        return self._cache_data
+
+    def __getitem__(self, key: slice) -> bytes:
+        start, end = max(key.start or 0, 0), key.stop
+        if end is None or end <= start or not self._uncompressed:
+            return b''
+        index = bisect.bisect_right(self._uncompressed, start) - 1
+        listParts = []
+        position = start
+        while position < end and index < len(self._uncompressed):
+            data = self._block(index)
+            block_start = self._uncompressed[index]
+            listParts.append(data[position - block_start:end - block_start])
+            position = block_start + len(data)
+            index += 1
+        return b''.join(listParts)
+
+    def close(self):
+        self._handle.close()
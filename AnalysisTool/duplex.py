@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Vectorized mature / star duplex validation (for candidate precursors) :
+
+    1. `DuplexValidator` take hairpin pair tables (`structure.StructureBatch`)
+        and mature / star position (`template.Mature` / `template.Star`)
+    2. compute criteria of all candidates at once (array operation, no loop per candidate) :
+        - 3' overhang of both duplex ends (default : 2 nt)
+        - mismatch (symmetric unpaired) / bulge (asymmetric unpaired) count and size
+        - loop length (bases between 5p and 3p arm)
+    3. output : filter mask + diagnostics DataFrame (one row per candidate)
+---
+Abstract:
+    - only pairs between the two arms are duplex pairs (pair to other place = unpaired)
+    - overhang : 3p arm 3' end = (3p end - partner of first 5p paired site) - (first 5p paired site - 5p start)
+                 5p arm 3' end = (5p end - last 5p paired site) - (partner of last 5p paired site - 3p start)
+    - example :
+        >>> objDuplexValidator = DuplexValidator(table.HairpinTable.fromRNAfold("..hairpin.fold"))
+        >>> mask, pdfDiagnostics = objDuplexValidator.validate(hairpin_indexes, listMatures, listStars)
+        >>> pdfDiagnostics
+            hairpin	mature_arm	overhang_5p	overhang_3p	mismatch	bulge	bulge_size	loop_length	paired	passed
+        0	0	5p	2	2	1	0	0	35	19	True
+"""
+
+from __future__ import annotations
+from typing import Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .table import HairpinTable
+
+
+class DuplexValidator(object):
+    """
+    DuplexValidator :
+        batch validation of mature / star duplex on hairpin structure
+    ---
+        - hairpins : `table.HairpinTable` or list of `template.Hairpin` (need `struct`)
+        - `validate(hairpin_indexes, matures, stars)` : mature / star are `template.Mature` / `template.Star`
+            position is genome position (1-based, include end) if hairpin has position,
+            else position in hairpin sequence (1-based, include end)
+        - `validateSites(...)` : same by local sites (0-based, include end) of 5p / 3p arm
+    ---
+        args :
+            overhang : 3' overhang of both ends (default : 2)
+            max_mismatch : max mismatch count (default : 4)
+            max_bulge : max number of bulge (default : 1)
+            max_bulge_size : max total bulge size (default : 2)
+            min_loop_length : min loop length (default : 3)
+    """
+    def __init__(self, hairpins, overhang: int = 2, max_mismatch: int = 4, max_bulge: int = 1,
+                 max_bulge_size: int = 2, min_loop_length: int = 3) -> None:
+        if not isinstance(hairpins, HairpinTable):
+            hairpins = HairpinTable.fromObjects(hairpins)
+        self.hairpins = hairpins
+        self.objStructureBatch = hairpins.structureBatch()
+        self.overhang = overhang
+        self.max_mismatch = max_mismatch
+        self.max_bulge = max_bulge
+        self.max_bulge_size = max_bulge_size
+        self.min_loop_length = min_loop_length
+
+    def localSites(self, hairpin_indexes: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ position (1-based, include end) to hairpin local site (0-based, include end) """
+        hairpin_start = self.hairpins.start[hairpin_indexes]
+        hairpin_end = self.hairpins.end[hairpin_indexes]
+        minus = self.hairpins.strand[hairpin_indexes] == -1
+        has_position = hairpin_start >= 0
+        local_start = np.where(has_position, np.where(minus, hairpin_end - ends, starts - hairpin_start), starts - 1)
+        local_end = np.where(has_position, np.where(minus, hairpin_end - starts, ends - hairpin_start), ends - 1)
+        return local_start, local_end
+
+    def validate(self, hairpin_indexes: Sequence[int], matures: Sequence, stars: Sequence) -> Tuple[np.ndarray, pd.DataFrame]:
+        """ (mask, diagnostics) of candidates (`template.Mature` / `template.Star` with position) """
+        hairpin_indexes = np.asarray(hairpin_indexes, dtype=np.int64)
+        mature_start, mature_end = self.localSites(
+            hairpin_indexes,
+            np.array([mature.position.start for mature in matures], dtype=np.int64),
+            np.array([mature.position.end for mature in matures], dtype=np.int64),
+        )
+        star_start, star_end = self.localSites(
+            hairpin_indexes,
+            np.array([star.position.start for star in stars], dtype=np.int64),
+            np.array([star.position.end for star in stars], dtype=np.int64),
+        )
+        # NOTE: 位置較前面的為 5p arm
+        mature_5p = mature_start <= star_start
+        mask, pdfDiagnostics = self.validateSites(
+            hairpin_indexes,
+            np.where(mature_5p, mature_start, star_start), np.where(mature_5p, mature_end, star_end),
+            np.where(mature_5p, star_start, mature_start), np.where(mature_5p, star_end, mature_end),
+        )
+        pdfDiagnostics.insert(1, 'mature_arm', np.where(mature_5p, '5p', '3p'))
+        return mask, pdfDiagnostics
+
+    def validateSites(self, hairpin_indexes, five_starts, five_ends, three_starts, three_ends) -> Tuple[np.ndarray, pd.DataFrame]:
+        """ (mask, diagnostics) of candidates by local sites of 5p / 3p arm (0-based, include end) """
+        hairpin_indexes = np.asarray(hairpin_indexes, dtype=np.int64)
+        five_starts, five_ends = np.asarray(five_starts, dtype=np.int64), np.asarray(five_ends, dtype=np.int64)
+        three_starts, three_ends = np.asarray(three_starts, dtype=np.int64), np.asarray(three_ends, dtype=np.int64)
+        count = len(hairpin_indexes)
+        lengths = self.objStructureBatch.lengths[hairpin_indexes]
+        valid = (five_starts >= 0) & (five_ends >= five_starts) & (three_starts > five_ends) & \
+            (three_ends >= three_starts) & (three_ends < lengths)
+
+        # NOTE: 展開所有 candidate 的 5p arm site (ragged range)
+        arm_lengths = np.where(valid, five_ends - five_starts + 1, 0)
+        candidates = np.repeat(np.arange(count), arm_lengths)
+        sites = np.arange(arm_lengths.sum()) - np.repeat(np.cumsum(arm_lengths) - arm_lengths, arm_lengths) + \
+            five_starts[candidates]
+        partners = self.objStructureBatch.partners[self.objStructureBatch.offsets[hairpin_indexes[candidates]] + sites]
+        in_duplex = (partners >= three_starts[candidates]) & (partners <= three_ends[candidates])
+        candidates, sites, partners = candidates[in_duplex], sites[in_duplex], partners[in_duplex].astype(np.int64)
+        paired = np.bincount(candidates, minlength=count)
+
+        # NOTE: 每個 candidate 第一個 / 最後一個 duplex pair
+        has_pair = paired > 0
+        first = np.cumsum(paired) - paired
+        last = first + paired - 1
+        overhang_3p = np.full(count, -1, dtype=np.int64)
+        overhang_5p = np.full(count, -1, dtype=np.int64)
+        first, last = first[has_pair], last[has_pair]
+        overhang_3p[has_pair] = (three_ends[has_pair] - partners[first]) - (sites[first] - five_starts[has_pair])
+        overhang_5p[has_pair] = (five_ends[has_pair] - sites[last]) - (partners[last] - three_starts[has_pair])
+
+        # NOTE: 相鄰兩個 pair 間 5p / 3p 的未配對數 : 相同 -> mismatch ; 不同 -> bulge
+        same = candidates[1:] == candidates[:-1]
+        gap_5p = (sites[1:] - sites[:-1] - 1)[same]
+        gap_3p = (partners[:-1] - partners[1:] - 1)[same]
+        step_candidates = candidates[1:][same]
+        mismatch = np.bincount(step_candidates, weights=np.minimum(gap_5p, gap_3p), minlength=count).astype(np.int64)
+        bulge = np.bincount(step_candidates, weights=gap_5p != gap_3p, minlength=count).astype(np.int64)
+        bulge_size = np.bincount(step_candidates, weights=np.abs(gap_5p - gap_3p), minlength=count).astype(np.int64)
+        loop_length = three_starts - five_ends - 1
+
+        pdfDiagnostics = pd.DataFrame({
+            'hairpin'     : hairpin_indexes,
+            'overhang_5p' : overhang_5p,
+            'overhang_3p' : overhang_3p,
+            'mismatch'    : mismatch,
+            'bulge'       : bulge,
+            'bulge_size'  : bulge_size,
+            'loop_length' : loop_length,
+            'paired'      : paired,
+        })
+        pdfDiagnostics['pass_overhang'] = valid & has_pair & (overhang_5p == self.overhang) & (overhang_3p == self.overhang)
+        pdfDiagnostics['pass_mismatch'] = mismatch <= self.max_mismatch
+        pdfDiagnostics['pass_bulge'] = (bulge <= self.max_bulge) & (bulge_size <= self.max_bulge_size)
+        pdfDiagnostics['pass_loop'] = valid & (loop_length >= self.min_loop_length)
+        mask = pdfDiagnostics[['pass_overhang', 'pass_mismatch', 'pass_bulge', 'pass_loop']].all(axis=1).to_numpy()
+        pdfDiagnostics['passed'] = mask
+        return mask, pdfDiagnostics
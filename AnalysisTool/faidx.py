@@ -0,0 +1,471 @@
+#!/usr/bin/env python
+"""
+Indexed (random access) FASTA :
+
+    1. `buildIndex` scan fasta file once and write `.fai` (samtools faidx compatible)
+    2. `FastaIndex` open fasta file by `mmap` and behave like dict of `fasta.readAsDict`
+        - only read sequence of record which you query (lazy)
+        - resident memory proportional to the records you touched
+---
+Abstract:
+    - `.fai` columns : NAME, LENGTH, OFFSET, LINEBASES, LINEWIDTH
+    - BGZF (bgzip) fasta : OFFSET is uncompressed offset, read by `compress.BgzfReader` (`.gzi`)
+    - region query : `chrom:start-end[:strand]` (1-based, include end; like samtools)
+        or BED-like tuple `(chrom, start, end[, strand])` (0-based, exclude end)
+    - example :
+        >>> dictGenome = fasta.readAsDict("..genome.fa", lazy=True)
+        >>> dictGenome
+        <FastaIndex ..genome.fa (2 records)>
+        >>> dictGenome['L01'][:4]
+        'ATCG'
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from collections.abc import Mapping
+import mmap
+import os
+import re
+import numpy as np
+from . import fasta
+from . import compress
+
+
+class FaiRecord(NamedTuple):
+    """ one line of `.fai` file """
+    name: str
+    length: int
+    offset: int
+    linebases: int
+    linewidth: int
+
+
+def _iterRecordSpans(buffer) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    yield (header, seq_start, seq_end) of each record in fasta buffer (bytes or mmap)
+        - header : header line without `>` and line break
+        - seq_start / seq_end : byte range of sequence lines (include line break)
+    """
+    size = len(buffer)
+    if size == 0:
+        return
+    if buffer[0:1] == b'>':
+        head_start = 0
+    else:
+        head_start = buffer.find(b'\n>')
+        if head_start == -1:
+            return
+        head_start += 1
+    while head_start != -1:
+        head_end = buffer.find(b'\n', head_start)
+        if head_end == -1:
+            head_end = size
+        header = buffer[head_start + 1:head_end].rstrip(b'\r')
+        seq_start = min(head_end + 1, size)
+        next_head = buffer.find(b'\n>', head_end)
+        seq_end = size if next_head == -1 else next_head + 1
+        yield header, seq_start, seq_end
+        head_start = -1 if next_head == -1 else next_head + 1
+
+
+def _countLineBreaks(buffer, start: int, end: int, chunk_size: int = 1 << 26) -> int:
+    """ count `\\n` and `\\r` in buffer[start:end] (by chunks, avoid copy whole chromosome) """
+    count = 0
+    for chunk_start in range(start, end, chunk_size):
+        chunk = buffer[chunk_start:min(chunk_start + chunk_size, end)]
+        count += chunk.count(b'\n') + chunk.count(b'\r')
+    return count
+
+
+def _isRegularLines(buffer, start: int, end: int, linewidth: int, chunk_size: int = 1 << 26) -> bool:
+    """
+    every line of buffer[start:end] (except the last) is exactly `linewidth` bytes :
+        `\\n` only at `start + k * linewidth - 1` (k = 1, 2, ...) and no line break is missing
+    """
+    count = 0
+    for chunk_start in range(start, end, chunk_size):
+        chunk = np.frombuffer(buffer[chunk_start:min(chunk_start + chunk_size, end)], dtype=np.uint8)
+        positions = np.flatnonzero(chunk == ord('\n')) + (chunk_start - start + 1)
+        if (positions % linewidth).any():
+            return False
+        count += len(positions)
+    return count == (end - start) // linewidth
+
+
+def _headerName(header: bytes) -> str:
+    """ sequence name of `.fai` (first word of header) """
+    return header.decode().split(' ')[0].split('\t')[0]
+
+
+def _indexRecord(buffer, header: bytes, seq_start: int, seq_end: int) -> FaiRecord:
+    """ calculate `.fai` columns of one record, check line length is consistent """
+    name = _headerName(header)
+    # NOTE: 去掉尾端空行 (避免最後一行後面有多餘的換行影響長度判斷)
+    while seq_end > seq_start and buffer[seq_end - 1:seq_end] in (b'\n', b'\r'):
+        seq_end -= 1
+    if seq_end == seq_start:
+        return FaiRecord(name, 0, seq_start, 0, 0)
+
+    first_line_end = buffer.find(b'\n', seq_start, seq_end)
+    if first_line_end == -1:
+        # NOTE: 只有一行序列
+        length = seq_end - seq_start
+        return FaiRecord(name, length, seq_start, length, length + 1)
+    linebases = len(buffer[seq_start:first_line_end].rstrip(b'\r'))
+    linewidth = first_line_end + 1 - seq_start
+    length = (seq_end - seq_start) - _countLineBreaks(buffer, seq_start, seq_end)
+    # NOTE: 總長度符合不代表每行等長 (ex: `ACGT\nAC\nACGT`)，需檢查每個換行的位置
+    if linebases == 0 or \
+            _spanOf(length, linebases, linewidth) != seq_end - seq_start or \
+            not _isRegularLines(buffer, seq_start, seq_end, linewidth):
+        raise ValueError(
+            "Error: different line length in sequence '{}' (can not index)".format(name)
+        )
+    return FaiRecord(name, length, seq_start, linebases, linewidth)
+
+
+def _indexStream(handle) -> List[FaiRecord]:
+    """ build `.fai` records by scan lines of (decompressed) binary stream """
+    listRecords = []
+    offset = 0
+    current = None
+    for line in handle:
+        if line[:1] == b'>':
+            if current is not None:
+                listRecords.append(_finishStreamRecord(current))
+            current = {
+                'name': _headerName(line[1:].rstrip(b'\r\n')), 'offset': offset + len(line),
+                'length': 0, 'linebases': 0, 'linewidth': 0, 'short_line': False,
+            }
+        elif current is not None:
+            bases = len(line.rstrip(b'\r\n'))
+            if bases == 0:
+                current['short_line'] = True
+            elif current['length'] == 0:
+                current['linebases'], current['linewidth'] = bases, len(line)
+            elif current['short_line'] or bases > current['linebases'] or \
+                    (bases == current['linebases'] and line.endswith(b'\n') and len(line) != current['linewidth']):
+                raise ValueError(
+                    "Error: different line length in sequence '{}' (can not index)".format(current['name'])
+                )
+            if bases and bases < current['linebases']:
+                current['short_line'] = True
+            current['length'] += bases
+        offset += len(line)
+    if current is not None:
+        listRecords.append(_finishStreamRecord(current))
+    return listRecords
+
+
+def _finishStreamRecord(current: Dict) -> FaiRecord:
+    if current['length'] == 0:
+        return FaiRecord(current['name'], 0, current['offset'], 0, 0)
+    linewidth = current['linewidth']
+    if linewidth == current['linebases']:
+        # NOTE: 最後一行沒有換行 (與 mmap 版本相同，視為有 `\\n`)
+        linewidth += 1
+    return FaiRecord(current['name'], current['length'], current['offset'], current['linebases'], linewidth)
+
+
+def _spanOf(length: int, linebases: int, linewidth: int) -> int:
+    """ byte span of `length` bases start from the first base of record (not include last line break) """
+    if linebases == 0:
+        return 0
+    full_lines, remainder = divmod(length, linebases)
+    if remainder == 0:
+        return full_lines * linewidth - (linewidth - linebases)
+    return full_lines * linewidth + remainder
+
+
+def _byteOffset(position: int, linebases: int, linewidth: int) -> int:
+    """ byte offset of base `position` (0-based) from the first base of record """
+    line, column = divmod(position, linebases)
+    return line * linewidth + column
+
+
+def buildIndex(fasta_file: str, fai_file: Optional[str] = None, write: bool = True) -> List[FaiRecord]:
+    """
+    build `.fai` index of fasta file (samtools faidx compatible) :
+        input : fasta file path
+        output : list of FaiRecord (name, length, offset, linebases, linewidth)
+        example :
+        >>> faidx.buildIndex("..genome.fa")
+        [FaiRecord(name='L01', length=4, offset=5, linebases=60, linewidth=61), ...]
+    ---
+        args :
+            fasta_file : fasta file path
+            fai_file : output index path (default : `fasta_file + '.fai'`)
+            write : true/false (write index to `fai_file`)
+        p.s. : BGZF (bgzip) fasta can be indexed (offset is uncompressed offset),
+            gzip / zstd can not (no random access)
+    """
+    listRecords = []
+    compression = compress.detectCompression(fasta_file) if os.path.getsize(fasta_file) > 0 else None
+    if compression == 'bgzf':
+        with compress.openFasta(fasta_file, threaded=False) as f:
+            listRecords = _indexStream(f)
+    elif compression is not None:
+        raise ValueError(
+            "Error: can not index {} file '{}' (please compress by bgzip)".format(compression, fasta_file)
+        )
+    elif os.path.getsize(fasta_file) > 0:
+        with open(fasta_file, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for header, seq_start, seq_end in _iterRecordSpans(mm):
+                listRecords.append(_indexRecord(mm, header, seq_start, seq_end))
+    if write:
+        writeIndex(listRecords, fai_file or fasta_file + '.fai')
+    return listRecords
+
+
+def writeIndex(listRecords: List[FaiRecord], fai_file: str) -> None:
+    """ write FaiRecord list to `.fai` file """
+    with open(fai_file, 'w') as f:
+        for record in listRecords:
+            f.write('\t'.join(str(column) for column in record) + '\n')
+
+
+def readIndex(fai_file: str) -> List[FaiRecord]:
+    """ read `.fai` file to list of FaiRecord """
+    listRecords = []
+    with open(fai_file, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            name, length, offset, linebases, linewidth = line.rstrip('\n').split('\t')[:5]
+            listRecords.append(
+                FaiRecord(name, int(length), int(offset), int(linebases), int(linewidth))
+            )
+    return listRecords
+
+
+_REGION_PATTERN = re.compile(r'^(?P<chrom>.+?)(?::(?P<start>[\d,]+)(?:-(?P<end>[\d,]+))?)?(?::(?P<strand>[+-]))?$')
+
+Region = Tuple[str, int, Optional[int], str]
+
+
+def parseRegion(region: str) -> Region:
+    """
+    parse region string to BED-like tuple :
+        input : `chrom`, `chrom:start`, `chrom:start-end` or `chrom:start-end:strand`
+            (1-based, include end; like samtools faidx)
+        output : (chrom, start, end, strand) (0-based, exclude end; end is None if not set)
+        example :
+        >>> parseRegion("L01:11-20:-")
+        ('L01', 10, 20, '-')
+        >>> parseRegion("L01")
+        ('L01', 0, None, '+')
+    """
+    match = _REGION_PATTERN.match(region.strip())
+    if match is None:
+        raise ValueError("Error: can not parse region '{}'".format(region))
+    chrom  = match.group('chrom')
+    start  = match.group('start')
+    end    = match.group('end')
+    strand = match.group('strand') or '+'
+    start  = int(start.replace(',', '')) - 1 if start else 0
+    end    = int(end.replace(',', '')) if end else None
+    if start < 0 or (end is not None and end < start):
+        raise ValueError("Error: invalid region '{}'".format(region))
+    return chrom, start, end, strand
+
+
+def readBed(bed_file: str) -> Iterator[Region]:
+    """
+    read BED file to region tuple :
+        output : (chrom, start, end, strand) ; strand is `+` if BED not have 6th column
+        - skip `#`, `track` and `browser` lines
+    """
+    with open(bed_file, 'r') as f:
+        for line in f:
+            if not line.strip() or line.startswith(('#', 'track', 'browser')):
+                continue
+            columns = line.rstrip('\n').split('\t')
+            strand = columns[5] if len(columns) > 5 and columns[5] in ('+', '-') else '+'
+            yield columns[0], int(columns[1]), int(columns[2]), strand
+
+
+def _indexIsFresh(fasta_file: str, fai_file: str) -> bool:
+    """ `.fai` exists and is not older than fasta file """
+    return os.path.exists(fai_file) and \
+        os.path.getmtime(fai_file) >= os.path.getmtime(fasta_file)
+
+
+class FastaIndex(Mapping):
+    """
+    FastaIndex :
+        lazy, `mmap` backed dict-like object of fasta file
+    ---
+        - keys / len / `in` / iteration : same as dict of `fasta.readAsDict`
+        - `__getitem__` read sequence of one record from file (not cached)
+        - use `.fai` if exists (and newer than fasta), or build it
+        - BGZF (bgzip) fasta : read by `compress.BgzfReader` (use `.gzi` or build it)
+    ---
+        example :
+        >>> dictGenome = FastaIndex("..genome.fa")
+        >>> len(dictGenome)
+        2
+        >>> dictGenome['L01']
+        'ATCG....'
+        >>> dictGenome.getLength('L01')
+        4
+    """
+    def __init__(self, fasta_file: str, force_upper: bool = True, ignore_seq_info: bool = True, fai_file: Optional[str] = None, write_index: bool = True, gzi_file: Optional[str] = None) -> None:
+        """
+            args :
+                fasta_file : fasta file path
+                force_upper / ignore_seq_info : same as `fasta.readAsDict`
+                fai_file : index path (default : `fasta_file + '.fai'`)
+                write_index : true/false (write `.fai` / `.gzi` if index need to build)
+                    can not write (ex: read-only directory) -> only keep index in memory
+                gzi_file : `.gzi` path of BGZF fasta (default : `fasta_file + '.gzi'`)
+        """
+        self.fasta_file      = fasta_file
+        self.fai_file        = fai_file or fasta_file + '.fai'
+        self.force_upper     = force_upper
+        self.ignore_seq_info = ignore_seq_info
+
+        if _indexIsFresh(fasta_file, self.fai_file):
+            listRecords = readIndex(self.fai_file)
+        else:
+            listRecords = buildIndex(fasta_file, self.fai_file, write=False)
+            if write_index:
+                try:
+                    writeIndex(listRecords, self.fai_file)
+                except OSError:
+                    # NOTE: 無法寫入 (唯讀目錄等)，只用記憶體中的 index
+                    pass
+
+        self._handle = None
+        self._mm     = None
+        if os.path.getsize(fasta_file) == 0:
+            pass
+        elif compress.detectCompression(fasta_file) == 'bgzf':
+            self._mm = compress.BgzfReader(fasta_file, gzi_file, write_index=write_index)
+        else:
+            self._handle = open(fasta_file, 'rb')
+            self._mm = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.dictRecords: Dict[str, FaiRecord] = dict()
+        self._dictNameRecords: Dict[str, FaiRecord] = dict()
+        for record in listRecords:
+            key = record.name if ignore_seq_info else self._readHeader(record)
+            self.dictRecords[key] = record
+            self._dictNameRecords[record.name] = record
+
+    def _readHeader(self, record: FaiRecord, window: int = 1024) -> str:
+        """ get full header (`>L01 chr1` -> `L01 chr1`) before sequence offset """
+        while True:
+            window_start = max(record.offset - window, 0)
+            data = self._mm[window_start:record.offset]
+            head_start = data.rfind(b'\n', 0, max(len(data) - 1, 0)) + 1
+            if head_start > 0 or window_start == 0:
+                return data[head_start + 1:].rstrip(b'\r\n').decode()
+            window *= 4
+
+    def __repr__(self):
+        return '<FastaIndex %s (%d records)>' % (self.fasta_file, len(self))
+
+    def __getitem__(self, key: str) -> str:
+        record = self.dictRecords[key]
+        return self._read(record, 0, record.length)
+
+    def __iter__(self):
+        return iter(self.dictRecords)
+
+    def __len__(self):
+        return len(self.dictRecords)
+
+    def __contains__(self, key):
+        return key in self.dictRecords
+
+    def _read(self, record: FaiRecord, start: int, end: int) -> str:
+        """ read bases [start, end) (0-based) of record """
+        start = max(0, start)
+        end   = min(end, record.length)
+        if end <= start:
+            return ''
+        byte_start = record.offset + _byteOffset(start, record.linebases, record.linewidth)
+        byte_end   = record.offset + _byteOffset(end - 1, record.linebases, record.linewidth) + 1
+        raw = self._mm[byte_start:byte_end]
+        sequence = raw.translate(None, b'\r\n').decode()
+        return sequence.upper() if self.force_upper else sequence
+
+    def getLength(self, key: str) -> int:
+        """ length of record (from index, not read sequence) """
+        return self._getRecord(key).length
+
+    def _getRecord(self, chrom: str) -> FaiRecord:
+        """ get record by key (or by sequence name if `ignore_seq_info` is false) """
+        record = self.dictRecords.get(chrom) or self._dictNameRecords.get(chrom)
+        if record is None:
+            raise KeyError(chrom)
+        return record
+
+    def fetch(self, chrom: str, start: int = 0, end: Optional[int] = None, strand: str = '+') -> str:
+        """
+        fetch subsequence (like python slice) :
+            input : chrom, start (0-based), end (exclude; None is end of sequence), strand
+            output : sequence (reverse complement if strand is `-`)
+            example :
+            >>> dictGenome = FastaIndex("..genome.fa")
+            >>> dictGenome.fetch('L01', 0, 4)
+            'ATCG'
+            >>> dictGenome.fetch('L01', 0, 4, '-')
+            'CGAT'
+        """
+        record   = self._getRecord(chrom)
+        sequence = self._read(record, start, record.length if end is None else end)
+        return fasta.reverse_complement(sequence) if strand == '-' else sequence
+
+    def fetchRegion(self, region: str) -> str:
+        """
+        fetch subsequence by region string :
+            >>> dictGenome.fetchRegion('L01:1-4')
+            'ATCG'
+            >>> dictGenome.fetchRegion('L01:1-4:-')
+            'CGAT'
+        """
+        return self.fetch(*parseRegion(region))
+
+    def fetchRegions(self, regions: Iterable[Union[str, Tuple]]) -> List[str]:
+        """
+        fetch many regions (bulk query) :
+            input : list of region string or BED-like tuple (chrom, start, end[, strand])
+                - can mix both in the list, or input `readBed(bed_file)`
+            output : list of sequence (same order as input)
+        ---
+            p.s. query will be sorted by file offset before read,
+                so thousands of query read file sequentially
+        """
+        listRegions = [
+            parseRegion(region) if isinstance(region, str) else tuple(region)
+            for region in regions
+        ]
+        listQueries = []
+        for index, region in enumerate(listRegions):
+            chrom, start = region[0], region[1]
+            record = self._getRecord(chrom)
+            listQueries.append((record.offset + max(0, start), index))
+        listQueries.sort()
+
+        listSequences = [''] * len(listRegions)
+        for _, index in listQueries:
+            chrom, start, end = listRegions[index][:3]
+            strand = listRegions[index][3] if len(listRegions[index]) > 3 else '+'
+            listSequences[index] = self.fetch(chrom, start, end, strand)
+        return listSequences
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -12,12 +12,22 @@ Abstract:
 """
 
 from __future__ import annotations
-from typing import Dict, List, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
 from pandas.core.frame import DataFrame
 import pandas as pd
+import numpy as np
+import os
 from .app import *
+from .faidx import FastaIndex, parseRegion, readIndex
+from .compress import detectCompression, openFasta
+from .packed import PackedSequence
+from .cache import CachedReference, ReferenceCache
 
-def readAsDict(fasta_file: str, force_upper: bool = True, ignore_seq_info: bool = True) -> Dict[str, str]:
+# NOTE: 檔案小於此大小時 `processes` 無效 (直接單核讀取，省去開 process pool 的時間)
+PARALLEL_MIN_SIZE = 64 << 20
+
+def readAsDict(fasta_file: str, force_upper: bool = True, ignore_seq_info: bool = True, lazy: bool = False, processes: Optional[int] = 1, packed: bool = False, cache_dir: Optional[str] = None) -> Dict[str, str] | Dict[str, PackedSequence] | FastaIndex | CachedReference:
     """
     read fasta into dict :
         reference : https://www.biostars.org/p/710/#1414  \n
@@ -43,36 +53,234 @@ def readAsDict(fasta_file: str, force_upper: bool = True, ignore_seq_info: bool
                     ex: >L01 chr1 -> L01
                 set `false` will keep detail
                     ex: >L01 chr1 -> L01 chr1
+            lazy : true/false (return `faidx.FastaIndex`)
+                default : false
+                set `true` will not read all sequence into memory,
+                build (or reuse) `.fai` index and read record when you query it
+                    ex: dictGenome['L01'] -> read `L01` from file by mmap
+            processes : number of process to parse fasta (default : 1)
+                set `None` will use all cpu
+                p.s. file smaller than `PARALLEL_MIN_SIZE` (64 MB) or compressed file
+                always parse by 1 process
+            packed : true/false (value is `packed.PackedSequence`)
+                default : false
+                set `true` will keep sequence by 2 bits per base (+ N / soft-mask run)
+                    ex: dictGenome['L01'][0:4] -> 'ATCG'
+            cache_dir : cache directory (default : None, not use cache)
+                set path will return `cache.CachedReference`,
+                parse fasta only at first time, then `mmap` the cache (see `cache.ReferenceCache`)
+                p.s. can not use with `lazy`, `packed` or `processes` (not 1) -> raise ValueError
+                    (cache is already read on demand, and built by 1 process)
+    ---
+        p.s. : gzip / BGZF / zstd file is auto detected (decompress in background thread),
+            `lazy` only support BGZF (bgzip) for compressed file
     """
+    if cache_dir is not None:
+        if lazy or packed or processes != 1:
+            raise ValueError("Error: `cache_dir` can not use with `lazy`, `packed` or `processes` (not 1)")
+        return ReferenceCache(cache_dir).load(fasta_file, force_upper=force_upper, ignore_seq_info=ignore_seq_info)
+    if lazy:
+        return FastaIndex(fasta_file, force_upper=force_upper, ignore_seq_info=ignore_seq_info)
+
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and os.path.getsize(fasta_file) >= PARALLEL_MIN_SIZE and \
+            detectCompression(fasta_file) is None:
+        return dict(readItemsParallel(fasta_file, processes, force_upper, ignore_seq_info, packed))
 
     SeqDict = {}
-    with open(fasta_file, 'r') as f:
+    with openFasta(fasta_file) as f:
         for record in Fasta(f):
-            #SeqDict[record.head] = \
-            # new : remove detail ex: >L01 chr1 -> >L01
-            chr=record.head
-            if ignore_seq_info:
-                chr=chr.split(' ')[0]
-            SeqDict[chr] = \
-                record.sequence.upper() if force_upper else record.sequence
+            chr, sequence = _recordItem(record, force_upper, ignore_seq_info, packed)
+            SeqDict[chr] = sequence
     return SeqDict
 
 
-def reverse_complement(dna):
+def _recordItem(record: Dna, force_upper: bool, ignore_seq_info: bool, packed: bool = False) -> Tuple[str, str | PackedSequence]:
+    """ convert Dna to (key, sequence) of `readAsDict` """
+    #SeqDict[record.head] = \
+    # new : remove detail ex: >L01 chr1 -> >L01
+    chr=record.head
+    if ignore_seq_info:
+        chr=chr.split(' ')[0]
+    if packed:
+        return chr, PackedSequence(record.sequence, force_upper=force_upper)
+    return chr, record.sequence.upper() if force_upper else record.sequence
+
+
+def splitShards(fasta_file: str, shards: int) -> List[Tuple[int, int]]:
+    """
+    split fasta file to byte ranges, each range start at record header (`>`) :
+        input : fasta file path, number of shards
+        output : [(start, end), ...] (may less than `shards` if record is large)
+        example :
+        >>> fasta.splitShards("..genome.fa", 4)
+        [(0, 262144123), (262144123, 524288331), ...]
+    """
+    size = os.path.getsize(fasta_file)
+    listBoundaries = [0]
+    with open(fasta_file, 'rb') as f:
+        for index in range(1, shards):
+            position = max(size * index // shards, listBoundaries[-1])
+            boundary = _nextHeader(f, position, size)
+            if boundary > listBoundaries[-1]:
+                listBoundaries.append(boundary)
+    if listBoundaries[-1] < size:
+        listBoundaries.append(size)
+    return list(zip(listBoundaries[:-1], listBoundaries[1:]))
+
+
+def _nextHeader(handle, position: int, size: int, block_size: int = 1 << 20) -> int:
+    """ byte offset of first `\\n>` header at or after `position` (file size if not found) """
+    if position <= 0:
+        return 0
+    handle.seek(position - 1)
+    carry = b''
+    offset = position - 1
+    while True:
+        block = handle.read(block_size)
+        if not block:
+            return size
+        found = (carry + block).find(b'\n>')
+        if found != -1:
+            return offset - len(carry) + found + 1
+        carry = block[-1:]
+        offset += len(block)
+
+
+class _ShardReader:
+    ''' file-like object read only `size` bytes of handle (for Fasta) '''
+
+    def __init__(self, handle, size: int):
+        self.handle = handle
+        self.remain = size
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remain:
+            size = self.remain
+        block = self.handle.read(size)
+        self.remain -= len(block)
+        return block
+
+
+def _parseShard(fasta_file: str, start: int, end: int, force_upper: bool, ignore_seq_info: bool, packed: bool = False) -> List[Tuple[str, str]]:
+    """ parse records in byte range [start, end) (run in worker process) """
+    with open(fasta_file, 'rb') as f:
+        f.seek(start)
+        return [
+            _recordItem(record, force_upper, ignore_seq_info, packed)
+            for record in Fasta(_ShardReader(f, end - start))
+        ]
+
+
+def readItemsParallel(fasta_file: str, processes: Optional[int] = None, force_upper: bool = True, ignore_seq_info: bool = True, packed: bool = False) -> Iterator[Tuple[str, str]]:
+    """
+    parse fasta by process pool (split file by `splitShards`) :
+        input : fasta file path, number of process (default : all cpu)
+        output : yield (key, sequence) same order as fasta file
+            - `force_upper`, `ignore_seq_info`, `packed` same as `readAsDict`
+        example :
+        >>> dictGenome = dict(fasta.readItemsParallel("..genome.fa", processes=8))
+    """
+    processes = processes or os.cpu_count() or 1
+    # NOTE: 切成 process 數的 4 倍，避免單一大 shard 拖慢整體
+    listShards = splitShards(fasta_file, processes * 4)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        listFutures = [
+            executor.submit(_parseShard, fasta_file, start, end, force_upper, ignore_seq_info, packed)
+            for start, end in listShards
+        ]
+        for future in listFutures:
+            yield from future.result()
+
+
+def fetchRegions(fasta_file: str, regions: List[str | Tuple], force_upper: bool = True) -> List[str]:
+    """
+    fetch subsequence of regions (not read whole fasta) :
+        input : fasta file path, list of region
+            - region string : `chrom:start-end[:strand]` (1-based, include end)
+            - or BED-like tuple : (chrom, start, end[, strand]) (0-based, exclude end)
+        output : list of sequence (minus strand will be reverse complement)
+        example :
+        >>> fasta.fetchRegions("..genome.fa", ["L01:1-4", "L01:1-4:-", ("L01", 0, 4, "-")])
+        ['ATCG', 'CGAT', 'CGAT']
+
+        p.s. : will build `.fai` index if not exists (see `faidx.FastaIndex`)
+    """
+    with FastaIndex(fasta_file, force_upper=force_upper) as dictGenome:
+        return dictGenome.fetchRegions(regions)
+
+
+# NOTE: 互補表 (含 IUPAC 與 RNA `U`)，建一次重複使用
+_COMPLEMENT_DNA = 'ACGTURYKMBVDHNacgturykmbvdhn', 'TGCAAYRMKVBHDNtgcaayrmkvbhdn'
+_COMPLEMENT_RNA = 'ACGTURYKMBVDHNacgturykmbvdhn', 'UGCAAYRMKVBHDNugcaayrmkvbhdn'
+_COMPLEMENT_TABLE = {
+    False : (str.maketrans(*_COMPLEMENT_DNA), bytes.maketrans(*(t.encode() for t in _COMPLEMENT_DNA))),
+    True  : (str.maketrans(*_COMPLEMENT_RNA), bytes.maketrans(*(t.encode() for t in _COMPLEMENT_RNA))),
+}
+
+
+def reverse_complement(dna, rna: bool = False):
     """
     reverse complement input sequence :
-        input : dna sequence
+        input : dna sequence (str or bytes)
         output : reverse complement sequence
         example :
         >>> reverse_complement("ATCG")
         'CGAT'
+        >>> reverse_complement("AUCG", rna=True)
+        'CGAU'
+
+        p.s. : IUPAC code also complement (R <-> Y, K <-> M, ...),
+            `U` -> `A` ; set `rna` true will output `U` (not `T`) for `A`
     """
-    complement = {'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A',
-                  'a': 't', 'c': 'g', 'g': 'c', 't': 'a'}
-    return ''.join([complement.get(base, base) for base in dna[::-1]])
+    return reverse_complement_batch([dna], rna=rna)[0]
+
+
+def reverse_complement_batch(sequences, rna: bool = False):
+    """
+    reverse complement many sequences :
+        input : list of sequence (str or bytes; can mix)
+            or numpy array of bytes (dtype `S`, ex: np.array([b'ATCG', b'AAC']))
+        output : list of reverse complement sequence (same type as input)
+            or numpy array (dtype `S`) if input is numpy array
+        example :
+        >>> reverse_complement_batch(["ATCG", b"AAC"])
+        ['CGAT', b'GTT']
+    ---
+        p.s. : list use precomputed `translate` table (C level, no per-base python loop),
+            numpy array translate and reverse all sequences at once
+    """
+    table_str, table_bytes = _COMPLEMENT_TABLE[rna]
+    if isinstance(sequences, np.ndarray):
+        return _reverse_complement_array(sequences, table_bytes)
+    return [
+        sequence.translate(table_bytes if isinstance(sequence, (bytes, bytearray)) else table_str)[::-1]
+        for sequence in sequences
+    ]
+
+
+def _reverse_complement_array(sequences: np.ndarray, table_bytes: bytes) -> np.ndarray:
+    """ reverse complement numpy array (dtype `S`) by byte lookup table """
+    sequences = np.asarray(sequences, dtype=np.bytes_)
+    width = sequences.dtype.itemsize
+    if sequences.size == 0 or width == 0:
+        return sequences.copy()
+    codes = sequences.reshape(-1).view(np.uint8).reshape(-1, width)
+    lookup = np.frombuffer(table_bytes, dtype=np.uint8)
+    lengths = (codes != 0).sum(axis=1)
+    if (lengths == width).all():
+        result = lookup[codes[:, ::-1]]
+    else:
+        # NOTE: 每條序列長度不同 (後面補 0)，依各自長度反轉
+        index = lengths[:, None].astype(np.int32) - 1 - np.arange(width, dtype=np.int32)[None, :]
+        valid = index >= 0
+        index += (np.arange(len(codes), dtype=np.int32) * width)[:, None]
+        result = lookup[codes.ravel()[np.where(valid, index, 0)]]
+        result[~valid] = 0
+    return np.ascontiguousarray(result).view('S%d' % width).reshape(sequences.shape)
 
 # 230907 add new def for process dict of fasta (for degradome project)
-def convert_dict_fasta_sequence(dictFasta: Dict[str, str], how: str = "length") -> Dict[str, int] | Dict[str, str]:
+def convert_dict_fasta_sequence(dictFasta: Dict[str, str] | FastaIndex | str, how: str = "length") -> Dict[str, int] | Dict[str, str]:
     """
     calculate string length of each items in dict :
         input : dict of fasta (or other string)
@@ -85,12 +293,118 @@ def convert_dict_fasta_sequence(dictFasta: Dict[str, str], how: str = "length")
         {'L01': 'ATCG', ... }
         >>> calculate_items_len(dictGenome)
         {'L01': 4, ...}
+
+        p.s. : input fasta file path (or `readAsDict(lazy=True)`) for `how="length"`
+            will not read any sequence (see `readLengths`)
+        >>> fasta.convert_dict_fasta_sequence("..genome.fa")
+        {'L01': 4, ...}
     """
     if how == "length":
+        if isinstance(dictFasta, str):
+            return readLengths(dictFasta)
+        if isinstance(dictFasta, (FastaIndex, CachedReference)):
+            return {key: dictFasta.getLength(key) for key in dictFasta}
         return {key: len(value) for key, value in dictFasta.items()}
     else:
         return dictFasta
-    
+
+
+def readLengths(fasta_file: str, ignore_seq_info: bool = True, sidecar: bool = False) -> Dict[str, int]:
+    """
+    read length of each sequence (not read sequence into memory) :
+        input : fasta file path
+        output : { 'seq_id' : length }
+        example :
+        >>> dictTranscriptome_SeqLen = fasta.readLengths("..transcriptome.fa", sidecar=True)
+        >>> dictTranscriptome_SeqLen
+        {'L01': 4, ...}
+    ---
+        args :
+            ignore_seq_info : same as `readAsDict`
+            sidecar : true/false (save result to `fasta_file + '.len'`)
+                next time read `.len` directly (if not older than fasta file)
+    ---
+        p.s. : use `.fai` (if exists and not older than fasta file),
+            or `.len`, or scan file once (only count bases)
+    """
+    fai_file = fasta_file + '.fai'
+    sidecar_file = fasta_file + '.len'
+    if ignore_seq_info and _isFresh(fasta_file, fai_file):
+        return {record.name: record.length for record in readIndex(fai_file)}
+
+    if _isFresh(fasta_file, sidecar_file):
+        listLengths = _readSidecar(sidecar_file)
+    else:
+        with openFasta(fasta_file) as f:
+            listLengths = list(_scanLengths(f))
+        if sidecar:
+            with open(sidecar_file, 'w') as f:
+                for header, length in listLengths:
+                    f.write('{}\t{}\n'.format(header, length))
+
+    dictLengths = {}
+    for header, length in listLengths:
+        dictLengths[header.split(' ')[0] if ignore_seq_info else header] = length
+    return dictLengths
+
+
+def _isFresh(fasta_file: str, sidecar_file: str) -> bool:
+    """ sidecar file exists and not older than fasta file """
+    return os.path.exists(sidecar_file) and \
+        os.path.getmtime(sidecar_file) >= os.path.getmtime(fasta_file)
+
+
+def _readSidecar(sidecar_file: str) -> List[Tuple[str, int]]:
+    """ read `.len` sidecar (header \\t length) """
+    listLengths = []
+    with open(sidecar_file, 'r') as f:
+        for line in f:
+            header, length = line.rstrip('\n').rsplit('\t', 1)
+            listLengths.append((header, int(length)))
+    return listLengths
+
+
+def _scanLengths(handle, block_size: int = 1 << 22) -> Iterator[Tuple[str, int]]:
+    """ yield (header, length) by scan blocks of binary handle (only count bases) """
+    listHeaderParts = None
+    header = None
+    length = 0
+    in_header = False
+    last_is_newline = True
+    while True:
+        block = handle.read(block_size)
+        if not block:
+            break
+        position = 0
+        while position < len(block):
+            if in_header:
+                head_end = block.find(b'\n', position)
+                if head_end == -1:
+                    listHeaderParts.append(block[position:])
+                    break
+                listHeaderParts.append(block[position:head_end])
+                header = b''.join(listHeaderParts).rstrip().decode()
+                in_header = False
+                last_is_newline = True
+                position = head_end + 1
+            elif last_is_newline and block[position:position + 1] == b'>':
+                if header is not None:
+                    yield header, length
+                listHeaderParts, length = [], 0
+                in_header = True
+                position += 1
+            else:
+                next_head = block.find(b'\n>', position)
+                end = len(block) if next_head == -1 else next_head + 1
+                segment = block[position:end]
+                length += len(segment) - segment.count(b'\n') - segment.count(b'\r') - \
+                    segment.count(b' ') - segment.count(b'\t')
+                last_is_newline = segment[-1:] == b'\n'
+                position = end
+    if in_header:
+        header = b''.join(listHeaderParts).rstrip().decode()
+    if header is not None:
+        yield header, length
 
 
 class Dna:
@@ -98,40 +412,85 @@ class Dna:
 
     def __init__(self, header, sequence):
         self.head = header
-        self.seq = sequence
+        # NOTE: sequence join once (old version keep list of lines and join on every access)
+        self.seq = sequence if isinstance(sequence, str) else ''.join(sequence)
 
     def __repr__(self):
-        return '[HTML]' % (self.head)
+        return '<Dna %s>' % (self.head)
 
-    def __str__(self, separator=''):
-        return '>%s\n%s' % (self.head, separator.join(self.seq))
+    def __str__(self):
+        return '>%s\n%s' % (self.head, self.seq)
 
     def __len__(self):
-        return len(''.join(self.seq))
+        return len(self.seq)
 
     @property
-    def sequence(self, separator=''):
-        return separator.join(self.seq)
+    def sequence(self):
+        return self.seq
 
 
 class Fasta:
-    ''' A FASTA iterator/generates DNA objects. '''
+    '''
+    A FASTA iterator/generates DNA objects.
+    ---
+        - read handle by large block (default 4 MB) and split record on `\\n>`
+        - handle can open by text ('r') or binary ('rb'; faster) mode
+        - sequence of each record join once (remove line break and space)
+        example :
+        >>> with open("..genome.fa", 'rb') as f:
+        ...     for record in Fasta(f):
+        ...         print(record.head, len(record))
+        L01 4
+        ...
+    '''
 
-    def __init__(self, handle):
+    def __init__(self, handle, block_size: int = 1 << 22):
         self.handle = handle
+        self.block_size = block_size
 
     def __repr__(self):
-        return '[HTML]' % self.handle
+        return '<Fasta %s>' % self.handle
 
     def __iter__(self):
-        header, sequence = '', []
-        for line in self.handle:
-            if line[0] == '>':
-                if sequence:
-                    yield Dna(header, sequence)
-                header = line[1:-1]
-                sequence = []
-            else:
-                sequence.append(line.strip())
-        yield Dna(header, sequence)
+        listParts = []
+        newline = None
+        last_is_newline = True
+        while True:
+            block = self.handle.read(self.block_size)
+            if not block:
+                break
+            if newline is None:
+                newline, head_mark = ('\n', '>') if isinstance(block, str) else (b'\n', b'>')
+                split_mark = newline + head_mark
+            # NOTE: record 開頭 `>` 剛好落在 block 開頭 (前一個 block 以換行結尾)
+            start = 0
+            if last_is_newline and block[:1] == head_mark and listParts:
+                yield self._parseRecord(block[:0].join(listParts))
+                listParts = []
+            next_head = block.find(split_mark)
+            while next_head != -1:
+                listParts.append(block[start:next_head + 1])
+                yield self._parseRecord(block[:0].join(listParts))
+                listParts = []
+                start = next_head + 1
+                next_head = block.find(split_mark, start)
+            listParts.append(block[start:])
+            last_is_newline = block[-1:] == newline
+        if listParts:
+            record = self._parseRecord(listParts[0][:0].join(listParts))
+            if record.head or record.seq:
+                yield record
 
+    @staticmethod
+    def _parseRecord(raw) -> Dna:
+        """ convert `>header\\nseq\\nseq...` (str or bytes) to Dna """
+        newline, head_mark = ('\n', '>') if isinstance(raw, str) else (b'\n', b'>')
+        header, body = raw[:0], raw
+        if raw[:1] == head_mark:
+            head_end = raw.find(newline)
+            if head_end == -1:
+                head_end = len(raw)
+            header, body = raw[1:head_end].rstrip(), raw[head_end + 1:]
+        if isinstance(raw, str):
+            return Dna(header, ''.join(body.split()))
+        return Dna(header.decode(), body.translate(None, b' \t\r\n').decode())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+"""
+k-mer counting and lookup index (NumPy) :
+
+    1. `encode` sequence to 2 bits code (A:0, C:1, G:2, T:3 ; other base : 4)
+    2. `kmerValues` roll k-mer to integer (k <= 31, fit in uint64) by vectorized shift
+    3. `KmerIndex` count / membership / position list of k-mer
+        - stream records from `fasta.Fasta` (add by buffer, merge count by chunk)
+        - set `keep_positions` false for count only (memory ~ distinct k-mer, not reference size)
+        - p.s. : `keep_positions` true (default) keep every k-mer position in memory
+            (up to 20 bytes per base), only count only mode is bounded for reference larger than RAM
+---
+Abstract:
+    - example :
+        >>> objKmerIndex = KmerIndex.fromFasta("..transcriptome.fa", k=7)
+        >>> objKmerIndex.count("ACGTACG")
+        15
+        >>> "ACGTACG" in objKmerIndex
+        True
+        >>> objKmerIndex.positions("ACGTACG")
+        [('TranscriptA', 10), ('TranscriptB', 3), ...]
+"""
+
+from __future__ import annotations
+from typing import Iterable, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from . import fasta
+
+MAX_K = 31
+
+_CODE = np.full(256, 4, dtype=np.uint8)
+for _code, _base in enumerate(b'ACGT'):
+    _CODE[_base] = _CODE[_base + 32] = _code
+# NOTE: RNA `U` 視為 `T`
+_CODE[ord('U')] = _CODE[ord('u')] = 3
+_BASES = 'ACGT'
+
+
+def encode(sequence: Union[str, bytes]) -> np.ndarray:
+    """ encode sequence to codes (uint8 ; A:0, C:1, G:2, T/U:3, other:4) """
+    if isinstance(sequence, str):
+        sequence = sequence.encode()
+    return _CODE[np.frombuffer(sequence, dtype=np.uint8)]
+
+
+def decode(value: int, k: int) -> str:
+    """ decode k-mer integer to string """
+    return ''.join(_BASES[(int(value) >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+
+def _reverseComplementValues(values: np.ndarray, k: int) -> np.ndarray:
+    """ reverse complement of k-mer integers (vectorized) """
+    value_type = values.dtype.type
+    values = ~values & value_type((1 << (2 * k)) - 1)
+    result = np.zeros_like(values)
+    for _ in range(k):
+        result = (result << value_type(2)) | (values & value_type(3))
+        values = values >> value_type(2)
+    return result
+
+
+def _valueType(k: int):
+    """ smallest unsigned integer type for k-mer (2k bits) """
+    if k <= 8:
+        return np.uint16
+    if k <= 16:
+        return np.uint32
+    return np.uint64
+
+
+def _rollValues(bits: np.ndarray, k: int) -> np.ndarray:
+    """
+    k-mer integer of every window (length len(bits) - k + 1) :
+        combine window by doubling (1, 2, 4, 8 ...) -> O(n log k) vectorized operation
+    """
+    value_type = bits.dtype.type
+    result, result_k = None, 0
+    power, power_k = bits, 1
+    while k:
+        if k & 1:
+            if result is None:
+                result, result_k = power, power_k
+            else:
+                size = len(bits) - (result_k + power_k) + 1
+                result = (result[:size] << value_type(2 * power_k)) | power[result_k:result_k + size]
+                result_k += power_k
+        k >>= 1
+        if k:
+            size = len(bits) - 2 * power_k + 1
+            power = (power[:size] << value_type(2 * power_k)) | power[power_k:power_k + size]
+            power_k *= 2
+    return result
+
+
+def kmerValues(codes: np.ndarray, k: int, canonical: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    roll all k-mer of encoded sequence :
+        input : codes (from `encode`), k (<= 31)
+        output : (values, positions)
+            - values : k-mer integer (uint16 if k <= 8, uint32 if k <= 16, else uint64)
+            - positions : 0-based start position (skip k-mer include `N` or other base)
+        example :
+        >>> kmerValues(encode("ACGTN"), 2)
+        (array([1, 6, 11], dtype=uint16), array([0, 1, 2]))
+    """
+    if not 0 < k <= MAX_K:
+        raise ValueError("Error: k must between 1 and {}".format(MAX_K))
+    value_type = _valueType(k)
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.zeros(0, dtype=value_type), np.zeros(0, dtype=np.int64)
+    # NOTE: 含非 ACGT 的 window 丟掉 (非 ACGT 通常很少，只標記其前 k 個 window)
+    valid = np.ones(n, dtype=bool)
+    invalid = np.flatnonzero(codes > 3)
+    for offset in range(k if len(invalid) else 0):
+        window = invalid - offset
+        valid[window[(window >= 0) & (window < n)]] = False
+    values = _rollValues((codes & 3).astype(value_type), k)
+    positions = np.flatnonzero(valid)
+    values = values[positions]
+    if canonical:
+        values = np.minimum(values, _reverseComplementValues(values, k))
+    return values, positions
+
+
+class KmerIndex(object):
+    """
+    KmerIndex :
+        count / lookup index of k-mer over many sequence
+    ---
+        - add sequence by `add(name, sequence)` or `addFasta(fasta_file)` (stream)
+        - query : `count`, `counts` (many k-mer at once), `in`, `positions`, `mostCommon`
+        - `canonical` true : k-mer and its reverse complement count as one
+        - `keep_positions` true : keep (sequence, position) of every k-mer (memory ~ reference size)
+          false : count only, merge buffer every `buffer_size` k-mer (memory ~ distinct k-mer)
+    ---
+        example :
+        >>> objKmerIndex = KmerIndex(k=3)
+        >>> objKmerIndex.add("L01", "ACGTACGT")
+        >>> objKmerIndex.count("ACG")
+        2
+        >>> objKmerIndex.positions("ACG")
+        [('L01', 0), ('L01', 4)]
+    """
+    def __init__(self, k: int, canonical: bool = False, keep_positions: bool = True, buffer_size: int = 1 << 24) -> None:
+        if not 0 < k <= MAX_K:
+            raise ValueError("Error: k must between 1 and {}".format(MAX_K))
+        self.k              = k
+        self.canonical      = canonical
+        self.keep_positions = keep_positions
+        self.buffer_size    = buffer_size
+        self.names: List[str] = []
+
+        self._listBufferValues    = []
+        self._listBufferSequences = []
+        self._listBufferPositions = []
+        self._buffer_length       = 0
+        # NOTE: count only 模式 : 已合併的 (unique k-mer, count)
+        self._unique = np.zeros(0, dtype=_valueType(k))
+        self._counts = np.zeros(0, dtype=np.int64)
+        # NOTE: keep_positions 模式 : 依 k-mer 排序後的 (k-mer, sequence index, position)
+        self._values    = np.zeros(0, dtype=_valueType(k))
+        self._sequences = np.zeros(0, dtype=np.int32)
+        self._positions = np.zeros(0, dtype=np.int64)
+        self._finalized = True
+
+    def add(self, name: str, sequence: Union[str, bytes]) -> None:
+        """ add one sequence to index """
+        values, positions = kmerValues(encode(sequence), self.k, self.canonical)
+        self.names.append(name)
+        self._listBufferValues.append(values)
+        if self.keep_positions:
+            self._listBufferSequences.append(np.full(len(values), len(self.names) - 1, dtype=np.int32))
+            self._listBufferPositions.append(positions)
+        self._buffer_length += len(values)
+        self._finalized = False
+        if not self.keep_positions and self._buffer_length >= self.buffer_size:
+            self._mergeCounts()
+
+    def addRecords(self, records: Iterable) -> KmerIndex:
+        """ add `fasta.Dna` records or (name, sequence) pairs """
+        for record in records:
+            if isinstance(record, fasta.Dna):
+                self.add(record.head.split(' ')[0], record.sequence)
+            else:
+                self.add(*record)
+        return self
+
+    def addFasta(self, fasta_file: str) -> KmerIndex:
+        """ add all records of fasta file (stream ; gzip / BGZF / zstd also ok) """
+        with fasta.openFasta(fasta_file) as f:
+            return self.addRecords(fasta.Fasta(f))
+
+    @classmethod
+    def fromFasta(cls, fasta_file: str, k: int, canonical: bool = False, keep_positions: bool = True) -> KmerIndex:
+        """ build index of fasta file (set `keep_positions` false for fasta larger than RAM) """
+        return cls(k, canonical=canonical, keep_positions=keep_positions).addFasta(fasta_file)
+
+    def _mergeCounts(self) -> None:
+        """ merge buffered k-mer to (unique, counts) """
+        # NOTE: `add` 剛 merge 過 (最後一條 sequence 填滿 buffer) 時 buffer 為空
+        if not self._listBufferValues:
+            return
+        buffer_unique, buffer_counts = np.unique(np.concatenate(self._listBufferValues), return_counts=True)
+        values = np.concatenate((self._unique, buffer_unique))
+        weights = np.concatenate((self._counts, buffer_counts))
+        self._listBufferValues = []
+        self._buffer_length = 0
+        # NOTE: sequence 皆短於 k 或皆含 N 時沒有任何 k-mer
+        if len(values) == 0:
+            return
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+        self._unique = values[starts]
+        self._counts = np.add.reduceat(weights, starts).astype(np.int64)
+
+    def _finalize(self) -> None:
+        if self._finalized:
+            return
+        if self.keep_positions:
+            values = np.concatenate([self._values] + self._listBufferValues)
+            sequences = np.concatenate([self._sequences] + self._listBufferSequences)
+            positions = np.concatenate([self._positions] + self._listBufferPositions)
+            order = np.argsort(values, kind='stable')
+            self._values, self._sequences, self._positions = values[order], sequences[order], positions[order]
+            self._listBufferValues, self._listBufferSequences, self._listBufferPositions = [], [], []
+            self._buffer_length = 0
+            self._unique, start = np.unique(self._values, return_index=True)
+            self._counts = np.diff(np.append(start, len(self._values))).astype(np.int64)
+        else:
+            self._mergeCounts()
+        self._finalized = True
+
+    def _query(self, kmer: str) -> Optional[int]:
+        """ k-mer string to integer (None if include non ACGT base) """
+        if len(kmer) != self.k:
+            raise ValueError("Error: k-mer length must be {}".format(self.k))
+        values, _ = kmerValues(encode(kmer), self.k, self.canonical)
+        return int(values[0]) if len(values) else None
+
+    def counts(self, kmers: Iterable[str]) -> np.ndarray:
+        """ count of many k-mer (vectorized search ; 0 if not found) """
+        self._finalize()
+        listKmers = list(kmers)
+        if not listKmers:
+            return np.zeros(0, dtype=np.int64)
+        array = np.frombuffer(''.join(listKmers).encode(), dtype=np.uint8)
+        if len(array) != self.k * len(listKmers):
+            raise ValueError("Error: k-mer length must be {}".format(self.k))
+        codes = _CODE[array].reshape(-1, self.k)
+        value_type = _valueType(self.k)
+        values = np.zeros(len(codes), dtype=value_type)
+        for offset in range(self.k):
+            values = (values << value_type(2)) | (codes[:, offset] & 3).astype(value_type)
+        if self.canonical:
+            values = np.minimum(values, _reverseComplementValues(values, self.k))
+        if len(self._unique) == 0:
+            return np.zeros(len(values), dtype=np.int64)
+        index = np.minimum(np.searchsorted(self._unique, values), len(self._unique) - 1)
+        found = (self._unique[index] == values) & (codes <= 3).all(axis=1)
+        return np.where(found, self._counts[index], 0)
+
+    def count(self, kmer: str) -> int:
+        """ count of k-mer """
+        return int(self.counts([kmer])[0])
+
+    def __contains__(self, kmer: str) -> bool:
+        return self.count(kmer) > 0
+
+    def __len__(self) -> int:
+        """ number of distinct k-mer """
+        self._finalize()
+        return len(self._unique)
+
+    def positions(self, kmer: str) -> List[Tuple[str, int]]:
+        """ (sequence name, 0-based start) of k-mer (need `keep_positions`) """
+        if not self.keep_positions:
+            raise ValueError("Error: positions need `keep_positions=True`")
+        self._finalize()
+        value = self._query(kmer)
+        if value is None:
+            return []
+        value = _valueType(self.k)(value)
+        start = np.searchsorted(self._values, value, side='left')
+        end = np.searchsorted(self._values, value, side='right')
+        return [
+            (self.names[sequence], int(position))
+            for sequence, position in zip(self._sequences[start:end], self._positions[start:end])
+        ]
+
+    def mostCommon(self, n: int = 10) -> List[Tuple[str, int]]:
+        """ top `n` k-mer by count """
+        self._finalize()
+        n = min(n, len(self._counts))
+        if n == 0:
+            return []
+        top = np.argpartition(-self._counts, n - 1)[:n]
+        top = top[np.argsort(-self._counts[top], kind='stable')]
+        return [(decode(self._unique[index], self.k), int(self._counts[index])) for index in top]
+
+    def toDataFrame(self):
+        """ all k-mer count (DataFrame : kmer, count) """
+        self._finalize()
+        return pd.DataFrame({
+            'kmer'  : [decode(value, self.k) for value in self._unique],
+            'count' : self._counts,
+        })
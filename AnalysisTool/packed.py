@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+2-bit packed sequence store for large reference :
+
+    1. `PackedSequence` keep A/C/G/T by 2 bits (4 bases per byte)
+    2. other bases (N, IUPAC) and soft-mask (lower case) keep as run list
+        - N run : (start, end, 'N') ; soft-mask run : (start, end)
+---
+Abstract:
+    - `len`, slicing (`seq[10:20]` -> str), `str(seq)` (decode whole sequence)
+    - `upper()` drop soft-mask run (not decode sequence)
+    - `reverse_complement()` return a view (not decode / copy sequence)
+    - example :
+        >>> dictGenome = fasta.readAsDict("..genome.fa", packed=True)
+        >>> dictGenome['L01']
+        <PackedSequence length=4>
+        >>> dictGenome['L01'][0:4]
+        'ATCG'
+        >>> dictGenome['L01'].reverse_complement()[0:4]
+        'CGAT'
+"""
+
+from __future__ import annotations
+from typing import Tuple, Union
+import numpy as np
+
+_BASES = np.frombuffer(b'ACGT', dtype=np.uint8)
+
+# NOTE: ASCII -> 2 bits code (A:0, C:1, G:2, T:3; 其他字元另外記在 run list)
+_CODE = np.zeros(256, dtype=np.uint8)
+_IS_BASE = np.zeros(256, dtype=bool)
+for _code, _base in enumerate(b'ACGT'):
+    _CODE[_base] = _CODE[_base + 32] = _code
+    _IS_BASE[_base] = _IS_BASE[_base + 32] = True
+
+_COMPLEMENT = str.maketrans(
+    'ACGTURYKMBVDHNacgturykmbvdhn',
+    'TGCAAYRMKVBHDNtgcaayrmkvbhdn'
+)
+
+_EMPTY_RUNS = np.zeros(0, dtype=np.int64)
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ (starts, ends) of continuous True run in boolean array """
+    if not mask.any():
+        return _EMPTY_RUNS, _EMPTY_RUNS
+    change = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(change == 1), np.flatnonzero(change == -1)
+
+
+class PackedSequence:
+    '''
+    PackedSequence :
+        2 bits per base sequence (+ sparse N / soft-mask run list)
+    ---
+        - memory : about length / 4 bytes (3 Gb genome < 1 GB)
+        - slicing return `str` (only decode the slice)
+    ---
+        example :
+        >>> seq = PackedSequence("ATCGNNNNacgt")
+        >>> len(seq)
+        12
+        >>> seq[2:8]
+        'CGNNNN'
+        >>> str(seq.upper())
+        'ATCGNNNNACGT'
+        >>> str(seq.reverse_complement())
+        'acgtNNNNCGAT'
+    '''
+
+    __slots__ = ('length', '_packed', '_other_starts', '_other_ends', '_other_bases',
+                 '_mask_starts', '_mask_ends', '_reverse')
+
+    def __init__(self, sequence: Union[str, bytes] = '', force_upper: bool = False) -> None:
+        if isinstance(sequence, str):
+            sequence = sequence.encode()
+        array = np.frombuffer(sequence, dtype=np.uint8)
+        self.length = len(array)
+
+        codes = _CODE[array]
+        padding = (-self.length) % 4
+        if padding:
+            codes = np.concatenate((codes, np.zeros(padding, dtype=np.uint8)))
+        codes = codes.reshape(-1, 4)
+        self._packed = (codes[:, 0] << 6) | (codes[:, 1] << 4) | (codes[:, 2] << 2) | codes[:, 3]
+
+        # NOTE: 非 ACGT 字元 (N, IUPAC) 以 (start, end, base) 的 run 記錄 (同一個字元連續為一個 run)
+        is_lower = (array >= ord('a')) & (array <= ord('z'))
+        upper = np.where(is_lower, array & 0xDF, array)
+        is_other = ~_IS_BASE[array]
+        starts, ends = _runs(is_other)
+        if len(starts):
+            # NOTE: 不同字元相鄰時也要切開 run
+            positions = np.flatnonzero(is_other)
+            breaks = positions[1:][upper[positions[1:]] != upper[positions[:-1]]]
+            breaks = breaks[is_other[breaks - 1]]
+            starts = np.sort(np.concatenate((starts, breaks)))
+            ends = np.sort(np.concatenate((ends, breaks)))
+        self._other_starts = starts
+        self._other_ends = ends
+        self._other_bases = upper[starts].tobytes()
+
+        if force_upper:
+            self._mask_starts, self._mask_ends = _EMPTY_RUNS, _EMPTY_RUNS
+        else:
+            self._mask_starts, self._mask_ends = _runs(is_lower)
+        self._reverse = False
+
+    def _copy(self) -> PackedSequence:
+        other = PackedSequence.__new__(PackedSequence)
+        for name in PackedSequence.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return '<PackedSequence length=%d%s>' % (self.length, ' reverse' if self._reverse else '')
+
+    def __str__(self) -> str:
+        return self._decode(0, self.length)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (PackedSequence, str)):
+            return len(self) == len(other) and str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step == 1:
+                return self._decode(start, stop)
+            if step > 0:
+                return self._decode(start, stop)[::step] if stop > start else ''
+            # NOTE: step < 0 (ex: seq[::-1]) 先解碼正向範圍再反轉
+            if start <= stop:
+                return ''
+            return self._decode(stop + 1, start + 1)[::-1][::-step]
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError('PackedSequence index out of range')
+        return self._decode(key, key + 1)
+
+    def _decode(self, start: int, end: int) -> str:
+        """ decode bases [start, end) of this view """
+        if end <= start:
+            return ''
+        if not self._reverse:
+            return self._decodeForward(start, end)
+        sequence = self._decodeForward(self.length - end, self.length - start)
+        return sequence.translate(_COMPLEMENT)[::-1]
+
+    def _decodeForward(self, start: int, end: int) -> str:
+        """ decode bases [start, end) of stored (forward) sequence """
+        packed = self._packed[start // 4:(end + 3) // 4]
+        codes = np.empty((len(packed), 4), dtype=np.uint8)
+        codes[:, 0] = packed >> 6
+        codes[:, 1] = (packed >> 4) & 3
+        codes[:, 2] = (packed >> 2) & 3
+        codes[:, 3] = packed & 3
+        shift = start % 4
+        array = _BASES[codes.ravel()[shift:shift + end - start]]
+
+        first = np.searchsorted(self._other_ends, start, side='right')
+        last = np.searchsorted(self._other_starts, end, side='left')
+        for index in range(first, last):
+            run_start = max(self._other_starts[index], start) - start
+            run_end = min(self._other_ends[index], end) - start
+            array[run_start:run_end] = self._other_bases[index]
+
+        first = np.searchsorted(self._mask_ends, start, side='right')
+        last = np.searchsorted(self._mask_starts, end, side='left')
+        for index in range(first, last):
+            run_start = max(self._mask_starts[index], start) - start
+            run_end = min(self._mask_ends[index], end) - start
+            array[run_start:run_end] |= 0x20
+        return array.tobytes().decode()
+
+    def _gatherForward(self, positions: np.ndarray) -> np.ndarray:
+        """ ASCII codes (uint8) of stored (forward) bases at positions (vectorized, not decode whole sequence) """
+        positions = np.asarray(positions, dtype=np.int64)
+        codes = (self._packed[positions // 4] >> (6 - 2 * (positions % 4)).astype(np.uint8)) & 3
+        array = _BASES[codes]
+        if len(self._other_starts):
+            # NOTE: position 所在的 run : 第一個 end > position 的 run (且 start <= position)
+            runs = np.searchsorted(self._other_ends, positions, side='right')
+            inside = runs < len(self._other_starts)
+            inside[inside] = self._other_starts[runs[inside]] <= positions[inside]
+            array[inside] = np.frombuffer(self._other_bases, dtype=np.uint8)[runs[inside]]
+        if len(self._mask_starts):
+            runs = np.searchsorted(self._mask_ends, positions, side='right')
+            inside = runs < len(self._mask_starts)
+            inside[inside] = self._mask_starts[runs[inside]] <= positions[inside]
+            array[inside] |= 0x20
+        return array
+
+    def upper(self) -> PackedSequence:
+        """ upper case sequence (drop soft-mask run; share packed bases) """
+        other = self._copy()
+        other._mask_starts, other._mask_ends = _EMPTY_RUNS, _EMPTY_RUNS
+        return other
+
+    def reverse_complement(self) -> PackedSequence:
+        """ reverse complement view (share packed bases, decode when slicing) """
+        other = self._copy()
+        other._reverse = not self._reverse
+        return other
+
+    @property
+    def nbytes(self) -> int:
+        """ memory used by arrays (bytes) """
+        return self._packed.nbytes + self._other_starts.nbytes + self._other_ends.nbytes + \
+            len(self._other_bases) + self._mask_starts.nbytes + self._mask_ends.nbytes
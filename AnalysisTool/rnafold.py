@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+RNAfold output reader (input of `VFold`) :
+
+    1. `readRNAfold` stream RNAfold / `RNAfold --noPS` output (plain, gzip, BGZF, zstd)
+        - yield `template.Hairpin` one by one (memory not depend on file size)
+        - hairpin has `seq`, `struct`, `mfe`, `name` (and `chrom`, `strand`, `position` if header has region)
+    2. header region : `chrom:start-end`, `chrom:start-end:strand` or `chrom:start-end(strand)`
+        (bedtools getfasta -s) ; position keep 1-based (same as header)
+---
+Abstract:
+    - RNAfold output (header line is optional) :
+        >hairpin1 L01:101-180(-)
+        GGGAAAUCC...
+        (((...))).. (-12.30)
+    - other line of `-p` (ensemble / centroid / frequency) are skipped
+    - example :
+        >>> for objHairpin in readRNAfold("..hairpin.fold.gz"):
+        ...     getMKs = VFold.GetSeqMarker(objHairpin.struct)
+        >>> objHairpin.mfe, objHairpin.position
+        (-12.3, Position(start=101, end=180))
+"""
+
+from __future__ import annotations
+from typing import Iterator, Optional
+import re
+from .compress import openFasta
+from .faidx import parseRegion
+from .template import Hairpin
+
+_SEQUENCE_PATTERN = re.compile(r'^[A-Za-z]+$')
+_STRUCTURE_PATTERN = re.compile(r'^(?P<struct>[().]+)\s+\(\s*(?P<mfe>[-+]?\d+(?:\.\d+)?)\)\s*$')
+_STRAND_SUFFIX_PATTERN = re.compile(r'\(([+-])\)$')
+
+
+def _iterLines(handle, block_size: int = 1 << 20) -> Iterator[str]:
+    """ lines of binary stream (only need `read(size)`, ex: `compress.ThreadedReader`) """
+    rest = b''
+    while True:
+        block = handle.read(block_size)
+        if not block:
+            break
+        listLines = (rest + block).split(b'\n')
+        rest = listLines.pop()
+        for line in listLines:
+            yield line.rstrip(b'\r').decode()
+    if rest:
+        yield rest.rstrip(b'\r').decode()
+
+
+def _setHeader(objHairpin: Hairpin, header: str) -> None:
+    """ set name (and region) of hairpin by header line """
+    listFields = header[1:].split()
+    objHairpin.setName(listFields[0] if listFields else '')
+    for field in listFields:
+        region = _STRAND_SUFFIX_PATTERN.sub(r':\1', field)
+        if ':' not in region:
+            continue
+        try:
+            chrom, start, end, strand = parseRegion(region)
+        except ValueError:
+            continue
+        if end is None:
+            continue
+        objHairpin.setChrom(chrom)
+        objHairpin.setStrand(strand)
+        objHairpin.setPosition(start + 1, end)
+        break
+
+
+def readRNAfold(rnafold_file: str) -> Iterator[Hairpin]:
+    """
+    read RNAfold output to `template.Hairpin` (generator) :
+        input : RNAfold output file (auto detect compression)
+        output : Hairpin (seq, struct, mfe, name ; chrom, strand, position if header has region)
+            - name is `None` if record has no header
+        example :
+        >>> objHairpin = next(readRNAfold("..hairpin.fold"))
+        >>> objHairpin.struct
+        '(((...)))..'
+    """
+    with openFasta(rnafold_file) as f:
+        header: Optional[str] = None
+        sequence: Optional[str] = None
+        for number, line in enumerate(_iterLines(f), start=1):
+            if not line.strip():
+                continue
+            if line.startswith('>'):
+                header, sequence = line, None
+                continue
+            if sequence is None:
+                if _SEQUENCE_PATTERN.match(line):
+                    sequence = line
+                continue
+            match = _STRUCTURE_PATTERN.match(line)
+            if match is None:
+                # NOTE: 多行序列 (RNAfold 輸出不會斷行，此為保險)
+                if _SEQUENCE_PATTERN.match(line):
+                    sequence += line
+                    continue
+                raise ValueError("Error: line {} is not RNAfold structure: {}".format(number, line))
+            struct = match.group('struct')
+            if len(struct) != len(sequence):
+                raise ValueError("Error: line {} structure length not equal to sequence".format(number))
+
+            objHairpin = Hairpin(sequence)
+            objHairpin.setName(None)
+            if header is not None:
+                _setHeader(objHairpin, header)
+            objHairpin.setStruct(struct)
+            objHairpin.setMFE(match.group('mfe'))
+            yield objHairpin
+            # NOTE: 之後的 `-p` 輸出行 (ensemble, centroid ...) 略過，直到下一個 header / sequence
+            header, sequence = None, None
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+"""
+Vectorized dot-bracket engine (for `VFold`) :
+
+    1. `StructureBatch` convert many dot-bracket strings (RNAfold) at once
+        - pair table : partner site of each site (-1 if not paired)
+        - marker array : same as `VFold.GetSeqMarker.lstMKs_premiRNA`
+            (`(` count up from 1, `)` use marker of its `(`, other : 0)
+    2. arm view : non-zero (paired) sites / markers in miRNA 5p / 3p range
+        - 3p view is reversed (same as `GetSeqMarker.rm0StMKs`)
+    3. `MarkerRuns` continuous marker runs of many marker arrays (same as `VFold.cotinous_seq`)
+        - run boundary (start, end, direction), longest run, number of bulges
+---
+Abstract:
+    - all structures are concatenated to one array (+ `offsets`), no python loop per base
+    - example :
+        >>> objStructureBatch = StructureBatch(["((..))", "(((...)).)"])
+        >>> objStructureBatch.getMarkers(0)
+        array([1, 2, 0, 0, 2, 1], dtype=int32)
+        >>> objStructureBatch.getPartners(1)
+        array([ 8,  7,  6, -1, -1, -1,  2,  1, -1,  0], dtype=int32)
+        >>> sites, markers = objStructureBatch.armView(1, 6, 9, reverse=True)
+        >>> markers
+        array([1, 2, 3], dtype=int32)
+"""
+
+from __future__ import annotations
+from typing import List, Sequence, Tuple
+import itertools
+import numpy as np
+
+_OPEN = ord('(')
+_CLOSE = ord(')')
+
+
+class UnbalancedStructureError(IndexError, ValueError):
+    """ `)` without `(` (IndexError : same as `list.pop` of original `GetSeqMarker`) """
+
+
+class RaggedArray(object):
+    """
+    RaggedArray :
+        many 1-D arrays with different length (flat `values` + `offsets`)
+        - `ragged[i]` : i-th array (view)
+        - `lengths` : length of each array
+    """
+    def __init__(self, values: np.ndarray, offsets: np.ndarray) -> None:
+        self.values  = values
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def tolist(self) -> List[List]:
+        return [self[index].tolist() for index in range(len(self))]
+
+
+def _groupStarts(groups: np.ndarray, count: int) -> np.ndarray:
+    """ offsets of sorted group ids (length count + 1) """
+    return np.searchsorted(groups, np.arange(count + 1), side='left').astype(np.int64)
+
+
+class StructureBatch(object):
+    """
+    StructureBatch :
+        pair table / marker array of many dot-bracket structures
+    ---
+        - `markers` / `partners` : flat array of all structures (int32)
+        - `offsets` : start of each structure in flat array
+        - `getMarkers(i)`, `getPartners(i)` : view of one structure
+        - `armView(i, start, end, reverse)` / `armViews(starts, ends, reverse)` :
+            non-zero sites and markers in range (start, end include ; 0-based)
+    ---
+        p.s. `)` without `(` raise `UnbalancedStructureError` (subclass of IndexError and ValueError)
+    """
+    def __init__(self, structures: Sequence[str]) -> None:
+        self.structures = list(structures)
+        self.lengths = np.array([len(structure) for structure in self.structures], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths))).astype(np.int64)
+        array = np.frombuffer(''.join(self.structures).encode(), dtype=np.uint8)
+        total = len(array)
+
+        # NOTE: 只處理括號位置 ('(' = 40, ')' = 41)
+        sites = np.flatnonzero((array | 1) == _CLOSE).astype(np.int32)
+        is_close = array[sites] == _CLOSE
+        depth = np.cumsum(1 - 2 * is_close.view(np.int8), dtype=np.int32)
+        # NOTE: 每個 structure 內 depth 不可小於 structure 開始時的 depth (`)` 沒有 `(`)
+        brackets_before = np.searchsorted(sites, self.offsets)
+        depth_before = np.concatenate(([0], depth))[brackets_before[:-1]]
+        non_empty = np.flatnonzero(np.diff(brackets_before))
+        if len(non_empty):
+            depth_min = np.minimum.reduceat(depth, brackets_before[non_empty])
+            unbalanced = non_empty[depth_min < depth_before[non_empty]]
+            if len(unbalanced):
+                index = unbalanced[0]
+                raise UnbalancedStructureError("Error: unbalanced `)` in structure {}: {}".format(index, self.structures[index]))
+        # NOTE: structure 內的 site (pair table 用)
+        local_sites = sites - np.repeat(self.offsets[:-1], np.diff(brackets_before)).astype(np.int32)
+
+        # NOTE: `(` 的 level = 加完後的 depth ; `)` 的 level = 減之前的 depth
+        # 依 level 排序 (stable) 後，每個 `)` 的前一個必為其配對的 `(` (跨 structure 也成立)
+        levels = depth + is_close
+        if len(levels):
+            levels -= levels.min()
+        # NOTE: 16 bits 整數的 stable sort 為 radix sort
+        levels = levels.astype(np.int16 if len(levels) == 0 or levels.max() < 2 ** 15 else np.int32)
+        order = np.argsort(levels, kind='stable').astype(np.int32)
+        sorted_close = np.flatnonzero(is_close[order])
+        close_index = order[sorted_close]
+        open_index = order[sorted_close - 1]
+
+        # NOTE: marker : `(` 在該 structure 中是第幾個 `(` (1-based) ; `)` 用配對 `(` 的 marker
+        bracket_markers = np.cumsum(~is_close, dtype=np.int32)
+        bracket_markers -= np.repeat(
+            np.concatenate(([0], bracket_markers))[brackets_before[:-1]], np.diff(brackets_before)
+        )
+        bracket_markers[close_index] = bracket_markers[open_index]
+        self.markers = np.zeros(total, dtype=np.int32)
+        self.markers[sites] = bracket_markers
+
+        bracket_partners = np.full(len(sites), -1, dtype=np.int32)
+        bracket_partners[close_index] = local_sites[open_index]
+        bracket_partners[open_index] = local_sites[close_index]
+        self.partners = np.full(total, -1, dtype=np.int32)
+        self.partners[sites] = bracket_partners
+
+    def _structureIds(self, positions: np.ndarray) -> np.ndarray:
+        """ structure index of flat positions """
+        return np.searchsorted(self.offsets, positions, side='right') - 1
+
+    def __len__(self) -> int:
+        return len(self.structures)
+
+    def getMarkers(self, index: int) -> np.ndarray:
+        """ marker array of structure (same as `GetSeqMarker.lstMKs_premiRNA`) """
+        return self.markers[self.offsets[index]:self.offsets[index + 1]]
+
+    def getPartners(self, index: int) -> np.ndarray:
+        """ pair table of structure (partner site, -1 if not paired) """
+        return self.partners[self.offsets[index]:self.offsets[index + 1]]
+
+    def nonzero(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ (sites, markers) of paired sites (same as `GetSeqMarker.lstStMKsRM0_premiRNA`) """
+        markers = self.getMarkers(index)
+        sites = np.flatnonzero(markers)
+        return sites, markers[sites]
+
+    def armView(self, index: int, start: int, end: int, reverse: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (sites, markers) of paired sites in [start, end] (0-based, include end) :
+            - reverse true for 3p (same as `GetSeqMarker.lstStMKsRM0_miRNAp3`)
+        """
+        markers = self.getMarkers(index)[start:end + 1]
+        sites = np.flatnonzero(markers)
+        markers = markers[sites]
+        sites = sites + min(start, len(self.getMarkers(index)))
+        if reverse:
+            return sites[::-1], markers[::-1]
+        return sites, markers
+
+    def armViews(self, starts: Sequence[int], ends: Sequence[int], reverse: bool = False) -> Tuple[RaggedArray, RaggedArray]:
+        """
+        arm view of all structures at once :
+            input : starts, ends (one range per structure ; 0-based, include end)
+            output : (sites, markers) as RaggedArray (sites is local site of structure)
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        starts = np.clip(starts, 0, self.lengths)
+        ends = np.clip(ends + 1, starts, self.lengths)
+        # NOTE: 用差分陣列標出每個 structure 的範圍 (範圍互不重疊)
+        total = len(self.markers)
+        boundary = np.zeros(total + 1, dtype=np.int64)
+        np.add.at(boundary, self.offsets[:-1] + starts, 1)
+        np.add.at(boundary, self.offsets[:-1] + ends, -1)
+        in_range = np.cumsum(boundary[:-1]) > 0
+
+        positions = np.flatnonzero(in_range & (self.markers != 0))
+        groups = self._structureIds(positions)
+        group_offsets = _groupStarts(groups, len(self))
+        if reverse and len(positions):
+            # NOTE: 每個 group 內反轉 : group_start + group_end - 1 - index
+            index = np.arange(len(positions))
+            group_start = group_offsets[groups]
+            group_end = group_offsets[groups + 1]
+            positions = positions[group_start + group_end - 1 - index]
+        sites = (positions - self.offsets[self._structureIds(positions)]).astype(np.int32)
+        return RaggedArray(sites, group_offsets), RaggedArray(self.markers[positions], group_offsets)
+
+
+class MarkerRuns(object):
+    """
+    MarkerRuns :
+        continuous marker runs of many marker arrays (vectorized `VFold.cotinous_seq`)
+    ---
+        - zero markers are removed first (same as `cotinous_seq`)
+        - run : markers step by +1 or -1 (greedy from left, same split as `cotinous_seq`)
+        - `start` / `end` (index in non-zero markers, include end), `direction` (+1, -1 ; 0 if one marker)
+            `group` : which marker array of each run ; `runs[i]` : runs of i-th array
+        - summary of each array : `counts` (number of run), `longest` (longest run length),
+            `bulges` (number of break = run - 1)
+    ---
+        example :
+        >>> objMarkerRuns = MarkerRuns([[0, 1, 2, 3, 0, 5, 4], [7, 0, 9]])
+        >>> objMarkerRuns.start, objMarkerRuns.end, objMarkerRuns.direction
+        (array([0, 3, 0, 1]), array([2, 4, 0, 1]), array([ 1, -1,  0,  0], dtype=int8))
+        >>> objMarkerRuns.longest, objMarkerRuns.bulges
+        (array([3, 1]), array([1, 1]))
+        >>> objMarkerRuns.segments(0)  # same as VFold.cotinous_seq
+        [[1, 2, 3], [5, 4]]
+    """
+    def __init__(self, listMarkers) -> None:
+        if isinstance(listMarkers, RaggedArray):
+            values, offsets = np.asarray(listMarkers.values), np.asarray(listMarkers.offsets, dtype=np.int64)
+        else:
+            listMarkers = list(listMarkers)
+            offsets = np.concatenate(([0], np.cumsum([len(markers) for markers in listMarkers]))).astype(np.int64)
+            values = np.fromiter(itertools.chain.from_iterable(listMarkers), dtype=np.int64, count=int(offsets[-1]))
+        # NOTE: 移除 0 marker
+        keep = values != 0
+        kept_before = np.concatenate(([0], np.cumsum(keep)))[offsets]
+        self.values = RaggedArray(values[keep].astype(np.int64), kept_before)
+        values = self.values.values
+        count = len(values)
+        groups = np.repeat(np.arange(len(offsets) - 1), np.diff(kept_before))
+
+        # NOTE: 每個 marker 是否為 run 的開頭 :
+        #   F : group 開頭或與前一個差不是 +-1 -> 開頭
+        #   C : 與前一個差 = 前一個與再前一個差 (同方向) -> 不是開頭
+        #   T : 其他 (方向改變) -> 前一個是開頭則不是，反之則是 (與 cotinous_seq 相同的貪婪切法)
+        diff = np.zeros(count, dtype=np.int64)
+        diff[1:] = values[1:] - values[:-1]
+        is_first = np.zeros(count, dtype=bool)
+        is_first[kept_before[:-1][np.diff(kept_before) > 0]] = True
+        forced = is_first | (np.abs(diff) != 1)
+        previous_diff = np.zeros(count, dtype=np.int64)
+        previous_diff[1:] = diff[:-1]
+        previous_first = np.zeros(count, dtype=bool)
+        previous_first[1:] = is_first[:-1]
+        same = ~forced & ~previous_first & (diff == previous_diff)
+        toggle = ~forced & ~same
+        # NOTE: T 的狀態由最近的 F / C 決定 : 距離為奇數則相反
+        index = np.arange(count)
+        anchor = np.maximum.accumulate(np.where(toggle, 0, index)) if count else index
+        is_start = np.where(toggle, forced[anchor] ^ ((index - anchor) % 2 == 1), forced)
+
+        starts = np.flatnonzero(is_start)
+        self.group = groups[starts]
+        self.start = starts - kept_before[self.group]
+        ends = np.append(starts[1:], count) - 1
+        self.end = ends - kept_before[self.group]
+        self.direction = np.where(ends > starts, np.sign(values[np.minimum(starts + 1, max(count - 1, 0))] - values[starts]), 0).astype(np.int8)
+        self.runs = RaggedArray(np.arange(len(starts)), _groupStarts(self.group, len(offsets) - 1))
+
+    def __len__(self) -> int:
+        return len(self.runs)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """ number of run of each marker array """
+        return self.runs.lengths
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """ length of each run """
+        return self.end - self.start + 1
+
+    @property
+    def longest(self) -> np.ndarray:
+        """ longest run length of each marker array (0 if no marker) """
+        longest = np.zeros(len(self), dtype=np.int64)
+        np.maximum.at(longest, self.group, self.lengths)
+        return longest
+
+    @property
+    def bulges(self) -> np.ndarray:
+        """ number of break (run - 1) of each marker array (0 if no marker) """
+        return np.maximum(self.counts - 1, 0)
+
+    def segments(self, index: int):
+        """ runs of i-th marker array as list (same output as `VFold.cotinous_seq`, None if no marker) """
+        values = self.values[index]
+        if len(values) == 0:
+            return None
+        runs = self.runs[index]
+        return [values[start:end + 1].tolist() for start, end in zip(self.start[runs], self.end[runs])]
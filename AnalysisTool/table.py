@@ -0,0 +1,525 @@
+#!/usr/bin/env python
+"""
+Columnar (struct-of-arrays) tables of `template` objects :
+
+    1. `SequenceStore` many short sequences in one `packed.PackedSequence` (+ offsets)
+    2. `MicroRNATable` columns : seq, start, end, strand, count, arm, chrom, name
+    3. `HairpinTable` columns : seq, struct, start, end, strand, mfe, chrom, name
+    4. `HairpinIndex` bulk assign reads to hairpin arm (5p / 3p read count of each hairpin)
+---
+Abstract:
+    - columns are NumPy array (not one python object per read)
+        - start / end : int64 (-1 if not set) ; strand : int8 (1 : `+`, -1 : `-`, 0 : not set)
+        - chrom : category code (`chrom_codes`) + `chrom_names`
+    - bulk construction : `fromObjects`, `fromFasta` / `fromBed` (MicroRNA), `fromRNAfold` (Hairpin)
+    - bulk operation : `table[mask or indices or slice]` -> table, `lengths`, `toDataFrame` ...
+    - iteration return `template.MicroRNA` / `template.Hairpin` (same as old code)
+        `records()` return `template.MicroRNARecord` / `template.HairpinRecord` (`__slots__`,
+        registered as `template.MicroRNA` / `template.Hairpin` : `isinstance` is True)
+    - example :
+        >>> objMicroRNATable = MicroRNATable.fromFasta("..collapsed_reads.fa")
+        >>> objMicroRNATable = objMicroRNATable[objMicroRNATable.lengths >= 20]
+        >>> objMicroRNATable.count.sum()
+        1203345
+        >>> for objMicroRNA in objMicroRNATable:
+        ...     objMicroRNA.seq, objMicroRNA.count
+"""
+
+from __future__ import annotations
+from typing import Iterable, Iterator, List, Optional, Sequence
+import re
+import numpy as np
+import pandas as pd
+from . import fasta
+from . import rnafold
+from .packed import PackedSequence
+from .structure import StructureBatch
+from .template import Hairpin, HairpinRecord, MicroRNA, MicroRNARecord
+
+_STRAND_CODE = {'+': 1, '-': -1}
+_STRAND_NAME = {1: '+', -1: '-', 0: None}
+_ARM_CODE = {'5p': 1, '3p': 2}
+_ARM_NAME = {1: '5p', 2: '3p', 0: None}
+# NOTE: collapsed reads header 的 count : fastx_collapser (`12-3456`) 或 `name_x3456`
+_COUNT_PATTERN = re.compile(r'^\d+-(\d+)$|_x(\d+)$')
+_RNA_TO_DNA = str.maketrans('Uu', 'Tt')
+_DNA_TO_RNA = str.maketrans('Tt', 'Uu')
+
+
+def _countOfName(name: str) -> int:
+    """ read count in name : fastx_collapser `1-3456` or `name_x3456` (else 1) """
+    match = _COUNT_PATTERN.search(name)
+    return int(match.group(1) or match.group(2)) if match else 1
+
+
+def _checkIndex(index: int, length: int) -> int:
+    """ normalise negative index (like list) ; out of range -> IndexError """
+    index = int(index)
+    if index < 0:
+        index += length
+    if not 0 <= index < length:
+        raise IndexError("Error: index out of range ({} records)".format(length))
+    return index
+
+
+def _encodeCategory(values: Sequence) -> tuple:
+    """ (codes (int32, -1 for None), names) """
+    dictCodes = {}
+    codes = np.fromiter(
+        (-1 if value is None else dictCodes.setdefault(value, len(dictCodes)) for value in values),
+        dtype=np.int32, count=len(values)
+    )
+    return codes, list(dictCodes)
+
+
+class SequenceStore(object):
+    """
+    SequenceStore :
+        many sequences in one `packed.PackedSequence` (2 bits per base) + offsets
+    ---
+        - RNA (U but no T) is stored as T, and decode back to U
+        - `store[i]` : i-th sequence ; iteration decode all sequences once
+    """
+    def __init__(self, sequences: Iterable[Optional[str]] = ()) -> None:
+        listSequences = ['' if sequence is None else str(sequence) for sequence in sequences]
+        self.offsets = np.zeros(len(listSequences) + 1, dtype=np.int64)
+        np.cumsum([len(sequence) for sequence in listSequences], out=self.offsets[1:])
+        joined = ''.join(listSequences)
+        self.rna = ('U' in joined or 'u' in joined) and not ('T' in joined or 't' in joined)
+        if self.rna:
+            joined = joined.translate(_RNA_TO_DNA)
+        self._packed = PackedSequence(joined)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        index = _checkIndex(index, len(self))
+        sequence = self._packed[int(self.offsets[index]):int(self.offsets[index + 1])]
+        return sequence.translate(_DNA_TO_RNA) if self.rna else sequence
+
+    def __iter__(self) -> Iterator[str]:
+        joined = str(self._packed)
+        if self.rna:
+            joined = joined.translate(_DNA_TO_RNA)
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            yield joined[start:end]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def take(self, indices: np.ndarray) -> SequenceStore:
+        """ new store of selected sequences (gather packed bases by offsets, not decode other sequences) """
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.lengths[indices]
+        other = SequenceStore.__new__(SequenceStore)
+        other.offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=other.offsets[1:])
+        # NOTE: 新 store 第 j 個 base 在原本 packed 中的位置 (ragged range)
+        positions = np.arange(other.offsets[-1]) - np.repeat(other.offsets[:-1], lengths) + \
+            np.repeat(self.offsets[indices], lengths)
+        other.rna = self.rna
+        other._packed = PackedSequence(self._packed._gatherForward(positions).tobytes())
+        return other
+
+    @property
+    def nbytes(self) -> int:
+        return self._packed.nbytes + self.offsets.nbytes
+
+
+class _RecordTable(object):
+    """ common part of MicroRNATable / HairpinTable (columns are same length numpy arrays) """
+    _columns: tuple = ()
+
+    def __len__(self) -> int:
+        return len(self.sequences)
+
+    def __repr__(self) -> str:
+        return '<%s (%d records)>' % (self.__class__.__name__, len(self))
+
+    def _setCommon(self, count: int, starts, ends, strands, chroms, names) -> None:
+        self.start = np.full(count, -1, dtype=np.int64) if starts is None else np.asarray(starts, dtype=np.int64)
+        self.end = np.full(count, -1, dtype=np.int64) if ends is None else np.asarray(ends, dtype=np.int64)
+        self.strand = np.zeros(count, dtype=np.int8) if strands is None else \
+            np.fromiter((_STRAND_CODE.get(strand, 0) for strand in strands), dtype=np.int8, count=count)
+        if chroms is None:
+            self.chrom_codes, self.chrom_names = np.full(count, -1, dtype=np.int32), []
+        else:
+            self.chrom_codes, self.chrom_names = _encodeCategory(list(chroms))
+        self.names = None if names is None else list(names)
+        for column in ('start', 'end', 'strand', 'chrom_codes') + self._columns:
+            if len(getattr(self, column)) != count:
+                raise ValueError("Error: length of column `{}` not equal to number of records".format(column))
+
+    def _take(self, indices: np.ndarray):
+        """ new table of selected rows """
+        other = self.__class__.__new__(self.__class__)
+        for column in ('start', 'end', 'strand', 'chrom_codes') + self._columns:
+            setattr(other, column, getattr(self, column)[indices])
+        other.chrom_names = self.chrom_names
+        other.names = None if self.names is None else [self.names[index] for index in indices]
+        other.sequences = self.sequences.take(indices)
+        return other
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            index = _checkIndex(key, len(self))
+            return self._object(index, self.sequences[index])
+        return self._take(np.arange(len(self))[key])
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """ sequence length of each record """
+        return self.sequences.lengths
+
+    @property
+    def chrom(self) -> np.ndarray:
+        """ chrom name of each record (object array, None if not set) """
+        names = np.array(self.chrom_names + [None], dtype=object)
+        return names[self.chrom_codes]
+
+    def _setObject(self, obj, index: int) -> None:
+        """ set common attributes of template object """
+        if self.start[index] >= 0:
+            obj.setPosition(self.start[index], self.end[index])
+        strand = _STRAND_NAME[int(self.strand[index])]
+        if strand is not None:
+            obj.setStrand(strand)
+        if self.chrom_codes[index] >= 0:
+            obj.setChrom(self.chrom_names[self.chrom_codes[index]])
+        if self.names is not None:
+            obj.setName(self.names[index])
+
+    def __iter__(self):
+        for index, sequence in enumerate(self.sequences):
+            yield self._object(index, sequence)
+
+    def records(self):
+        """ iterate `__slots__` records (`template.MicroRNARecord` / `template.HairpinRecord`) """
+        for index, sequence in enumerate(self.sequences):
+            yield self._object(index, sequence, record=True)
+
+    def _commonFrame(self) -> dict:
+        return {
+            'name'   : self.names if self.names is not None else np.arange(len(self)),
+            'chrom'  : pd.Categorical.from_codes(self.chrom_codes, categories=self.chrom_names)
+                if self.chrom_names else self.chrom,
+            'start'  : self.start,
+            'end'    : self.end,
+            'strand' : [_STRAND_NAME[code] for code in self.strand.tolist()],
+            'seq'    : list(self.sequences),
+        }
+
+
+class MicroRNATable(_RecordTable):
+    """
+    MicroRNATable :
+        columnar table of `template.MicroRNA` (reads)
+    ---
+        - columns : `sequences` (SequenceStore), `start`, `end`, `strand`, `count`, `arm`, `chrom_codes`, `names`
+        - `getArms(hairpin_position)` : vectorized `MicroRNA.getArm`
+    ---
+        example :
+        >>> objMicroRNATable = MicroRNATable(["UGACAGAAGAGAGUGAGCAC"], starts=[101], ends=[120], strands=['+'])
+        >>> objMicroRNATable.getArms(template.Position(100, 180)).arm
+        array([1], dtype=int8)
+        >>> next(iter(objMicroRNATable)).arm
+        '5p'
+    """
+    _columns = ('count', 'arm')
+
+    def __init__(self, sequences: Iterable[str] = (), starts=None, ends=None, strands=None,
+                 counts=None, chroms=None, names=None, arms=None) -> None:
+        self.sequences = sequences if isinstance(sequences, SequenceStore) else SequenceStore(sequences)
+        count = len(self.sequences)
+        self.count = np.ones(count, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.arm = np.zeros(count, dtype=np.int8) if arms is None else \
+            np.fromiter((_ARM_CODE.get(arm, 0) for arm in arms), dtype=np.int8, count=count)
+        self._setCommon(count, starts, ends, strands, chroms, names)
+
+    def _object(self, index: int, sequence: str, record: bool = False):
+        obj = MicroRNARecord(sequence) if record else MicroRNA(sequence)
+        obj.setCount(int(self.count[index]))
+        if self.arm[index]:
+            obj.setArm(_ARM_NAME[int(self.arm[index])])
+        self._setObject(obj, index)
+        return obj
+
+    @classmethod
+    def fromObjects(cls, objects: Iterable) -> MicroRNATable:
+        """ table of `template.MicroRNA` objects (attribute not set -> default) """
+        listObjects = list(objects)
+        return cls(
+            [obj.seq for obj in listObjects],
+            starts=[obj.position.start if hasattr(obj, 'position') else -1 for obj in listObjects],
+            ends=[obj.position.end if hasattr(obj, 'position') else -1 for obj in listObjects],
+            strands=[getattr(obj, 'strand', None) for obj in listObjects],
+            counts=[getattr(obj, 'count', 1) for obj in listObjects],
+            chroms=[getattr(obj, 'chrom', None) for obj in listObjects],
+            names=[getattr(obj, 'name', None) for obj in listObjects],
+            arms=[getattr(obj, 'arm', None) for obj in listObjects],
+        )
+
+    @classmethod
+    def fromFasta(cls, fasta_file: str) -> MicroRNATable:
+        """
+        table of (collapsed) reads fasta :
+            - count from header : fastx_collapser `>1-3456` or `>name_x3456` (else 1)
+        """
+        listNames, listSequences, listCounts = [], [], []
+        with fasta.openFasta(fasta_file) as f:
+            for record in fasta.Fasta(f):
+                name = record.head.split(' ')[0]
+                listNames.append(name)
+                listSequences.append(record.sequence)
+                listCounts.append(_countOfName(name))
+        return cls(listSequences, counts=listCounts, names=listNames)
+
+    @classmethod
+    def fromBed(cls, bed_file: str, score_is_count: bool = False) -> MicroRNATable:
+        """
+        table of mapped reads BED (chrom, start, end, name, score, strand) :
+            - position is 1-based (BED start + 1), sequence is empty
+            - count from name (same as `fromFasta` ; else 1)
+                score_is_count true : count from score column
+                (`bedtools bamtobed` score is MAPQ, not count)
+        """
+        pdfBed = pd.read_csv(bed_file, sep='\t', header=None, comment='#')
+        count = len(pdfBed)
+        if score_is_count:
+            if 4 not in pdfBed:
+                raise ValueError("Error: '{}' has no score column".format(bed_file))
+            counts = pd.to_numeric(pdfBed[4], errors='coerce').fillna(1)
+        elif 3 in pdfBed:
+            counts = [_countOfName(name) for name in pdfBed[3].astype(str).tolist()]
+        else:
+            counts = None
+        return cls(
+            [''] * count,
+            starts=pdfBed[1].to_numpy() + 1,
+            ends=pdfBed[2].to_numpy(),
+            strands=pdfBed[5].tolist() if 5 in pdfBed else None,
+            counts=counts,
+            chroms=pdfBed[0].astype(str).tolist(),
+            names=pdfBed[3].astype(str).tolist() if 3 in pdfBed else None,
+        )
+
+    def getArms(self, hairpin_position) -> MicroRNATable:
+        """ set `arm` of all records by one hairpin position (same rule as `MicroRNA.getArm`) """
+        half_point = int(sum(hairpin_position) / 2)
+        inside = (hairpin_position.start < self.start) & (self.start < half_point)
+        plus = self.strand == 1
+        self.arm = np.where(inside == plus, _ARM_CODE['5p'], _ARM_CODE['3p']).astype(np.int8)
+        return self
+
+    @property
+    def totalCount(self) -> int:
+        return int(self.count.sum())
+
+    def toDataFrame(self) -> pd.DataFrame:
+        dictColumns = self._commonFrame()
+        dictColumns['count'] = self.count
+        dictColumns['arm'] = [_ARM_NAME[code] for code in self.arm.tolist()]
+        return pd.DataFrame(dictColumns)
+
+
+class HairpinTable(_RecordTable):
+    """
+    HairpinTable :
+        columnar table of `template.Hairpin` (precursor + RNAfold structure)
+    ---
+        - columns : `sequences` (SequenceStore), `structs` (uint8), `start`, `end`, `strand`, `mfe`,
+            `chrom_codes`, `names`
+        - `getStruct(i)` ; `structureBatch()` : `structure.StructureBatch` of all structures
+    ---
+        example :
+        >>> objHairpinTable = HairpinTable.fromRNAfold("..hairpin.fold.gz")
+        >>> objHairpinTable = objHairpinTable[objHairpinTable.mfe <= -20]
+        >>> objStructureBatch = objHairpinTable.structureBatch()
+    """
+    _columns = ('mfe',)
+
+    def __init__(self, sequences: Iterable[str] = (), structs: Optional[Iterable[str]] = None, starts=None, ends=None,
+                 strands=None, mfes=None, chroms=None, names=None) -> None:
+        self.sequences = sequences if isinstance(sequences, SequenceStore) else SequenceStore(sequences)
+        count = len(self.sequences)
+        if structs is None:
+            self.structs = np.full(int(self.sequences.offsets[-1]), ord('.'), dtype=np.uint8)
+        else:
+            listStructs = list(structs)
+            if [len(struct) for struct in listStructs] != self.sequences.lengths.tolist():
+                raise ValueError("Error: length of struct not equal to sequence")
+            self.structs = np.frombuffer(''.join(listStructs).encode(), dtype=np.uint8).copy()
+        self.mfe = np.full(count, np.nan) if mfes is None else np.asarray(mfes, dtype=np.float64)
+        self._setCommon(count, starts, ends, strands, chroms, names)
+
+    def _take(self, indices: np.ndarray) -> HairpinTable:
+        other = super()._take(indices)
+        offsets = self.sequences.offsets
+        listStructs = [self.structs[offsets[index]:offsets[index + 1]] for index in indices]
+        other.structs = np.concatenate(listStructs) if listStructs else np.zeros(0, dtype=np.uint8)
+        return other
+
+    def getStruct(self, index: int) -> str:
+        offsets = self.sequences.offsets
+        return self.structs[offsets[index]:offsets[index + 1]].tobytes().decode()
+
+    def structureBatch(self) -> StructureBatch:
+        """ `structure.StructureBatch` of all structures (same order) """
+        return StructureBatch([self.getStruct(index) for index in range(len(self))])
+
+    def _object(self, index: int, sequence: str, record: bool = False):
+        obj = HairpinRecord(sequence) if record else Hairpin(sequence)
+        obj.setStruct(self.getStruct(index))
+        if not np.isnan(self.mfe[index]):
+            obj.setMFE(self.mfe[index])
+        self._setObject(obj, index)
+        return obj
+
+    @classmethod
+    def fromObjects(cls, objects: Iterable) -> HairpinTable:
+        """ table of `template.Hairpin` objects (attribute not set -> default) """
+        listObjects = list(objects)
+        return cls(
+            [obj.seq for obj in listObjects],
+            structs=[getattr(obj, 'struct', '.' * len(obj.seq)) for obj in listObjects],
+            starts=[obj.position.start if hasattr(obj, 'position') else -1 for obj in listObjects],
+            ends=[obj.position.end if hasattr(obj, 'position') else -1 for obj in listObjects],
+            strands=[getattr(obj, 'strand', None) for obj in listObjects],
+            mfes=[getattr(obj, 'mfe', np.nan) for obj in listObjects],
+            chroms=[getattr(obj, 'chrom', None) for obj in listObjects],
+            names=[getattr(obj, 'name', None) for obj in listObjects],
+        )
+
+    @classmethod
+    def fromRNAfold(cls, rnafold_file: str) -> HairpinTable:
+        """ table of RNAfold output (see `rnafold.readRNAfold` ; append columns while reading, not keep Hairpin) """
+        listSequences, listStarts, listEnds, listStrands, listMFEs, listChroms, listNames = [], [], [], [], [], [], []
+        arrayStructs = bytearray()
+        for objHairpin in rnafold.readRNAfold(rnafold_file):
+            listSequences.append(objHairpin.seq)
+            arrayStructs += objHairpin.struct.encode()
+            position = getattr(objHairpin, 'position', None)
+            listStarts.append(-1 if position is None else position.start)
+            listEnds.append(-1 if position is None else position.end)
+            listStrands.append(getattr(objHairpin, 'strand', None))
+            listMFEs.append(objHairpin.mfe)
+            listChroms.append(getattr(objHairpin, 'chrom', None))
+            listNames.append(objHairpin.name)
+        objHairpinTable = cls(
+            listSequences, starts=listStarts, ends=listEnds, strands=listStrands, mfes=listMFEs,
+            chroms=listChroms, names=listNames,
+        )
+        # NOTE: `readRNAfold` 已檢查 struct 與 sequence 等長
+        objHairpinTable.structs = np.frombuffer(arrayStructs, dtype=np.uint8)
+        return objHairpinTable
+
+    def toDataFrame(self) -> pd.DataFrame:
+        dictColumns = self._commonFrame()
+        dictColumns['struct'] = [self.getStruct(index) for index in range(len(self))]
+        dictColumns['mfe'] = self.mfe
+        return pd.DataFrame(dictColumns)
+
+
+def _groupByChromStrand(objTable: _RecordTable) -> dict:
+    """ {(chrom, strand code): row index} of records with chrom and position (sort once) """
+    valid = np.flatnonzero((objTable.chrom_codes >= 0) & (objTable.start >= 0))
+    keys = objTable.chrom_codes[valid].astype(np.int64) * 3 + objTable.strand[valid] + 1
+    order = np.argsort(keys, kind='stable')
+    valid, keys = valid[order], keys[order]
+    unique_keys, group_starts = np.unique(keys, return_index=True)
+    group_ends = np.append(group_starts[1:], len(keys))
+    return {
+        (objTable.chrom_names[key // 3], key % 3 - 1): valid[start:end]
+        for key, start, end in zip(unique_keys.tolist(), group_starts, group_ends)
+    }
+
+
+class HairpinIndex(object):
+    """
+    HairpinIndex :
+        sorted interval index of hairpin positions (per chrom and strand) for bulk read assignment
+    ---
+        - `overlaps(reads)` : (read index, hairpin index) of all overlapping pairs (binary search)
+        - `assignArms(reads)` : arm of each pair (same rule as `MicroRNA.getArm`)
+            and 5p / 3p read count (sum of `count`) of each hairpin
+        - read and hairpin must have same chrom and strand, and position (1-based, include end)
+    ---
+        example :
+        >>> objHairpinIndex = HairpinIndex(HairpinTable.fromRNAfold("..hairpin.fold"))
+        >>> pdfArmCounts = objHairpinIndex.assignArms(MicroRNATable.fromBed("..reads.bed"))
+        >>> pdfArmCounts
+            name	chrom	start	end	strand	5p	3p
+        0	h1	L01	101	180	+	350	20
+    """
+    def __init__(self, hairpins) -> None:
+        if not isinstance(hairpins, HairpinTable):
+            hairpins = HairpinTable.fromObjects(hairpins)
+        self.hairpins = hairpins
+        self._dictGroups = {}
+        # NOTE: 各 (chrom, strand) 依 start 排序後的 start / end / hairpin index / 最長 hairpin
+        for (chrom, strand), index in _groupByChromStrand(hairpins).items():
+            index = index[np.argsort(hairpins.start[index], kind='stable')]
+            self._dictGroups[chrom, strand] = (
+                hairpins.start[index], hairpins.end[index], index,
+                int((hairpins.end[index] - hairpins.start[index]).max()),
+            )
+
+    def overlaps(self, reads: MicroRNATable):
+        """ (read index, hairpin index) of overlapping pairs (read start <= hairpin end, read end >= hairpin start) """
+        listReads, listHairpins = [], []
+        for (chrom, strand), group_reads in _groupByChromStrand(reads).items():
+            if (chrom, strand) not in self._dictGroups:
+                continue
+            starts, ends, hairpin_index, max_length = self._dictGroups[chrom, strand]
+            read_starts, read_ends = reads.start[group_reads], reads.end[group_reads]
+            # NOTE: 候選 hairpin : start 在 [read start - 最長 hairpin, read end] 之間
+            low = np.searchsorted(starts, read_starts - max_length, side='left')
+            high = np.searchsorted(starts, read_ends, side='right')
+            number = high - low
+            pair_reads = np.repeat(np.arange(len(group_reads)), number)
+            pair_hairpins = np.arange(number.sum()) - np.repeat(np.cumsum(number) - number, number) + \
+                np.repeat(low, number)
+            overlap = ends[pair_hairpins] >= read_starts[pair_reads]
+            listReads.append(group_reads[pair_reads[overlap]])
+            listHairpins.append(hairpin_index[pair_hairpins[overlap]])
+        if not listReads:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(listReads), np.concatenate(listHairpins)
+
+    def assignArms(self, reads, return_pairs: bool = False):
+        """
+        5p / 3p read count of each hairpin :
+            input : reads (`MicroRNATable` or list of `template.MicroRNA`)
+            output : DataFrame (name, chrom, start, end, strand, 5p, 3p)
+                - return_pairs true : also return DataFrame of pairs (read, hairpin, arm)
+        """
+        if not isinstance(reads, MicroRNATable):
+            reads = MicroRNATable.fromObjects(reads)
+        read_index, hairpin_index = self.overlaps(reads)
+        # NOTE: 同 MicroRNA.getArm : hairpin start < read start < 中點 -> + 股 5p / - 股 3p
+        hairpin_start, hairpin_end = self.hairpins.start[hairpin_index], self.hairpins.end[hairpin_index]
+        half_point = (hairpin_start + hairpin_end) // 2
+        inside = (hairpin_start < reads.start[read_index]) & (reads.start[read_index] < half_point)
+        is_5p = inside == (reads.strand[read_index] == 1)
+        counts = reads.count[read_index]
+        count = len(self.hairpins)
+        pdfArmCounts = pd.DataFrame({
+            'name'   : self.hairpins.names if self.hairpins.names is not None else np.arange(count),
+            'chrom'  : self.hairpins.chrom,
+            'start'  : self.hairpins.start,
+            'end'    : self.hairpins.end,
+            'strand' : [_STRAND_NAME[code] for code in self.hairpins.strand.tolist()],
+            '5p'     : np.bincount(hairpin_index[is_5p], weights=counts[is_5p], minlength=count).astype(np.int64),
+            '3p'     : np.bincount(hairpin_index[~is_5p], weights=counts[~is_5p], minlength=count).astype(np.int64),
+        })
+        if not return_pairs:
+            return pdfArmCounts
+        pdfPairs = pd.DataFrame({
+            'read'    : read_index,
+            'hairpin' : hairpin_index,
+            'arm'     : np.where(is_5p, '5p', '3p'),
+        })
+        return pdfArmCounts, pdfPairs
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+miRNA target search (seed index + full length complementarity) :
+
+    1. `SeedIndex` index all transcripts by k-mer (default 7 nt, seed complement of miRNA 2-8)
+    2. `TargetSearch` for each miRNA :
+        - lookup seed complement in index (not brute-force scan transcripts)
+        - extend hit to full length (no gap), score mismatch and G:U wobble (vectorized)
+        - output predicted `Cleavage_Position` (same shape as PAREsnip2 results)
+---
+Abstract:
+    - score (Allen et al. 2005) :
+        mismatch 1, G:U 0.5, double score in miRNA position 2-13
+    - Cleavage_Position : 1-based transcript position paired with miRNA position 10
+        (5' end of degradome tag, between miRNA position 10 and 11)
+    - output can input to `PipelineTool.degradome.DegradomeAlign` as `pdfPipelineResults`
+    - example :
+        >>> objTargetSearch = TargetSearch("..transcriptome.fa")
+        >>> pdfTargets = objTargetSearch.search(fasta.readAsDict("..miRNA.fa"))
+        >>> pdfTargets
+            miRNA	Transcript_ID	Site_Start	Site_End	Cleavage_Position	Score	Mismatch	GU
+        0	miR156a	TranscriptA	1001	1021	1012	0.0	0	0
+        ...
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from . import fasta
+from . import kmer
+from .template import MicroRNA
+
+# NOTE: miRNA 上 seed 位置 (1-based, 含頭尾) 與 cleavage 位置
+SEED_START = 2
+SEED_END = 8
+CLEAVAGE_POSITION = 10
+# NOTE: 分數加倍的位置 (1-based, 含頭尾)
+CORE_START = 2
+CORE_END = 13
+
+
+class SeedIndex(object):
+    """
+    SeedIndex :
+        k-mer index of all transcripts (concatenate transcripts to one code array)
+    ---
+        - `lookup(value)` : global start position of k-mer in code array
+        - memory : about 7 bytes per base (code, sorted k-mer and its position)
+    """
+    def __init__(self, dictTranscripts: Dict[str, str], k: int = SEED_END - SEED_START + 1) -> None:
+        self.k = k
+        self.names: List[str] = list(dictTranscripts)
+        listCodes = []
+        listOffsets = [0]
+        for name in self.names:
+            codes = kmer.encode(str(dictTranscripts[name]))
+            # NOTE: transcript 之間補一個 N (code 4)，避免 k-mer 跨 transcript
+            listCodes.append(codes)
+            listCodes.append(np.full(1, 4, dtype=np.uint8))
+            listOffsets.append(listOffsets[-1] + len(codes) + 1)
+        self.codes = np.concatenate(listCodes) if listCodes else np.zeros(0, dtype=np.uint8)
+        self.offsets = np.array(listOffsets, dtype=np.int64)
+        self.lengths = np.diff(self.offsets) - 1
+
+        values, positions = kmer.kmerValues(self.codes, k)
+        # NOTE: k <= 8 時 k-mer 為 uint16 (numpy stable sort 對 16 bits 整數為 radix sort)
+        order = np.argsort(values, kind='stable')
+        self._values = values[order]
+        self._positions = positions[order].astype(np.int32 if len(self.codes) < 2 ** 31 else np.int64)
+
+    def lookup(self, value: int) -> np.ndarray:
+        """ global start positions of k-mer integer """
+        value = self._values.dtype.type(value)
+        start = np.searchsorted(self._values, value, side='left')
+        end = np.searchsorted(self._values, value, side='right')
+        return self._positions[start:end].astype(np.int64)
+
+    def transcriptOf(self, positions: np.ndarray) -> np.ndarray:
+        """ transcript index of global positions """
+        return np.searchsorted(self.offsets, positions, side='right') - 1
+
+
+class TargetSearch(object):
+    """
+    TargetSearch :
+        search miRNA target sites on transcriptome
+    ---
+        - input : transcriptome fasta path or dict (`fasta.readAsDict`)
+        - `search(miRNAs)` : miRNAs is dict {name: seq}, list of (name, seq)
+            or list of `template.MicroRNA` (name is `.name` if set, else sequence)
+    ---
+        args :
+            max_score : max score of site (default : 4.0)
+            allow_cleavage_mismatch : true/false (allow mismatch / G:U at miRNA position 10, 11)
+                default : false
+    ---
+        example :
+        >>> objTargetSearch = TargetSearch(dictTranscriptome)
+        >>> pdfTargets = objTargetSearch.search({"miR156a": "UGACAGAAGAGAGUGAGCAC"})
+        >>> objAlyDegradomeAlign = DegradomeAlign(pdfTargets, dictAlginFilePdfData, ...)
+    """
+    def __init__(self, transcriptome: Union[str, Dict[str, str]], max_score: float = 4.0, allow_cleavage_mismatch: bool = False) -> None:
+        if isinstance(transcriptome, str):
+            transcriptome = fasta.readAsDict(transcriptome)
+        self.max_score = max_score
+        self.allow_cleavage_mismatch = allow_cleavage_mismatch
+        self.index = SeedIndex(transcriptome)
+
+    @staticmethod
+    def _iterMiRNAs(miRNAs) -> Iterable[Tuple[str, str]]:
+        """ (name, sequence) of input miRNAs """
+        if isinstance(miRNAs, dict):
+            yield from miRNAs.items()
+            return
+        for miRNA in miRNAs:
+            if isinstance(miRNA, MicroRNA):
+                yield getattr(miRNA, 'name', miRNA.seq), miRNA.seq
+            else:
+                yield miRNA[0], miRNA[1]
+
+    def searchOne(self, name: str, sequence: str) -> pd.DataFrame:
+        """ target sites of one miRNA (DataFrame, see `search`) """
+        miRNA = kmer.encode(sequence.upper().replace('U', 'T'))
+        length = len(miRNA)
+        if length < CORE_END or (miRNA > 3).any():
+            return self._emptyResult()
+
+        # NOTE: target site (transcript 5'->3') 第 j 個 base 與 miRNA 第 length - j 個 base (1-based) 配對
+        miRNA_pair = miRNA[::-1]
+        expected = (3 - miRNA_pair).astype(np.uint8)
+        miRNA_position = length - np.arange(length)
+        weights = np.where((miRNA_position >= CORE_START) & (miRNA_position <= CORE_END), 2.0, 1.0)
+
+        seed_offset = length - SEED_END
+        seed_value = kmer.kmerValues(expected[seed_offset:seed_offset + self.index.k], self.index.k)[0]
+        if len(seed_value) == 0:
+            return self._emptyResult()
+        starts = self.index.lookup(int(seed_value[0])) - seed_offset
+
+        # NOTE: site 不可超出 transcript 範圍
+        transcripts = self.index.transcriptOf(np.maximum(starts, 0))
+        inside = (starts >= self.index.offsets[transcripts]) & \
+            (starts + length <= self.index.offsets[transcripts] + self.index.lengths[transcripts])
+        starts, transcripts = starts[inside], transcripts[inside]
+        if len(starts) == 0:
+            return self._emptyResult()
+
+        windows = self.index.codes[starts[:, None] + np.arange(length)[None, :]]
+        match = windows == expected[None, :]
+        # NOTE: G:U wobble : miRNA G 對 target U(T) ; miRNA U 對 target G
+        wobble = ((miRNA_pair == 2)[None, :] & (windows == 3)) | ((miRNA_pair == 3)[None, :] & (windows == 2))
+        mismatch = ~match & ~wobble
+        score = (mismatch * weights).sum(axis=1) + (wobble * weights).sum(axis=1) * 0.5
+        keep = score <= self.max_score
+        if not self.allow_cleavage_mismatch:
+            cleavage_columns = [length - CLEAVAGE_POSITION, length - CLEAVAGE_POSITION - 1]
+            keep &= match[:, cleavage_columns].all(axis=1)
+
+        starts, transcripts = starts[keep], transcripts[keep]
+        site_start = starts - self.index.offsets[transcripts] + 1
+        return pd.DataFrame({
+            'miRNA'             : name,
+            'Transcript_ID'     : [self.index.names[index] for index in transcripts],
+            'Site_Start'        : site_start,
+            'Site_End'          : site_start + length - 1,
+            'Cleavage_Position' : site_start + length - CLEAVAGE_POSITION,
+            'Score'             : score[keep],
+            'Mismatch'          : mismatch[keep].sum(axis=1),
+            'GU'                : wobble[keep].sum(axis=1),
+        })
+
+    def search(self, miRNAs: Union[Dict[str, str], List]) -> pd.DataFrame:
+        """
+        target sites of all miRNAs :
+            output : DataFrame
+                miRNA, Transcript_ID, Site_Start, Site_End (1-based),
+                Cleavage_Position (1-based), Score, Mismatch, GU
+        """
+        listResults = [self.searchOne(name, sequence) for name, sequence in self._iterMiRNAs(miRNAs)]
+        listResults = [result for result in listResults if len(result)]
+        if not listResults:
+            return self._emptyResult()
+        return pd.concat(listResults, ignore_index=True)
+
+    @staticmethod
+    def _emptyResult() -> pd.DataFrame:
+        return pd.DataFrame(columns=[
+            'miRNA', 'Transcript_ID', 'Site_Start', 'Site_End', 'Cleavage_Position', 'Score', 'Mismatch', 'GU'
+        ])
@@ -1,11 +1,13 @@
 #!/usr/bin/env python
 
+import abc
 import collections
 
 Position = collections.namedtuple('Position', 'start end')
 
 
-class MicroRNA:
+# NOTE: ABCMeta 只為了 `register` (slots 版本的 record 也視為 MicroRNA / Hairpin，isinstance 判斷可用)
+class MicroRNA(metaclass=abc.ABCMeta):
     def __init__(self, seq=None):
         self.seq = seq
 
@@ -15,6 +17,12 @@ class MicroRNA:
     def setCount(self, count):
         self.count = count
 
+    def setName(self, name):
+        self.name = name
+
+    def setChrom(self, chrom):
+        self.chrom = chrom
+
     def setStrand(self, strand):
         self.strand = strand
 
@@ -35,7 +43,7 @@ class MicroRNA:
         return 'MicroRNA {}'.format(self.seq)
 
 
-class Hairpin:
+class Hairpin(metaclass=abc.ABCMeta):
     def __init__(self, seq=None):
         self.seq = seq
 
@@ -45,6 +53,15 @@ class Hairpin:
     def setStruct(self, struct):
         self.struct = struct
 
+    def setName(self, name):
+        self.name = name
+
+    def setChrom(self, chrom):
+        self.chrom = chrom
+
+    def setMFE(self, mfe):
+        self.mfe = float(mfe)
+
     def setStrand(self, strand):
         self.strand = strand
 
@@ -61,3 +78,38 @@ class Mature(MicroRNA):
 
 class Star(MicroRNA):
     pass
+
+
+# NOTE: __slots__ 版本 (沒有 per-instance __dict__)，大量 reads 時省記憶體 ; method 與原本 class 相同
+#       不繼承原本 class (繼承會帶回 __dict__)，以 `register` 讓 isinstance(record, MicroRNA / Hairpin) 為 True
+class MicroRNARecord:
+    __slots__ = ('seq', 'count', 'strand', 'position', 'arm', 'name', 'chrom')
+
+    __init__ = MicroRNA.__init__
+    setSeq = MicroRNA.setSeq
+    setCount = MicroRNA.setCount
+    setName = MicroRNA.setName
+    setChrom = MicroRNA.setChrom
+    setStrand = MicroRNA.setStrand
+    setPosition = MicroRNA.setPosition
+    getArm = MicroRNA.getArm
+    setArm = MicroRNA.setArm
+    __str__ = MicroRNA.__str__
+
+
+class HairpinRecord:
+    __slots__ = ('seq', 'struct', 'strand', 'position', 'name', 'chrom', 'mfe')
+
+    __init__ = Hairpin.__init__
+    setSeq = Hairpin.setSeq
+    setStruct = Hairpin.setStruct
+    setName = Hairpin.setName
+    setChrom = Hairpin.setChrom
+    setMFE = Hairpin.setMFE
+    setStrand = Hairpin.setStrand
+    setPosition = Hairpin.setPosition
+    __str__ = Hairpin.__str__
+
+
+MicroRNA.register(MicroRNARecord)
+Hairpin.register(HairpinRecord)
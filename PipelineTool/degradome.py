@@ -96,6 +96,8 @@ class DegradomeAlign(object):
 
             input: 
                 >>> dictTranscriptome_SeqLen = {'transcriptA' : len(sequence), ..., 'transcriptsB ...}
+                # or only read length (not read sequence) from transcriptome fasta
+                >>> dictTranscriptome_SeqLen = fasta.readLengths("..transcriptome.fa", sidecar=True)
                 >>> TargetPositionInfo = DegradomeAlign.getTargetPositionInfo(dictTranscriptome_SeqLen)
             output: 
                 # if target is transcriptA
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+benchmark of `GetGeneIsoformCount` : row-wise path (`_get_gene_id` / iterrows / `_add_isoform_count`) vs vectorized
+    usage : python benchmarks/bench_gene_isoform_count.py [rows (default : 1000000)]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from AnalysisTool.app.transcriptome import GetGeneIsoformCount
+
+
+def transcriptTable(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'transcript_id': ['PggD{}_c{}_g1_i{}'.format(gene, component, isoform) for gene, component, isoform in zip(
+        rng.integers(0, max(n // 4, 1), n), rng.integers(0, 30, n), rng.integers(1, 8, n)
+    )]})
+
+
+def rowWise(data):
+    objGetGeneIsoformCount = GetGeneIsoformCount(data, gene_id_include=True)
+    data['gene_id'] = data.apply(objGetGeneIsoformCount._get_gene_id, axis=1)
+    for _, row in data.iterrows():
+        gene_id = row['gene_id']
+        objGetGeneIsoformCount.dictGeneIsoFormCount[gene_id] = objGetGeneIsoformCount.dictGeneIsoFormCount.get(gene_id, 0) + 1
+    data['isoform_count'] = data.apply(objGetGeneIsoformCount._add_isoform_count, axis=1)
+    return data
+
+
+def vectorized(data):
+    objGetGeneIsoformCount = GetGeneIsoformCount(data)
+    objGetGeneIsoformCount.CountGeneIsoform()
+    return objGetGeneIsoformCount.GetResults()
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    data = transcriptTable(rows)
+    dictResults = {}
+    for name, function in (('row-wise', rowWise), ('vectorized', vectorized)):
+        start = time.perf_counter()
+        dictResults[name] = function(data.copy())
+        print('{:<10} {:>8.2f} s'.format(name, time.perf_counter() - start))
+    pd.testing.assert_frame_equal(dictResults['row-wise'], dictResults['vectorized'])
+    print('results identical ({} rows)'.format(rows))
@@ -0,0 +1,31 @@
+import os
+import struct
+import sys
+import zlib
+
+import pytest
+
+# NOTE: 以 repo 根目錄為 import 路徑 (`import AnalysisTool`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BGZF_EOF = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+
+
+def _bgzfBlock(data: bytes) -> bytes:
+    """ one BGZF block (gzip member with `BC` extra field) """
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    payload = compressor.compress(data) + compressor.flush()
+    header = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00' + struct.pack('<H', len(payload) + 25)
+    return header + payload + struct.pack('<II', zlib.crc32(data), len(data))
+
+
+@pytest.fixture
+def writeBgzf():
+    """ write BGZF file (like `bgzip`, without bgzip / pysam) """
+    def write(path, data: bytes, block_size: int = 1000):
+        with open(path, 'wb') as f:
+            for start in range(0, len(data), block_size):
+                f.write(_bgzfBlock(data[start:start + block_size]))
+            f.write(BGZF_EOF)
+        return str(path)
+    return write
@@ -0,0 +1,16 @@
+import os
+from AnalysisTool import cache
+
+
+def test_concurrent_build_reuse_cache(tmp_path):
+    fasta_file = tmp_path / "genome.fa"
+    fasta_file.write_text(">L01 chr1\nACGTacgt\nNNAC\n>L02\nGGGG\n")
+    objReferenceCache = cache.ReferenceCache(str(tmp_path / "cache"))
+    dictGenome = objReferenceCache.load(str(fasta_file))
+    assert dictGenome['L01'] == 'ACGTACGTNNAC'
+    # NOTE: 模擬其他 process 先完成 : cache_path 已存在時再 build 一次
+    cache_path = os.path.join(objReferenceCache.cache_dir, cache.fingerprint(str(fasta_file), True, True))
+    objReferenceCache._build(str(fasta_file), cache_path, True, True)
+    assert sorted(os.listdir(objReferenceCache.cache_dir)) == [os.path.basename(cache_path)]
+    dictGenome = objReferenceCache.load(str(fasta_file))
+    assert dictGenome['L01'] == 'ACGTACGTNNAC' and dictGenome['L02'] == 'GGGG'
@@ -0,0 +1,99 @@
+import gzip
+import io
+import random
+import pytest
+from AnalysisTool import compress, fasta
+
+
+def randomContent(seed=0, count=40):
+    rng = random.Random(seed)
+    listLines = []
+    for index in range(count):
+        listLines.append('>r{} info'.format(index))
+        sequence = ''.join(rng.choice('ACGTNacgt') for _ in range(rng.randint(0, 400)))
+        listLines.extend(sequence[start:start + 60] for start in range(0, len(sequence), 60))
+    return ('\n'.join(listLines) + '\n').encode()
+
+
+@pytest.fixture
+def files(tmp_path, writeBgzf):
+    content = randomContent()
+    plain = tmp_path / "genome.fa"
+    plain.write_bytes(content)
+    gzip_file = tmp_path / "genome.fa.gzip.gz"
+    gzip_file.write_bytes(gzip.compress(content))
+    bgzf_file = writeBgzf(tmp_path / "genome.fa.gz", content, block_size=333)
+    return content, str(plain), str(gzip_file), bgzf_file
+
+
+def test_detect_compression(files):
+    _, plain, gzip_file, bgzf_file = files
+    assert compress.detectCompression(plain) is None
+    assert compress.detectCompression(gzip_file) == 'gzip'
+    assert compress.detectCompression(bgzf_file) == 'bgzf'
+
+
+@pytest.mark.parametrize("threaded", [True, False])
+def test_open_fasta_same_as_plain(files, threaded):
+    content, plain, gzip_file, bgzf_file = files
+    for file in (plain, gzip_file, bgzf_file):
+        with compress.openFasta(file, threaded=threaded) as f:
+            assert f.read() == content
+    dictExpected = fasta.readAsDict(plain)
+    assert fasta.readAsDict(gzip_file) == dictExpected
+    assert fasta.readAsDict(bgzf_file) == dictExpected
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 4096])
+def test_threaded_reader_same_as_stream(block_size):
+    content = randomContent(1)
+    rng = random.Random(block_size)
+    listParts = []
+    with compress.ThreadedReader(io.BytesIO(content), block_size=block_size, max_blocks=2) as f:
+        while True:
+            part = f.read(rng.randint(1, 100))
+            if not part:
+                break
+            listParts.append(part)
+    assert b''.join(listParts) == content
+
+
+def test_gzi_round_trip_and_random_access(files, tmp_path):
+    content, _, _, bgzf_file = files
+    listBlocks = compress.buildGzi(bgzf_file)
+    assert listBlocks[0] == (0, 0)
+    assert [uncompressed for _, uncompressed in listBlocks] == list(range(0, len(content), 333))
+    assert compress.readGzi(bgzf_file + '.gzi') == listBlocks
+    objBgzfReader = compress.BgzfReader(bgzf_file)
+    rng = random.Random(2)
+    for _ in range(300):
+        start = rng.randint(0, len(content) + 10)
+        end = rng.randint(start, len(content) + 20)
+        assert objBgzfReader[start:end] == content[start:end]
+    objBgzfReader.close()
+    with pytest.raises(ValueError):
+        compress.buildGzi(files[2], write=False)
+
+
+def test_lazy_bgzf_same_as_plain(files):
+    _, plain, _, bgzf_file = files
+    with fasta.readAsDict(bgzf_file, lazy=True) as dictGenome:
+        assert dict(dictGenome) == fasta.readAsDict(plain)
+
+
+def test_zstd_same_as_plain(files, tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    content, plain, _, _ = files
+    zstd_file = tmp_path / "genome.fa.zst"
+    zstd_file.write_bytes(zstandard.ZstdCompressor().compress(content))
+    assert compress.detectCompression(str(zstd_file)) == 'zstd'
+    assert fasta.readAsDict(str(zstd_file)) == fasta.readAsDict(plain)
+
+
+def test_zstd_without_package(tmp_path, monkeypatch):
+    zstd_file = tmp_path / "genome.fa.zst"
+    zstd_file.write_bytes(compress.ZSTD_MAGIC + b'\x00' * 16)
+    assert compress.detectCompression(str(zstd_file)) == 'zstd'
+    monkeypatch.setattr(compress, 'zstandard', None)
+    with pytest.raises(ImportError):
+        fasta.readAsDict(str(zstd_file))
@@ -0,0 +1,139 @@
+import random
+import pytest
+from AnalysisTool import template
+from AnalysisTool.duplex import DuplexValidator
+
+
+def stemLoop(rng, length):
+    """ hairpin-like structure : stem with mismatch / bulge around a loop """
+    listLeft, listRight = [], []
+    while len(listLeft) + len(listRight) < length - 8:
+        choice = rng.random()
+        if choice < 0.88:
+            listLeft.append('(')
+            listRight.append(')')
+        elif choice < 0.94:
+            listLeft.append('.')
+            listRight.append('.')
+        elif choice < 0.97:
+            listLeft.append('.')
+        else:
+            listRight.append('.')
+    return ''.join(listLeft) + '.' * rng.randint(3, 8) + ''.join(reversed(listRight))
+
+
+def pairTable(parentheses_seq):
+    listPartners, listStack = [-1] * len(parentheses_seq), []
+    for site, char in enumerate(parentheses_seq):
+        if char == '(':
+            listStack.append(site)
+        elif char == ')':
+            partner = listStack.pop()
+            listPartners[site], listPartners[partner] = partner, site
+    return listPartners
+
+
+def bruteForce(parentheses_seq, five_start, five_end, three_start, three_end, overhang=2):
+    """ criteria of one candidate by loop over pairs """
+    valid = 0 <= five_start <= five_end < three_start <= three_end < len(parentheses_seq)
+    listPartners = pairTable(parentheses_seq)
+    listPairs = [
+        (site, listPartners[site]) for site in range(five_start, five_end + 1)
+        if valid and three_start <= listPartners[site] <= three_end
+    ]
+    mismatch = bulge = bulge_size = 0
+    for (site, partner), (next_site, next_partner) in zip(listPairs[:-1], listPairs[1:]):
+        gap_5p, gap_3p = next_site - site - 1, partner - next_partner - 1
+        mismatch += min(gap_5p, gap_3p)
+        bulge += gap_5p != gap_3p
+        bulge_size += abs(gap_5p - gap_3p)
+    if listPairs:
+        overhang_3p = (three_end - listPairs[0][1]) - (listPairs[0][0] - five_start)
+        overhang_5p = (five_end - listPairs[-1][0]) - (listPairs[-1][1] - three_start)
+    else:
+        overhang_3p = overhang_5p = -1
+    loop_length = three_start - five_end - 1
+    passed = valid and bool(listPairs) and overhang_5p == overhang == overhang_3p and mismatch <= 4 and \
+        bulge <= 1 and bulge_size <= 2 and loop_length >= 3
+    return overhang_5p, overhang_3p, mismatch, bulge, bulge_size, loop_length, len(listPairs), passed
+
+
+def randomCandidates(rng, listStructures, count):
+    listCandidates = []
+    for _ in range(count):
+        index = rng.randrange(len(listStructures))
+        parentheses_seq = listStructures[index]
+        listPartners = pairTable(parentheses_seq)
+        listSites = [site for site, partner in enumerate(listPartners) if partner > site]
+        if listSites and rng.random() < 0.8:
+            # NOTE: 由配對位置取 duplex，兩端 overhang 為 2 (+- 1)
+            five_start = rng.choice(listSites)
+            five_end = five_start + rng.randint(18, 23) - 1
+            three_end = listPartners[five_start] + 2 + rng.choice([0, 0, 0, -1, 1])
+            listLast = [site for site in range(five_start, five_end + 1) if five_end < listPartners[site] <= three_end]
+            last_site = listLast[-1] if listLast else five_end
+            three_start = listPartners[last_site] - (five_end - last_site - 2) + rng.choice([0, 0, 0, -1, 1])
+        else:
+            five_start = rng.randint(-2, len(parentheses_seq))
+            five_end = five_start + rng.randint(-1, 25)
+            three_start = rng.randint(0, len(parentheses_seq))
+            three_end = three_start + rng.randint(0, 25)
+        listCandidates.append((index, five_start, five_end, three_start, three_end))
+    return listCandidates
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_validate_sites_same_as_brute_force(seed):
+    rng = random.Random(seed)
+    listStructures = [stemLoop(rng, rng.randint(50, 120)) for _ in range(30)]
+    listHairpins = []
+    for parentheses_seq in listStructures:
+        objHairpin = template.Hairpin('A' * len(parentheses_seq))
+        objHairpin.setStruct(parentheses_seq)
+        listHairpins.append(objHairpin)
+    listCandidates = randomCandidates(rng, listStructures, 600)
+    mask, pdfDiagnostics = DuplexValidator(listHairpins).validateSites(*zip(*listCandidates))
+    listExpected = [bruteForce(listStructures[index], *sites) for index, *sites in listCandidates]
+    listColumns = ['overhang_5p', 'overhang_3p', 'mismatch', 'bulge', 'bulge_size', 'loop_length', 'paired', 'passed']
+    assert [tuple(row) for row in pdfDiagnostics[listColumns].itertuples(index=False)] == listExpected
+    assert mask.tolist() == [expected[-1] for expected in listExpected]
+    assert 0 < mask.sum() < len(mask)
+
+
+@pytest.mark.parametrize("strand", ['+', '-'])
+def test_validate_position_same_as_sites(strand):
+    rng = random.Random(3)
+    parentheses_seq = stemLoop(rng, 90)
+    objHairpin = template.Hairpin('A' * len(parentheses_seq))
+    objHairpin.setStruct(parentheses_seq)
+    objHairpin.setStrand(strand)
+    objHairpin.setPosition(1001, 1000 + len(parentheses_seq))
+    objDuplexValidator = DuplexValidator([objHairpin])
+    listCandidates = randomCandidates(rng, [parentheses_seq], 200)
+    # NOTE: `validate` 以位置較前面的為 5p arm (只取 5p 在前且在 hairpin 內的 candidate)
+    listCandidates = [
+        candidate for candidate in listCandidates
+        if 0 <= candidate[1] < candidate[3] and candidate[4] < len(parentheses_seq)
+    ]
+    listMatures, listStars, listArms = [], [], []
+    for index, five_start, five_end, three_start, three_end in listCandidates:
+        # NOTE: local site -> genome position (- 股由 hairpin end 往回)
+        listPositions = []
+        for start, end in ((five_start, five_end), (three_start, three_end)):
+            if strand == '+':
+                listPositions.append((1001 + start, 1001 + end))
+            else:
+                listPositions.append((1000 + len(parentheses_seq) - end, 1000 + len(parentheses_seq) - start))
+        # NOTE: mature 在 5p 或 3p arm 都可 (- 股 genome 位置較前面的為 3p arm)
+        mature_arm = rng.choice(['5p', '3p'])
+        listArms.append(mature_arm)
+        objMature, objStar = template.Mature('A'), template.Star('A')
+        objMature.setPosition(*listPositions[mature_arm == '3p'])
+        objStar.setPosition(*listPositions[mature_arm == '5p'])
+        listMatures.append(objMature)
+        listStars.append(objStar)
+    mask, pdfDiagnostics = objDuplexValidator.validate([0] * len(listCandidates), listMatures, listStars)
+    expected_mask, pdfExpected = objDuplexValidator.validateSites(*zip(*listCandidates))
+    assert mask.tolist() == expected_mask.tolist()
+    assert pdfDiagnostics.drop(columns='mature_arm').equals(pdfExpected)
+    assert pdfDiagnostics['mature_arm'].tolist() == listArms
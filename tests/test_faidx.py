@@ -0,0 +1,111 @@
+import random
+import pytest
+from AnalysisTool import faidx, fasta
+
+
+@pytest.mark.parametrize("content", [
+    ">s1 desc\nACGT\nAC\nACGT\n",
+    ">s1\nACGT\n\nACGT\n",
+    ">s1\nACGT\nACGTAC\nAC\n",
+    ">s2\nAC\n>s1\nACG\nACGT\n",
+])
+def test_ragged_lines_can_not_index(tmp_path, content):
+    fasta_file = tmp_path / "ragged.fa"
+    fasta_file.write_text(content)
+    with pytest.raises(ValueError):
+        faidx.buildIndex(str(fasta_file), write=False)
+
+
+@pytest.mark.parametrize("content", [
+    ">s1\nACGT\nACGT\nAC\n",
+    ">s1\r\nACGT\r\nAC\r\n",
+    ">s1\nACGT\nACGT\n\n\n",
+    ">s1\nACGTACGT",
+])
+def test_regular_lines_same_as_stream_index(tmp_path, content):
+    fasta_file = tmp_path / "regular.fa"
+    fasta_file.write_bytes(content.encode())
+    listRecords = faidx.buildIndex(str(fasta_file), write=False)
+    with open(fasta_file, 'rb') as f:
+        assert listRecords == faidx._indexStream(f)
+
+
+CONTENT = ">s1 desc\nACGTACGTAC\nGTAC\n>s2\nacgtnnACGT\nAC\n"
+
+
+def test_can_not_write_index_keep_in_memory(tmp_path):
+    fasta_file = tmp_path / "genome.fa"
+    fasta_file.write_text(CONTENT)
+    fai_file = tmp_path / "missing" / "genome.fa.fai"
+    with faidx.FastaIndex(str(fasta_file), fai_file=str(fai_file)) as dictGenome:
+        assert dictGenome['s1'] == "ACGTACGTACGTAC"
+        assert dictGenome.fetch('s2', 2, 8) == "GTNNAC"
+    assert not fai_file.exists()
+
+
+def test_can_not_write_gzi_keep_in_memory(tmp_path, writeBgzf):
+    fasta_file = writeBgzf(tmp_path / "genome.fa.gz", CONTENT.encode(), block_size=7)
+    missing = tmp_path / "missing"
+    with faidx.FastaIndex(fasta_file, fai_file=str(missing / "genome.fa.fai"), gzi_file=str(missing / "genome.fa.gz.gzi")) as dictGenome:
+        assert dictGenome['s1'] == "ACGTACGTACGTAC"
+        assert dictGenome.fetch('s2', 2, 8, strand='-') == "GTNNAC"[::-1].translate(str.maketrans("ACGTN", "TGCAN"))
+    assert not missing.exists()
+
+
+def randomGenome(tmp_path, seed=0):
+    """ fasta of random records (different line width per record, soft-mask and N) """
+    rng = random.Random(seed)
+    dictGenome, listLines = {}, []
+    for index in range(8):
+        sequence = ''.join(rng.choice('ACGTNacgt') for _ in range(rng.randint(0, 500)))
+        linewidth = rng.choice([7, 60, 80])
+        dictGenome['chr{}'.format(index)] = sequence
+        listLines.append('>chr{} description {}'.format(index, index))
+        listLines.extend(sequence[start:start + linewidth] for start in range(0, len(sequence), linewidth))
+    fasta_file = tmp_path / "genome.fa"
+    fasta_file.write_text('\n'.join(listLines) + '\n')
+    return str(fasta_file), dictGenome
+
+
+def reverseComplement(sequence):
+    return ''.join({'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A', 'N': 'N'}[base] for base in reversed(sequence))
+
+
+def test_fetch_same_as_read_as_dict(tmp_path):
+    fasta_file, dictGenome = randomGenome(tmp_path)
+    assert fasta.readAsDict(fasta_file) == {key: sequence.upper() for key, sequence in dictGenome.items()}
+    rng = random.Random(1)
+    listRegions, listExpected = [], []
+    with faidx.FastaIndex(fasta_file) as objFastaIndex:
+        assert dict(objFastaIndex) == fasta.readAsDict(fasta_file)
+        for _ in range(300):
+            chrom = rng.choice(list(dictGenome))
+            sequence = dictGenome[chrom].upper()
+            start = rng.randint(0, len(sequence))
+            end = rng.randint(start, len(sequence) + 5)
+            strand = rng.choice('+-')
+            expected = sequence[start:end] if strand == '+' else reverseComplement(sequence[start:end])
+            assert objFastaIndex.fetch(chrom, start, end, strand) == expected
+            if start < end:
+                region = '{}:{}-{}:{}'.format(chrom, start + 1, end, strand)
+                assert objFastaIndex.fetchRegion(region) == expected
+                listRegions.append(region)
+            else:
+                listRegions.append((chrom, start, end, strand))
+            listExpected.append(expected)
+        assert objFastaIndex.fetchRegions(listRegions) == listExpected
+    assert fasta.fetchRegions(fasta_file, listRegions) == listExpected
+
+
+def test_fetch_regions_of_bed(tmp_path):
+    fasta_file, dictGenome = randomGenome(tmp_path, seed=2)
+    bed_file = tmp_path / "regions.bed"
+    bed_file.write_text("track name=test\n# comment\nchr1\t0\t5\tr1\t0\t-\nchr3\t2\t10\nchr1\t1\t3\tr2\t0\t.\n")
+    listExpected = [
+        reverseComplement(dictGenome['chr1'][0:5].upper()), dictGenome['chr3'][2:10].upper(), dictGenome['chr1'][1:3].upper()
+    ]
+    with faidx.FastaIndex(fasta_file) as objFastaIndex:
+        assert objFastaIndex.fetchRegions(faidx.readBed(str(bed_file))) == listExpected
+    assert faidx.parseRegion("chr1:1,001-2,000:-") == ('chr1', 1000, 2000, '-')
+    with pytest.raises(ValueError):
+        faidx.parseRegion("chr1:20-10")
@@ -0,0 +1,120 @@
+import random
+import numpy as np
+import pytest
+from AnalysisTool import fasta
+
+
+@pytest.fixture
+def fasta_file(tmp_path):
+    path = tmp_path / "genome.fa"
+    path.write_text(">L01 chr1\nACGTacgt\nNNAC\n>L02\nGGGG\n")
+    return str(path)
+
+
+def test_readAsDict_cache_dir(fasta_file, tmp_path):
+    dictGenome = fasta.readAsDict(fasta_file, cache_dir=str(tmp_path / "cache"))
+    assert dictGenome['L01'] == 'ACGTACGTNNAC'
+    assert dictGenome['L02'] == 'GGGG'
+
+
+@pytest.mark.parametrize("kwargs", [{'lazy': True}, {'packed': True}, {'processes': 4}, {'processes': None}])
+def test_readAsDict_cache_dir_conflict(fasta_file, tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        fasta.readAsDict(fasta_file, cache_dir=str(tmp_path / "cache"), **kwargs)
+
+
+def lineParse(content):
+    """ line-by-line parse (old `Fasta` ; keep record with empty sequence) """
+    listRecords, header, listLines = [], None, []
+    for line in content.splitlines():
+        if line.startswith('>'):
+            if header is not None:
+                listRecords.append((header, ''.join(listLines)))
+            header, listLines = line[1:].rstrip(), []
+        else:
+            listLines.append(''.join(line.split()))
+    if header is not None:
+        listRecords.append((header, ''.join(listLines)))
+    return listRecords
+
+
+def randomFasta(seed, count=30):
+    rng = random.Random(seed)
+    listLines = []
+    for index in range(count):
+        listLines.append('>r{} info {}'.format(index, 'x' * rng.randint(0, 3)))
+        sequence = ''.join(rng.choice('ACGTNacgt') for _ in range(rng.choice([0, 1, 50, 300])))
+        linewidth = rng.choice([1, 7, 60])
+        listLines.extend(sequence[start:start + linewidth] for start in range(0, len(sequence), linewidth))
+    newline = random.Random(seed).choice(['\n', '\r\n'])
+    return newline.join(listLines) + newline
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 5, 64, 1 << 22])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_fasta_parser_same_as_line_parse(tmp_path, block_size, seed):
+    content = randomFasta(seed)
+    path = tmp_path / "records.fa"
+    path.write_bytes(content.encode())
+    listExpected = lineParse(content)
+    for mode in ('r', 'rb'):
+        with open(path, mode, newline='' if mode == 'r' else None) as f:
+            listRecords = [(record.head, record.sequence) for record in fasta.Fasta(f, block_size=block_size)]
+        assert listRecords == listExpected
+
+
+@pytest.mark.parametrize("shards", [1, 3, 16, 200])
+def test_split_shards_at_header(tmp_path, shards):
+    content = randomFasta(3, count=40).encode()
+    path = tmp_path / "records.fa"
+    path.write_bytes(content)
+    listShards = fasta.splitShards(str(path), shards)
+    assert listShards[0][0] == 0 and listShards[-1][1] == len(content)
+    assert all(end == start for (_, end), (start, _) in zip(listShards[:-1], listShards[1:]))
+    assert all(content[start:start + 1] == b'>' for start, _ in listShards)
+
+
+@pytest.mark.parametrize("ignore_seq_info", [True, False])
+def test_parallel_same_as_single_process(tmp_path, monkeypatch, ignore_seq_info):
+    path = tmp_path / "records.fa"
+    path.write_text(randomFasta(4, count=50))
+    dictExpected = fasta.readAsDict(str(path), ignore_seq_info=ignore_seq_info)
+    assert list(fasta.readItemsParallel(str(path), processes=2, ignore_seq_info=ignore_seq_info)) == list(dictExpected.items())
+    monkeypatch.setattr(fasta, 'PARALLEL_MIN_SIZE', 0)
+    dictParallel = fasta.readAsDict(str(path), ignore_seq_info=ignore_seq_info, processes=2)
+    assert list(dictParallel.items()) == list(dictExpected.items())
+    dictPacked = fasta.readAsDict(str(path), ignore_seq_info=ignore_seq_info, processes=2, packed=True)
+    assert {key: str(sequence) for key, sequence in dictPacked.items()} == dictExpected
+
+
+def dictReverseComplement(dna):
+    """ old `reverse_complement` (dict of ACGT, other base not changed) """
+    complement = {'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A',
+                  'a': 't', 'c': 'g', 'g': 'c', 't': 'a'}
+    return ''.join([complement.get(base, base) for base in dna[::-1]])
+
+
+def test_reverse_complement_same_as_dict():
+    rng = random.Random(5)
+    listSequences = [''.join(rng.choice('ACGTacgtNn-*.') for _ in range(rng.randint(0, 60))) for _ in range(200)]
+    assert [fasta.reverse_complement(sequence) for sequence in listSequences] == \
+        [dictReverseComplement(sequence) for sequence in listSequences]
+    assert fasta.reverse_complement("RYKMBVDHryU") == "AryDHBVKMRY"
+    assert fasta.reverse_complement("AUCGu", rna=True) == "aCGAU"
+
+
+@pytest.mark.parametrize("rna", [False, True])
+def test_reverse_complement_batch_same_as_one(rna):
+    rng = random.Random(6)
+    listSequences = [''.join(rng.choice('ACGTURYNacgtu') for _ in range(rng.randint(0, 40))) for _ in range(100)]
+    listExpected = [fasta.reverse_complement(sequence, rna=rna) for sequence in listSequences]
+    listMixed = [sequence.encode() if index % 2 else sequence for index, sequence in enumerate(listSequences)]
+    assert fasta.reverse_complement_batch(listMixed, rna=rna) == \
+        [expected.encode() if index % 2 else expected for index, expected in enumerate(listExpected)]
+    array = np.array([sequence.encode() for sequence in listSequences], dtype=np.bytes_)
+    assert [value.decode() for value in fasta.reverse_complement_batch(array, rna=rna).tolist()] == listExpected
+    array = np.array([sequence[:10].ljust(10, 'A').encode() for sequence in listSequences], dtype=np.bytes_).reshape(10, 10)
+    result = fasta.reverse_complement_batch(array, rna=rna)
+    assert result.shape == (10, 10)
+    assert [value.decode() for value in result.ravel().tolist()] == \
+        [fasta.reverse_complement(value.decode(), rna=rna) for value in array.ravel().tolist()]
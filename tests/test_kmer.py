@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from AnalysisTool import kmer
+
+
+def test_count_only_flush_on_last_add():
+    # NOTE: 最後一條 sequence 觸發 buffer merge，之後的查詢不可再 merge 空 buffer
+    objKmerIndex = kmer.KmerIndex(k=3, keep_positions=False, buffer_size=4)
+    objKmerIndex.add("L01", "ACG")
+    objKmerIndex.add("L02", "ACGTACGT")
+    assert objKmerIndex._listBufferValues == []
+    assert objKmerIndex.count("ACG") == 3
+    assert objKmerIndex.count("TTT") == 0
+
+
+@pytest.mark.parametrize("sequence", ["ACN", "NNNNNN", "ACGNACGN", ""])
+def test_count_only_without_kmer(sequence):
+    objKmerIndex = kmer.KmerIndex(5, keep_positions=False)
+    objKmerIndex.add("a", sequence)
+    assert objKmerIndex.count("ACGTA") == 0
+    assert (objKmerIndex.counts(["ACGTA", "AAAAA"]) == 0).all()
+
+
+def test_count_only_same_as_keep_positions():
+    rng = np.random.default_rng(0)
+    listRecords = [("L{:02d}".format(i), ''.join(rng.choice(list('ACGTN'), 200))) for i in range(20)]
+    objCountIndex = kmer.KmerIndex(k=5, keep_positions=False, buffer_size=300).addRecords(listRecords)
+    objPositionIndex = kmer.KmerIndex(k=5).addRecords(listRecords)
+    listKmers = [kmer.decode(value, 5) for value in range(4 ** 5)]
+    assert (objCountIndex.counts(listKmers) == objPositionIndex.counts(listKmers)).all()
@@ -0,0 +1,46 @@
+import random
+import numpy as np
+import pytest
+from AnalysisTool import fasta
+from AnalysisTool.packed import PackedSequence
+
+
+def randomSequence(rng, length):
+    """ random sequence with N / IUPAC run and soft-mask run """
+    listParts = []
+    while sum(map(len, listParts)) < length:
+        alphabet = rng.choice(['ACGT', 'acgt', 'N', 'n', 'RYKMBVDH', 'ACGTNacgtn'])
+        listParts.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 9))))
+    return ''.join(listParts)[:length]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_packed_same_as_str(seed):
+    rng = random.Random(seed)
+    sequence = randomSequence(rng, rng.randint(0, 300))
+    objPackedSequence = PackedSequence(sequence)
+    assert len(objPackedSequence) == len(sequence)
+    assert str(objPackedSequence) == sequence and objPackedSequence == sequence
+    assert str(PackedSequence(sequence, force_upper=True)) == sequence.upper()
+    assert str(objPackedSequence.upper()) == sequence.upper()
+    reverse = fasta.reverse_complement(sequence)
+    assert str(objPackedSequence.reverse_complement()) == reverse
+    assert str(objPackedSequence.reverse_complement().reverse_complement()) == sequence
+    for _ in range(200):
+        start, stop = rng.randint(-20, len(sequence) + 20), rng.randint(-20, len(sequence) + 20)
+        step = rng.choice([None, 1, 2, 3, -1, -2])
+        assert objPackedSequence[start:stop:step] == sequence[start:stop:step]
+        assert objPackedSequence.reverse_complement()[start:stop:step] == reverse[start:stop:step]
+    for index in range(-len(sequence), len(sequence)):
+        assert objPackedSequence[index] == sequence[index]
+    with pytest.raises(IndexError):
+        objPackedSequence[len(sequence)]
+    positions = np.array([rng.randrange(len(sequence)) for _ in range(100)] if sequence else [], dtype=np.int64)
+    assert objPackedSequence._gatherForward(positions).tobytes().decode() == ''.join(sequence[i] for i in positions)
+
+
+def test_packed_nbytes_smaller_than_str():
+    sequence = 'ACGT' * 25000 + 'N' * 1000 + 'acgt' * 1000
+    objPackedSequence = PackedSequence(sequence)
+    assert str(objPackedSequence) == sequence
+    assert objPackedSequence.nbytes < len(sequence) // 3
@@ -0,0 +1,85 @@
+import gzip
+import io
+import pytest
+from AnalysisTool import rnafold, table
+
+CONTENT = (
+    ">h1 L01:101-111(-)\n"
+    "GGGAAAUCCCA\n"
+    "(((...))).. (-3.20)\n"
+    "(((...))),, [-3.50]\n"
+    "(((...))).. {-3.10 d=1.20}\n"
+    " frequency of mfe structure in ensemble 0.5; ensemble diversity 1.00\n"
+    ">h2 desc L02:5-11:+\n"
+    "GCAAAGC\n"
+    "((...)) ( -1.00)\n"
+    "\n"
+    "ACGUACGU\n"
+    "........ (  0.00)\n"
+    ">h4\n"
+    "GGGGAAAA\n"
+    "CCCC\n"
+    "((((....)))) (-5.40)\n"
+)
+
+
+def expectedHairpins():
+    return [
+        ('h1', 'GGGAAAUCCCA', '(((...)))..', -3.2, 'L01', '-', (101, 111)),
+        ('h2', 'GCAAAGC', '((...))', -1.0, 'L02', '+', (5, 11)),
+        (None, 'ACGUACGU', '........', 0.0, None, None, None),
+        ('h4', 'GGGGAAAACCCC', '((((....))))', -5.4, None, None, None),
+    ]
+
+
+def hairpinTuple(objHairpin):
+    position = getattr(objHairpin, 'position', None)
+    return (
+        objHairpin.name, objHairpin.seq, objHairpin.struct, objHairpin.mfe,
+        getattr(objHairpin, 'chrom', None), getattr(objHairpin, 'strand', None),
+        tuple(position) if position is not None else None,
+    )
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+@pytest.mark.parametrize("compressed", [False, True])
+def test_read_rnafold(tmp_path, writeBgzf, newline, compressed):
+    content = CONTENT.replace("\n", newline).encode()
+    rnafold_file = tmp_path / "hairpin.fold"
+    rnafold_file.write_bytes(content)
+    listExpected = expectedHairpins()
+    assert [hairpinTuple(objHairpin) for objHairpin in rnafold.readRNAfold(str(rnafold_file))] == listExpected
+    if compressed:
+        gzip_file = tmp_path / "hairpin.fold.gz"
+        gzip_file.write_bytes(gzip.compress(content))
+        bgzf_file = writeBgzf(tmp_path / "hairpin.fold.bgz", content, block_size=17)
+        for file in (str(gzip_file), bgzf_file):
+            assert [hairpinTuple(objHairpin) for objHairpin in rnafold.readRNAfold(file)] == listExpected
+
+
+def test_read_rnafold_line_block_boundary():
+    listLines = ['>h{}'.format(index) for index in range(3)]
+    handle = io.BytesIO('\r\n'.join(listLines).encode())
+    assert list(rnafold._iterLines(handle, block_size=3)) == listLines
+
+
+def test_read_rnafold_same_as_hairpin_table(tmp_path):
+    rnafold_file = tmp_path / "hairpin.fold"
+    rnafold_file.write_text(CONTENT)
+    listHairpins = list(rnafold.readRNAfold(str(rnafold_file)))
+    objHairpinTable = table.HairpinTable.fromRNAfold(str(rnafold_file))
+    assert list(objHairpinTable.sequences) == [objHairpin.seq for objHairpin in listHairpins]
+    assert [objHairpinTable.getStruct(index) for index in range(len(objHairpinTable))] == \
+        [objHairpin.struct for objHairpin in listHairpins]
+    assert objHairpinTable.mfe.tolist() == [objHairpin.mfe for objHairpin in listHairpins]
+
+
+@pytest.mark.parametrize("content", [
+    ">h1\nGGGAAAUCC\n(((...))). (-3.20)\n",
+    ">h1\nGGGAAAUCCC\n(((...))) x\n",
+])
+def test_read_rnafold_error(tmp_path, content):
+    rnafold_file = tmp_path / "hairpin.fold"
+    rnafold_file.write_text(content)
+    with pytest.raises(ValueError):
+        list(rnafold.readRNAfold(str(rnafold_file)))
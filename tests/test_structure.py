@@ -0,0 +1,51 @@
+import random
+import numpy as np
+import pytest
+from AnalysisTool import VFold
+from AnalysisTool.structure import MarkerRuns, RaggedArray
+
+
+def randomMarkers(rng, length):
+    """ markers step by +-1 mostly (with zero and jump) """
+    listMarkers, marker = [], rng.randint(1, 30)
+    for _ in range(length):
+        choice = rng.random()
+        if choice < 0.2:
+            listMarkers.append(0)
+            continue
+        if choice < 0.35:
+            marker = rng.randint(1, 30)
+        elif choice < 0.45:
+            pass
+        else:
+            marker = max(marker + rng.choice([1, 1, -1]), 1)
+        listMarkers.append(marker)
+    return listMarkers
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_marker_runs_same_as_cotinous_seq(seed):
+    rng = random.Random(seed)
+    listMarkers = [randomMarkers(rng, rng.randint(0, 40)) for _ in range(500)]
+    listMarkers[:4] = [[], [0, 0], [5], [1, 2, 1, 2, 3, 2]]
+    objMarkerRuns = MarkerRuns(listMarkers)
+    assert len(objMarkerRuns) == len(listMarkers)
+    for index, markers in enumerate(listMarkers):
+        segments = VFold.cotinous_seq(markers)
+        assert objMarkerRuns.segments(index) == segments, markers
+        segments = segments or []
+        assert objMarkerRuns.counts[index] == len(segments)
+        assert objMarkerRuns.longest[index] == max(map(len, segments), default=0)
+        assert objMarkerRuns.bulges[index] == max(len(segments) - 1, 0)
+    assert (objMarkerRuns.direction[objMarkerRuns.lengths == 1] == 0).all()
+
+
+def test_marker_runs_of_ragged_array():
+    rng = random.Random(9)
+    listMarkers = [randomMarkers(rng, rng.randint(0, 20)) for _ in range(50)]
+    offsets = np.concatenate(([0], np.cumsum([len(markers) for markers in listMarkers])))
+    objRaggedArray = RaggedArray(np.array(sum(listMarkers, []), dtype=np.int32), offsets)
+    objMarkerRuns = MarkerRuns(objRaggedArray)
+    assert [objMarkerRuns.segments(index) for index in range(len(listMarkers))] == \
+        [VFold.cotinous_seq(markers) for markers in listMarkers]
+    assert len(MarkerRuns([])) == 0
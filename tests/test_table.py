@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from AnalysisTool import table, template, target
+
+
+def test_sequence_store_take():
+    listSequences = ['ACGTNNacgt', '', 'GGRYKC', 'nnnnAC', 'TTTT']
+    objSequenceStore = table.SequenceStore(listSequences)
+    for indices in ([4, 0, 2], [1], [], [3, 3, 0], list(range(5))):
+        assert list(objSequenceStore.take(np.array(indices, dtype=np.int64))) == [listSequences[i] for i in indices]
+
+
+def test_sequence_store_take_rna():
+    objSequenceStore = table.SequenceStore(['UGACAGAAG', 'AUCGU'])
+    assert list(objSequenceStore.take([1, 0])) == ['AUCGU', 'UGACAGAAG']
+
+
+def test_negative_and_out_of_range_index():
+    listSequences = ['ACGT', 'GG', 'TTTAC']
+    objSequenceStore = table.SequenceStore(listSequences)
+    objMicroRNATable = table.MicroRNATable(listSequences, names=['a', 'b', 'c'], counts=[1, 2, 3])
+    for index in range(-3, 3):
+        assert objSequenceStore[index] == listSequences[index]
+        assert objMicroRNATable[index].seq == listSequences[index]
+        assert objMicroRNATable[np.int64(index)].count == [1, 2, 3][index]
+    for index in (3, -4, 100):
+        with pytest.raises(IndexError):
+            objSequenceStore[index]
+        with pytest.raises(IndexError):
+            objMicroRNATable[index]
+
+
+def test_hairpin_table_from_rnafold(tmp_path):
+    rnafold_file = tmp_path / "hairpin.fold"
+    rnafold_file.write_text(
+        ">h1 L01:101-111(-)\nGGGAAAUCCCA\n(((...))).. (-3.20)\n"
+        ">h2\nGCAAAGC\n((...)) ( -1.00)\n"
+    )
+    objHairpinTable = table.HairpinTable.fromRNAfold(str(rnafold_file))
+    assert list(objHairpinTable.sequences) == ['GGGAAAUCCCA', 'GCAAAGC']
+    assert [objHairpinTable.getStruct(index) for index in range(2)] == ['(((...)))..', '((...))']
+    assert objHairpinTable.start.tolist() == [101, -1]
+    assert objHairpinTable.strand.tolist() == [-1, 0]
+    assert objHairpinTable.mfe.tolist() == [-3.2, -1.0]
+    assert objHairpinTable.names == ['h1', 'h2']
+    objSelected = objHairpinTable[np.array([False, True])]
+    assert objSelected.getStruct(0) == '((...))' and objSelected[0].seq == 'GCAAAGC'
+
+
+def test_records_are_template_instances():
+    objMicroRNATable = table.MicroRNATable(['UGACAGAAGAGAGUGAGCAC'], names=['miR156a'])
+    objRecord = next(objMicroRNATable.records())
+    assert isinstance(objRecord, template.MicroRNA)
+    assert not hasattr(objRecord, '__dict__')
+    objHairpinRecord = next(table.HairpinTable(['GCAAAGC'], structs=['((...))']).records())
+    assert isinstance(objHairpinRecord, template.Hairpin)
+
+
+def test_table_records_through_target():
+    miRNA = 'UGACAGAAGAGAGUGAGCAC'
+    site = miRNA.replace('U', 'T')[::-1].translate(str.maketrans('ACGT', 'TGCA'))
+    objTargetSearch = target.TargetSearch({'TranscriptA': 'AAAAA' + site + 'CCCCC'})
+    objMicroRNATable = table.MicroRNATable([miRNA], names=['miR156a'])
+    pdfRecords = objTargetSearch.search(list(objMicroRNATable.records()))
+    pdfObjects = objTargetSearch.search(list(objMicroRNATable))
+    assert pdfRecords['miRNA'].tolist() == ['miR156a']
+    assert pdfRecords['Site_Start'].tolist() == [6]
+    assert pdfRecords.equals(pdfObjects)
+
+
+def test_from_bed_count(tmp_path):
+    bed_file = tmp_path / "reads.bed"
+    bed_file.write_text(
+        "L01\t100\t121\t1-350\t42\t+\n"
+        "L01\t150\t171\tread_x20\t0\t-\n"
+        "L02\t10\t31\tread\t60\t+\n"
+    )
+    objMicroRNATable = table.MicroRNATable.fromBed(str(bed_file))
+    assert objMicroRNATable.count.tolist() == [350, 20, 1]
+    assert objMicroRNATable.start.tolist() == [101, 151, 11]
+    assert objMicroRNATable.strand.tolist() == [1, -1, 1]
+    assert table.MicroRNATable.fromBed(str(bed_file), score_is_count=True).count.tolist() == [42, 0, 60]
+    bed_file.write_text("L01\t100\t121\n")
+    assert table.MicroRNATable.fromBed(str(bed_file)).count.tolist() == [1]
+    with pytest.raises(ValueError):
+        table.MicroRNATable.fromBed(str(bed_file), score_is_count=True)
+
+
+def test_hairpin_index_same_as_get_arm():
+    rng = np.random.default_rng(0)
+    listHairpins = []
+    for index in range(60):
+        objHairpin = template.Hairpin('A')
+        start = int(rng.integers(1, 3000))
+        objHairpin.setPosition(start, start + int(rng.integers(40, 200)))
+        objHairpin.setStrand(['+', '-'][index % 2])
+        objHairpin.setChrom(['L01', 'L02'][index % 3 == 0])
+        objHairpin.setName('h{}'.format(index))
+        listHairpins.append(objHairpin)
+    listReads = []
+    for index in range(800):
+        objRead = template.MicroRNA('A')
+        start = int(rng.integers(1, 3200))
+        objRead.setPosition(start, start + 20)
+        objRead.setStrand(['+', '-', '.'][index % 3])
+        objRead.setChrom(['L01', 'L02'][index % 2])
+        objRead.setCount(int(rng.integers(1, 100)))
+        listReads.append(objRead)
+    # NOTE: 逐一比對 (read, hairpin) 並以 `MicroRNA.getArm` 決定 arm
+    dictExpected = {index: {'5p': 0, '3p': 0} for index in range(len(listHairpins))}
+    listExpectedPairs = []
+    for read_index, objRead in enumerate(listReads):
+        for hairpin_index, objHairpin in enumerate(listHairpins):
+            if (objRead.chrom, objRead.strand) != (objHairpin.chrom, objHairpin.strand):
+                continue
+            if objRead.position.start > objHairpin.position.end or objRead.position.end < objHairpin.position.start:
+                continue
+            objRead.getArm(objHairpin.position)
+            dictExpected[hairpin_index][objRead.arm] += objRead.count
+            listExpectedPairs.append((read_index, hairpin_index, objRead.arm))
+    pdfArmCounts, pdfPairs = table.HairpinIndex(listHairpins).assignArms(listReads, return_pairs=True)
+    assert pdfArmCounts['5p'].tolist() == [dictExpected[index]['5p'] for index in range(len(listHairpins))]
+    assert pdfArmCounts['3p'].tolist() == [dictExpected[index]['3p'] for index in range(len(listHairpins))]
+    assert sorted(zip(pdfPairs['read'], pdfPairs['hairpin'], pdfPairs['arm'])) == sorted(listExpectedPairs)
@@ -0,0 +1,74 @@
+import random
+import pytest
+from AnalysisTool import target
+
+COMPLEMENT = {'A': 'T', 'C': 'G', 'G': 'C', 'T': 'A'}
+
+
+def bruteForce(dictTranscripts, name, sequence, max_score=4.0, allow_cleavage_mismatch=False):
+    """ scan every window of every transcript (no seed index) """
+    miRNA = sequence.upper().replace('U', 'T')
+    length = len(miRNA)
+    listRows = []
+    for transcript_id, transcript in dictTranscripts.items():
+        for start in range(len(transcript) - length + 1):
+            window = transcript[start:start + length]
+            score, mismatch, wobble, seed_ok, cleavage_ok = 0.0, 0, 0, True, True
+            for index, base in enumerate(window):
+                # NOTE: window 第 index 個 base 與 miRNA 第 length - index 個 base (1-based) 配對
+                position = length - index
+                miRNA_base = miRNA[position - 1]
+                weight = 2.0 if 2 <= position <= 13 else 1.0
+                if COMPLEMENT[miRNA_base] == base:
+                    continue
+                if 2 <= position <= 8 or position in (10, 11):
+                    seed_ok = seed_ok and not 2 <= position <= 8
+                    cleavage_ok = cleavage_ok and position not in (10, 11)
+                if (miRNA_base, base) in (('G', 'T'), ('T', 'G')):
+                    wobble += 1
+                    score += weight * 0.5
+                else:
+                    mismatch += 1
+                    score += weight
+            if not seed_ok or score > max_score or not (cleavage_ok or allow_cleavage_mismatch):
+                continue
+            listRows.append((name, transcript_id, start + 1, start + length, start + length - 9, score, mismatch, wobble))
+    return listRows
+
+
+def plantedTranscripts(rng, listMiRNAs, count=20):
+    """ random transcripts with (mutated) target sites of miRNAs """
+    dictTranscripts = {}
+    for index in range(count):
+        listParts = [''.join(rng.choice('ACGT') for _ in range(rng.randint(0, 60)))]
+        for _ in range(rng.randint(0, 4)):
+            site = list(''.join(COMPLEMENT[base] for base in reversed(rng.choice(listMiRNAs).replace('U', 'T'))))
+            for _ in range(rng.randint(0, 4)):
+                site[rng.randrange(len(site))] = rng.choice('ACGTN')
+            listParts.append(''.join(site))
+            listParts.append(''.join(rng.choice('ACGTN') for _ in range(rng.randint(0, 30))))
+        dictTranscripts['T{}'.format(index)] = ''.join(listParts)
+    return dictTranscripts
+
+
+@pytest.mark.parametrize("allow_cleavage_mismatch", [False, True])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_search_same_as_brute_force(seed, allow_cleavage_mismatch):
+    rng = random.Random(seed)
+    dictMiRNAs = {'miR{}'.format(index): ''.join(rng.choice('ACGU') for _ in range(rng.randint(19, 23))) for index in range(6)}
+    dictTranscripts = plantedTranscripts(rng, list(dictMiRNAs.values()))
+    objTargetSearch = target.TargetSearch(dictTranscripts, allow_cleavage_mismatch=allow_cleavage_mismatch)
+    pdfTargets = objTargetSearch.search(dictMiRNAs)
+    listExpected = [
+        row for name, sequence in dictMiRNAs.items()
+        for row in bruteForce(dictTranscripts, name, sequence, allow_cleavage_mismatch=allow_cleavage_mismatch)
+    ]
+    assert len(listExpected) > 0
+    assert [tuple(row) for row in pdfTargets.itertuples(index=False)] == listExpected
+
+
+def test_search_short_or_ambiguous_miRNA():
+    objTargetSearch = target.TargetSearch({'T0': 'ACGT' * 20})
+    pdfTargets = objTargetSearch.search([('short', 'ACGUACGU'), ('ambiguous', 'UGACAGAAGNGAGUGAGCAC')])
+    assert len(pdfTargets) == 0
+    assert list(pdfTargets.columns) == list(target.TargetSearch._emptyResult().columns)
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+import pytest
+from AnalysisTool.app import transcriptome
+
+
+def transcriptTable(n, seed=0):
+    rng = np.random.default_rng(seed)
+    listIds = ['PggD{}_c{}_g1_i{}'.format(gene, component, isoform) for gene, component, isoform in zip(
+        rng.integers(0, max(n // 4, 1), n), rng.integers(0, 30, n), rng.integers(1, 8, n)
+    )]
+    listIds[::97] = ['noUnderscore'] * len(listIds[::97])
+    return pd.DataFrame({'transcript_id': listIds})
+
+
+def rowWiseResults(data):
+    """ row-wise path (`_get_gene_id` / iterrows / `_add_isoform_count`) of `GetGeneIsoformCount` """
+    objGetGeneIsoformCount = transcriptome.GetGeneIsoformCount(data.copy(), gene_id_include=True)
+    data = data.copy()
+    data['gene_id'] = data.apply(objGetGeneIsoformCount._get_gene_id, axis=1)
+    for _, row in data.iterrows():
+        gene_id = row['gene_id']
+        objGetGeneIsoformCount.dictGeneIsoFormCount[gene_id] = objGetGeneIsoformCount.dictGeneIsoFormCount.get(gene_id, 0) + 1
+    data['isoform_count'] = data.apply(objGetGeneIsoformCount._add_isoform_count, axis=1)
+    return objGetGeneIsoformCount.dictGeneIsoFormCount, data, data[['gene_id', 'isoform_count']].drop_duplicates()
+
+
+@pytest.mark.parametrize("n", [1, 50, 3000])
+def test_gene_isoform_count_same_as_row_wise(n):
+    data = transcriptTable(n)
+    dictExpected, pdfExpected, pdfGeneExpected = rowWiseResults(data)
+    objGetGeneIsoformCount = transcriptome.GetGeneIsoformCount(data.copy())
+    assert list(objGetGeneIsoformCount.CountGeneIsoform().items()) == list(dictExpected.items())
+    pd.testing.assert_frame_equal(objGetGeneIsoformCount.GetResults(), pdfExpected)
+    pd.testing.assert_frame_equal(objGetGeneIsoformCount.GetResults("gene_and_isoform_count"), pdfGeneExpected)
+
+
+def exactN50(lengths):
+    lengths = sorted(lengths, reverse=True)
+    cumulative = 0
+    for length in lengths:
+        cumulative += length
+        if cumulative * 2 >= sum(lengths):
+            return length
+
+
+def test_stream_same_as_gene_isoform_count(tmp_path):
+    data = transcriptTable(2000)
+    rng = np.random.default_rng(1)
+    lengths = rng.integers(1, 300, len(data))
+    fasta_file = tmp_path / "Trinity.fasta"
+    fasta_file.write_text(''.join(
+        '>{} len={}\n{}\n'.format(transcript_id, length, 'A' * length)
+        for transcript_id, length in zip(data['transcript_id'], lengths)
+    ))
+    objGetGeneIsoformCount = transcriptome.GetGeneIsoformCount(data.copy())
+    objGetGeneIsoformCount.CountGeneIsoform()
+    objStream = transcriptome.StreamGeneIsoformCount(lengths=True).readFasta(str(fasta_file), chunk_size=333)
+    pd.testing.assert_frame_equal(objStream.GetResults(), objGetGeneIsoformCount.GetResults())
+    pd.testing.assert_frame_equal(
+        objStream.GetResults("gene_and_isoform_count"), objGetGeneIsoformCount.GetResults("gene_and_isoform_count")
+    )
+    assert objStream.N50 == exactN50(lengths.tolist())
+
+
+def test_stream_length_histogram_bounded():
+    rng = np.random.default_rng(2)
+    lengths = rng.integers(1, 10 ** 7, 5000)
+    objStream = transcriptome.StreamGeneIsoformCount(keep_transcripts=False, lengths=True, max_exact_length=1000)
+    for start in range(0, len(lengths), 1000):
+        chunk = lengths[start:start + 1000]
+        objStream.update(['T{}_c0_g1_i1'.format(start + index) for index in range(len(chunk))], chunk)
+    assert len(objStream.length_histogram) == 1000
+    assert len(objStream.long_length_counts) == objStream.LONG_LENGTH_BUCKETS
+    expected = exactN50(lengths.tolist())
+    assert 0.91 * expected <= objStream.N50 <= expected
+
+
+def rowWiseCounts(values):
+    """ row-wise path (iterrows / dict) of `AnalayGeneIsoForm` / `StaticAnnotationGene` """
+    dictCounts = dict()
+    for value in values:
+        dictCounts[value] = dictCounts.get(value, 0) + 1
+    return dictCounts
+
+
+def countItems(dictCounts):
+    """ items of counts (NaN -> None, NaN is not equal to NaN) """
+    return [(None if isinstance(key, float) and np.isnan(key) else key, count) for key, count in dictCounts.items()]
+
+
+def isoformTable(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'gene_id': ['g{}'.format(i) for i in range(n)], 'isoform_count': rng.integers(1, 30, n)})
+
+
+def test_accumulator_chunks_same_as_row_wise():
+    data = isoformTable(5000)
+    objAccumulator = transcriptome.CountAccumulator('isoform_count')
+    for start in range(0, len(data), 777):
+        objAccumulator.update(data.iloc[start:start + 777])
+    assert list(objAccumulator.to_dict().items()) == list(rowWiseCounts(data['isoform_count'].tolist()).items())
+    objAnalayGeneIsoForm = transcriptome.AnalayGeneIsoForm(data)
+    assert list(objAnalayGeneIsoForm.GetIsoFormCountGeneDistribution.items()) == list(objAccumulator.to_dict().items())
+
+
+@pytest.mark.parametrize("dtype", ["category", "str", object])
+def test_accumulator_nan_key(dtype):
+    values = ['b', None, 'a', 'b', None, 'c']
+    objAccumulator = transcriptome.CountAccumulator('annotation').update(pd.Series(values, dtype=dtype))
+    assert countItems(objAccumulator.to_dict()) == [('b', 2), (None, 2), ('a', 1), ('c', 1)]
+
+
+def test_accumulator_merge_same_as_one_update():
+    data = isoformTable(3000, seed=1)
+    listShards = [transcriptome.CountAccumulator('isoform_count').update(data.iloc[start:start + 500])
+                  for start in range(0, len(data), 500)]
+    objMerged = transcriptome.CountAccumulator('isoform_count')
+    for objShard in listShards:
+        objMerged.merge(objShard)
+    objExpected = transcriptome.CountAccumulator('isoform_count').update(data)
+    assert list(objMerged.to_dict().items()) == list(objExpected.to_dict().items())
+    with pytest.raises(ValueError):
+        objMerged.merge(transcriptome.CountAccumulator('annotation'))
+
+
+def test_accumulator_json_and_pickle(tmp_path):
+    import pickle
+    data = isoformTable(1000, seed=2)
+    objAccumulator = transcriptome.CountAccumulator('isoform_count', key_name='isoform', value_name='n').update(data)
+    objAccumulator.save(str(tmp_path / "counts.json"))
+    for objLoaded in (transcriptome.CountAccumulator.load(str(tmp_path / "counts.json")),
+                      pickle.loads(pickle.dumps(objAccumulator))):
+        assert list(objLoaded.to_dict().items()) == list(objAccumulator.to_dict().items())
+        pd.testing.assert_frame_equal(objLoaded.to_DataFrame(), objAccumulator.to_DataFrame())
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_count_files_same_as_one_table(tmp_path, processes):
+    data = isoformTable(2000, seed=3)
+    listFiles = []
+    for index, start in enumerate(range(0, len(data), 600)):
+        file = tmp_path / "shard{}.tsv".format(index)
+        data.iloc[start:start + 600].to_csv(file, sep='\t', index=False)
+        listFiles.append(str(file))
+    objAccumulator = transcriptome.countFiles(listFiles, 'isoform_count', processes=processes, chunk_size=250, sep='\t')
+    assert list(objAccumulator.to_dict().items()) == list(rowWiseCounts(data['isoform_count'].tolist()).items())
+
+
+@pytest.mark.parametrize("n", [1, 50, 3000])
+def test_compact_same_as_default(n):
+    data = transcriptTable(n, seed=4)
+    pdfInput = data.copy()
+    objDefault = transcriptome.GetGeneIsoformCount(data.copy())
+    objCompact = transcriptome.GetGeneIsoformCount(data, compact=True)
+    assert list(objCompact.CountGeneIsoform().items()) == list(objDefault.CountGeneIsoform().items())
+    pd.testing.assert_frame_equal(data, pdfInput)
+    for how in ("default", "gene_and_isoform_count"):
+        pdfCompact = objCompact.GetResults(how)
+        assert pdfCompact['gene_id'].dtype == 'category'
+        assert pdfCompact['isoform_count'].dtype.kind == 'u'
+        pd.testing.assert_frame_equal(
+            pdfCompact.astype({'gene_id': 'str', 'isoform_count': 'int64'}), objDefault.GetResults(how)
+        )
+
+
+def test_compact_nan_gene_id_not_counted():
+    data = pd.DataFrame({'transcript_id': ['t1', 't2', 't3', 't4'], 'gene_id': ['g1', None, 'g2', 'g1']})
+    objCompact = transcriptome.GetGeneIsoformCount(data, gene_id_include=True, compact=True)
+    assert objCompact.CountGeneIsoform() == {'g1': 2, 'g2': 1}
+    assert objCompact.GetResults()['isoform_count'].tolist() == [2, 0, 1, 2]
+    pdfGenes = objCompact.GetResults("gene_and_isoform_count")
+    assert pdfGenes['gene_id'].tolist() == ['g1', 'g2']
+    assert pdfGenes['isoform_count'].tolist() == [2, 1]
+
+
+ANNOTATIONS = [
+    'XM_020715060.1 PREDICTED: Phalaenopsis equestris midasin-like (LOC110017904), mRNA',
+    'XM_020720713.1 PREDICTED: Phalaenopsis equestris uncharacterized LOC110021972 (LOC110021972), transcript variant X1, mRNA',
+    'XM_020720714.1 PREDICTED: Phalaenopsis equestris uncharacterized LOC110021972 (LOC110021972), transcript variant X2, mRNA',
+    'XM_028702111.1 Dendrobium catenatum protein kinase (LOC110093456), mRNA',
+    'noDescription',
+    None,
+]
+
+
+def annotationTable(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'annotation': [ANNOTATIONS[index] for index in rng.integers(0, len(ANNOTATIONS), n)]})
+
+
+def rowWiseLevel(data, level):
+    """ parse each row by regex (no factorize) """
+    listValues = []
+    for annotation in data['annotation'].tolist():
+        if not isinstance(annotation, str):
+            listValues.append(None)
+        elif level == 'annotation':
+            listValues.append(annotation)
+        else:
+            match = transcriptome.ANNOTATION_PATTERNS[level].search(annotation)
+            listValues.append(match.group(1) if match else None)
+    return listValues
+
+
+@pytest.mark.parametrize("level", transcriptome.ANNOTATION_LEVELS)
+def test_count_by_same_as_row_wise(level):
+    data = annotationTable(3000)
+    dictExpected = rowWiseCounts(rowWiseLevel(data, level))
+    dictExpected.pop(None, None)
+    objStaticAnnotationGene = transcriptome.StaticAnnotationGene(data)
+    pdfCounts = objStaticAnnotationGene.CountBy(level)
+    assert list(zip(pdfCounts[level], pdfCounts['gene_count'])) == list(dictExpected.items())
+    listExpected = sorted(dictExpected.items(), key=lambda item: -item[1])[:3]
+    pdfTop = objStaticAnnotationGene.TopK(3, level)
+    assert list(zip(pdfTop[level], pdfTop['gene_count'])) == listExpected
+
+
+def test_parse_annotation_same_as_row_wise():
+    data = annotationTable(500, seed=1)
+    pdfParsed = transcriptome.parseAnnotation(data['annotation'])
+    for level in transcriptome.ANNOTATION_LEVELS:
+        assert pdfParsed[level].dtype == 'category'
+        assert [None if pd.isna(value) else value for value in pdfParsed[level].tolist()] == rowWiseLevel(data, level)
+    with pytest.raises(ValueError):
+        transcriptome.StaticAnnotationGene(data).CountBy('species')
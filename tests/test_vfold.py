@@ -0,0 +1,128 @@
+import random
+import pytest
+from AnalysisTool import VFold
+from AnalysisTool.structure import StructureBatch
+
+
+def randomStructure(rng, length):
+    """ random balanced dot-bracket structure """
+    listChars, depth = [], 0
+    for index in range(length):
+        rest = length - index
+        choice = rng.random()
+        if depth and (rest <= depth or choice < 0.3):
+            listChars.append(')')
+            depth -= 1
+        elif rest > depth + 1 and choice < 0.6:
+            listChars.append('(')
+            depth += 1
+        else:
+            listChars.append('.')
+    return ''.join(listChars)
+
+
+def classicRegions(parentheses_seq, five_start, five_end, three_start, three_end):
+    """ compared region by `ThreeEnd_miRNA` / `FiveEnd_miRNA` (None if raise error) """
+    getMKs = VFold.GetSeqMarker(parentheses_seq)
+    getMKs.getStMKs_premiRNA
+    getMKs.getStMKs_miRNA3p(three_start, three_end)
+    getMKs.getStMKs_miRNA5p(five_start, five_end)
+    getMKs.rm0StMKs
+    dictRegions = {}
+    for p53, objClass in (('3p', VFold.ThreeEnd_miRNA), ('5p', VFold.FiveEnd_miRNA)):
+        try:
+            objArm = objClass(getMKs)
+            objArm.get_index_c
+            objArm.get_start_site_c
+            objArm.get_end_site_c
+            objArm.get_list_compared_markers
+            dictRegions[p53] = (objArm.start_site_c, objArm.end_site_c, objArm.compared_markers)
+        except (IndexError, AttributeError):
+            dictRegions[p53] = None
+    return dictRegions
+
+
+def test_resolver_same_as_classic():
+    rng = random.Random(0)
+    for _ in range(3000):
+        length = rng.randint(1, 60)
+        parentheses_seq = randomStructure(rng, length)
+        five_start = rng.randint(0, length)
+        three_start = rng.randint(0, length)
+        sites = (five_start, five_start + rng.randint(0, 20), three_start, three_start + rng.randint(0, 20))
+        dictRegions = VFold.ComparedRegionResolver(parentheses_seq).resolve(*sites)
+        dictResults = {p53: tuple(region) if region else None for p53, region in dictRegions.items()}
+        assert dictResults == classicRegions(parentheses_seq, *sites), (parentheses_seq, sites)
+
+
+def test_resolver_unpaired_three_arm():
+    # NOTE: 3p arm 無配對 -> FiveEnd_miRNA 也無法計算，5p 為 None
+    parentheses_seq = '(((...)))....'
+    assert classicRegions(parentheses_seq, 0, 2, 9, 12)['5p'] is None
+    assert VFold.ComparedRegionResolver(parentheses_seq).resolve(0, 2, 9, 12) == {'5p': None, '3p': None}
+    assert VFold.ComparedRegionResolver(parentheses_seq).resolveArm(0, 2, '5p') is not None
+
+
+@pytest.mark.parametrize("parentheses_seq", [")", "(..)).", "..)((..))"])
+def test_unbalanced_structure_raise_index_error(parentheses_seq):
+    with pytest.raises(IndexError):
+        VFold.GetSeqMarker(parentheses_seq).getStMKs_premiRNA
+    with pytest.raises(IndexError):
+        VFold.GetSeqMarker(parentheses_seq, cache=VFold.StructureCache()).getStMKs_premiRNA
+    with pytest.raises(IndexError):
+        VFold.getSeqMarkers(["((..))", parentheses_seq])
+    with pytest.raises(ValueError):
+        StructureBatch([parentheses_seq])
+
+
+def test_structure_cache_count_once():
+    objStructureCache = VFold.StructureCache(max_size=10)
+    objStructureCache.evaluate('(((...)))', 0, 2, 6, 8)
+    assert (objStructureCache.hits, objStructureCache.misses) == (0, 1)
+    objStructureCache.evaluate('(((...)))', 0, 2, 6, 8)
+    assert (objStructureCache.hits, objStructureCache.misses) == (1, 1)
+    assert objStructureCache.info()['hit_rate'] == 0.5
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_evaluate_precursors_cache_info(processes):
+    rng = random.Random(1)
+    listStructures = [randomStructure(rng, 40) for _ in range(5)]
+    listItems = [(rng.choice(listStructures), 0, 10, 25, 35) for _ in range(200)]
+    listExpected = list(VFold.evaluatePrecursors(listItems, processes=1, chunk_size=30))
+    dictCacheInfo = {}
+    listResults = list(VFold.evaluatePrecursors(
+        listItems, processes=processes, chunk_size=30, cache_size=100, cache_info=dictCacheInfo
+    ))
+    assert listResults == listExpected
+    assert dictCacheInfo['hits'] + dictCacheInfo['misses'] == len(listItems)
+    assert dictCacheInfo['misses'] >= len(set(listItems))
+    assert dictCacheInfo['hits'] > 0
+    # NOTE: cache 只存在於該次呼叫
+    assert VFold._dictWorkerCache == {}
+
+
+@pytest.mark.parametrize("processes, chunk_size", [(1, 1), (1, 1000), (2, 7)])
+def test_evaluate_precursors_same_as_classic(processes, chunk_size):
+    rng = random.Random(2)
+    listItems = []
+    for _ in range(400):
+        length = rng.randint(1, 80)
+        five_start, three_start = rng.randint(0, length), rng.randint(0, length)
+        listItems.append((
+            randomStructure(rng, length),
+            five_start, five_start + rng.randint(0, 22), three_start, three_start + rng.randint(0, 22),
+        ))
+    listResults = list(VFold.evaluatePrecursors(iter(listItems), processes=processes, chunk_size=chunk_size, max_segments=2))
+    assert [result.index for result in listResults] == list(range(len(listItems)))
+    for result, item in zip(listResults, listItems):
+        dictRegions = classicRegions(*item)
+        dictSegments = {
+            p53: VFold.cotinous_seq(region[2]) if region is not None else None for p53, region in dictRegions.items()
+        }
+        assert (tuple(result.compared_5p) if result.compared_5p else None) == dictRegions['5p'], item
+        assert (tuple(result.compared_3p) if result.compared_3p else None) == dictRegions['3p'], item
+        assert (result.segments_5p, result.segments_3p) == (dictSegments['5p'], dictSegments['3p'])
+        assert result.passed == all(
+            segments is not None and len(segments) <= 2 for segments in dictSegments.values()
+        )